@@ -0,0 +1,540 @@
+"""
+ASGI serving mode for the API (Starlette + uvicorn).
+
+Serves the same routes as app.py. Request bodies are read and JSON is
+encoded on the event loop; image decode and inference are offloaded to a
+bounded thread pool, so cheap endpoints (/, /api/classes, recommendations)
+keep answering while inference is saturated. When the pool and its queue
+are full, inference requests are refused with 503 and a Retry-After header
+instead of piling up.
+
+Usage:
+    uvicorn asgi:app --host 0.0.0.0 --port 7860
+    python asgi.py
+
+Configuration (environment):
+    ASGI_INFERENCE_WORKERS  threads running decode + inference (default: min(4, CPUs))
+    ASGI_INFERENCE_QUEUE    requests allowed to wait for a worker before 503 (default: 32)
+"""
+import asyncio
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from itertools import islice
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.http import parse_options_header
+
+import app as core
+import metrics
+import timing
+from upload_stream import MultipartFileReader, UploadTooLarge
+
+ASGI_INFERENCE_WORKERS = int(os.environ.get('ASGI_INFERENCE_WORKERS', min(4, os.cpu_count() or 1)))
+ASGI_INFERENCE_QUEUE = int(os.environ.get('ASGI_INFERENCE_QUEUE', 32))
+
+
+class Overloaded(Exception):
+    """The inference executor is at capacity"""
+
+
+def _traced(fn, args):
+    timing.start_trace()
+    result = fn(*args)
+    return result, timing.current_trace()
+
+
+class InferenceExecutor:
+    """
+    Thread pool for CPU-bound work with admission control
+
+    At most max_workers jobs run and max_queue more wait; further submissions
+    raise Overloaded right away. Only touched from the event loop thread.
+
+    Args:
+        max_workers: Threads running jobs
+        max_queue: Jobs allowed to wait for a free thread
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max(1, max_workers)
+        self.capacity = self.max_workers + max(0, max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='asgi-inference')
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _done(self, _):
+        self.in_flight -= 1
+        self.completed += 1
+
+    async def run(self, fn, *args):
+        """
+        Run fn(*args) in the pool
+
+        Returns:
+            (result, timing spans recorded while it ran)
+        """
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise Overloaded()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        future = asyncio.get_running_loop().run_in_executor(self._pool, _traced, fn, args)
+        # Released when the job really finishes, even if the client went away first
+        future.add_done_callback(self._done)
+        return await future
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            'max_workers': self.max_workers,
+            'capacity': self.capacity,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
+
+
+executor = InferenceExecutor(ASGI_INFERENCE_WORKERS, ASGI_INFERENCE_QUEUE)
+
+
+def json_response(body, status_code: int = 200, trace=None) -> Response:
+    if isinstance(body, bytes):
+        content = body
+    else:
+        started = time.perf_counter()
+        content = (core.app.json.dumps(body) + '\n').encode('utf-8')
+        elapsed = time.perf_counter() - started
+        timing.record('json_serialize', elapsed)
+        if trace:
+            trace = trace + [('json_serialize', elapsed)]
+    headers = {'Server-Timing': timing.server_timing_header(trace)} if trace else None
+    return Response(content, status_code=status_code, media_type='application/json', headers=headers)
+
+
+def overloaded_response() -> Response:
+    core.REJECTIONS.inc(reason='overloaded')
+    response = json_response({
+        'status': 'error',
+        'message': 'Server busy, too many predictions in progress. Retry shortly.'
+    }, 503)
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+async def models_unavailable(need_leaf: bool = True):
+    """Error response while the models are loading, failed to load or are not served here; else None"""
+    if core.model_loading['state'] == 'ready':
+        return None
+    # May wait for models that are still loading, so not on the event loop
+    unavailable = await run_in_threadpool(core.models_unavailable_response, need_leaf)
+    if unavailable is None:
+        return None
+    body, status, headers = unavailable
+    response = json_response(body, status)
+    response.headers.update(headers)
+    return response
+
+
+def flask_view(view):
+    """Serve a cheap, request-independent Flask view (e.g. /api/classes) as is"""
+    async def endpoint(request: Request):
+        with core.app.app_context():
+            result = core.app.make_response(view())
+        return Response(result.get_data(), status_code=result.status_code, media_type=result.mimetype)
+    return endpoint
+
+
+async def read_image_upload(request: Request):
+    """
+    The 'image' file of a multipart request
+
+    Bodies larger than MAX_UPLOAD_REQUEST_SIZE are refused from their Content-Length
+    before the form is parsed (read and spooled), as in app.read_image_upload().
+
+    Returns:
+        (filename, memoryview, None) or (None, None, error response)
+    """
+    too_large = {
+        'status': 'error',
+        'message': f'File size exceeds {core.MAX_FILE_SIZE / (1024*1024)}MB limit'
+    }
+    content_length = request.headers.get('content-length', '')
+    if content_length.isdigit() and int(content_length) > core.MAX_UPLOAD_REQUEST_SIZE:
+        core.REJECTIONS.inc(reason='too_large')
+        return None, None, json_response(too_large, 413)
+    
+    started = time.perf_counter()
+    try:
+        form = await request.form(max_files=1)
+        upload = form.get('image')
+        if upload is None or isinstance(upload, str):
+            return None, None, json_response({'status': 'error', 'message': 'No image file provided'}, 400)
+        if not upload.filename:
+            return None, None, json_response({'status': 'error', 'message': 'No file selected'}, 400)
+        if upload.size is not None and upload.size > core.MAX_FILE_SIZE:
+            core.REJECTIONS.inc(reason='too_large')
+            return None, None, json_response(too_large, 413)
+        # A view of the spooled file, not a copy (as app.read_image_upload)
+        return upload.filename, core.upload_buffer(upload.file), None
+    finally:
+        # Recorded on the loop, outside any request trace: histogram only
+        timing.record('upload_read', time.perf_counter() - started)
+
+
+async def predict(request: Request):
+    unavailable = await models_unavailable()
+    if unavailable is not None:
+        return unavailable
+    filename, image_bytes, error = await read_image_upload(request)
+    if error is not None:
+        return error
+    try:
+        (body, status), trace = await executor.run(core.predict_upload, image_bytes, filename)
+    except Overloaded:
+        return overloaded_response()
+    return json_response(body, status, trace)
+
+
+async def predict_disease_only(request: Request):
+    unavailable = await models_unavailable(need_leaf=False)
+    if unavailable is not None:
+        return unavailable
+    _, image_bytes, error = await read_image_upload(request)
+    if error is not None:
+        return error
+    try:
+        (body, status), trace = await executor.run(core.predict_disease_only_upload, image_bytes)
+    except Overloaded:
+        return overloaded_response()
+    return json_response(body, status, trace)
+
+
+async def predict_and_recommend(request: Request):
+    sections, message = core.parse_sections(request.query_params.get('include'))
+    if message is not None:
+        return json_response({'status': 'error', 'message': message}, 400)
+    unavailable = await models_unavailable()
+    if unavailable is not None:
+        return unavailable
+    filename, image_bytes, error = await read_image_upload(request)
+    if error is not None:
+        return error
+    fields = {key: value for key, value in (await request.form()).items() if isinstance(value, str)}
+    if fields.get('include') and not request.query_params.get('include'):
+        sections, message = core.parse_sections(fields['include'])
+        if message is not None:
+            return json_response({'status': 'error', 'message': message}, 400)
+    try:
+        (body, status), trace = await executor.run(core.predict_and_recommend_upload, image_bytes, filename,
+                                                   fields, sections)
+    except Overloaded:
+        return overloaded_response()
+    # Serialized in the executor (beside the recommendation lookup)
+    return json_response(body, status, trace)
+
+
+def _predict_archive(archive_file):
+    return core.predict_image_batch(core.read_zip_uploads(archive_file))
+
+
+async def _next_sources(body, reader: MultipartFileReader):
+    """Feed body chunks to the reader until it completes an upload; [] once the body has ended"""
+    while not reader.finished:
+        sources = reader.feed(await anext(body, b''))
+        if sources:
+            return sources
+    return []
+
+
+def _take_uploads(sources, count):
+    """Up to count uploads from the front of a deque of MultipartFileReader sources (inflating zip members)"""
+    chunk = []
+    while sources and len(chunk) < count:
+        source = sources[0]
+        if isinstance(source, list):
+            chunk.extend(sources.popleft())
+            continue
+        taken = list(islice(source, count - len(chunk)))
+        if not taken:
+            sources.popleft()
+        chunk.extend(taken)
+    return chunk
+
+
+def _predict_next_chunk(models, sources, start_index):
+    """predict_image_batch() over the next STREAM_BATCH_SIZE queued uploads, on the model version the stream holds"""
+    chunk = _take_uploads(sources, core.STREAM_BATCH_SIZE)
+    with core.model_registry.use(models):
+        return core.predict_image_batch(chunk, start_index) if chunk else []
+
+
+def _batch_too_large():
+    core.REJECTIONS.inc(reason='too_large')
+    return json_response({
+        'status': 'error',
+        'message': f'Request body exceeds the {core.MAX_BATCH_REQUEST_SIZE / (1024*1024):.1f}MB limit'
+    }, 413)
+
+
+async def predict_batch(request: Request):
+    unavailable = await models_unavailable()
+    if unavailable is not None:
+        return unavailable
+
+    started = datetime.now()
+    if request.query_params.get('stream', '').lower() in ('1', 'true', 'ndjson') or \
+            'application/x-ndjson' in request.headers.get('accept', ''):
+        return await predict_batch_stream(request, started)
+
+    # As app.UploadRequest: refused from the Content-Length, before the form is parsed
+    content_length = request.headers.get('content-length', '')
+    if content_length.isdigit() and int(content_length) > core.MAX_BATCH_REQUEST_SIZE:
+        return _batch_too_large()
+
+    form = await request.form(max_files=core.BATCH_MAX_IMAGES + 1)
+    archive = form.get('archive')
+    files = [f for f in form.getlist('images') if not isinstance(f, str) and f.filename]
+
+    if archive is None and len(files) > core.BATCH_MAX_IMAGES:
+        core.REJECTIONS.inc(reason='too_many_images')
+        return json_response({
+            'status': 'error',
+            'message': f'Too many images: {len(files)} (limit {core.BATCH_MAX_IMAGES})'
+        }, 400)
+    if archive is None and not files:
+        return json_response({
+            'status': 'error',
+            'message': "No images provided (send files as 'images' or a zip as 'archive')"
+        }, 400)
+    if archive is not None and not isinstance(archive, str) and archive.size is not None \
+            and archive.size > core.MAX_ARCHIVE_SIZE:
+        core.REJECTIONS.inc(reason='too_large')
+        return json_response({
+            'status': 'error',
+            'message': f'Archive exceeds the {core.MAX_ARCHIVE_SIZE / (1024*1024):.0f}MB limit'
+        }, 413)
+
+    try:
+        if archive is not None and not isinstance(archive, str):
+            # Read from the spooled upload, not copied into memory first
+            results, trace = await executor.run(_predict_archive, archive.file)
+        else:
+            uploads = [(f.filename, core.upload_buffer(f.file)) for f in files]
+            results, trace = await executor.run(core.predict_image_batch, uploads)
+    except Overloaded:
+        return overloaded_response()
+    except (ValueError, zipfile.BadZipFile) as e:
+        return json_response({'status': 'error', 'message': f'Invalid upload: {str(e)}'}, 400)
+    except Exception as e:
+        return json_response({
+            'status': 'error',
+            'message': f'Batch prediction failed: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }, 500)
+
+    summary = core.summarize_batch(results)
+    summary['elapsed_ms'] = round((datetime.now() - started).total_seconds() * 1000, 1)
+    return json_response({
+        'status': 'success',
+        'summary': summary,
+        'results': results,
+        'timestamp': datetime.now().isoformat()
+    }, 200, trace)
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose iterator is still reading the request body
+
+    StreamingResponse would also run a disconnect listener calling receive(), which
+    drops the body chunks it gets; here the iterator is the only reader, and
+    request.stream() raises ClientDisconnect itself.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+async def predict_batch_stream(request: Request, started):
+    """
+    NDJSON variant of /api/predict/batch that parses the body as it arrives (app.predict_batch_stream)
+    """
+    mimetype, options = parse_options_header(request.headers.get('content-type', ''))
+    boundary = options.get('boundary')
+    if mimetype != 'multipart/form-data' or not boundary:
+        return json_response({
+            'status': 'error',
+            'message': 'Streaming mode expects a multipart/form-data upload'
+        }, 400)
+
+    reader = MultipartFileReader(boundary, core.MAX_FILE_SIZE, file_fields=('images',),
+                                 extensions=core.IMAGE_EXTENSIONS, max_archive_size=core.MAX_ARCHIVE_SIZE)
+    body = request.stream()
+    # Read up to the first upload before the 200 is committed, so an oversized archive sent first gets a 413
+    try:
+        sources = await _next_sources(body, reader)
+    except UploadTooLarge as e:
+        core.REJECTIONS.inc(reason='too_large')
+        return json_response({'status': 'error', 'message': str(e)}, 413)
+    except ValueError as e:
+        return json_response({'status': 'error', 'message': f'Invalid upload: {str(e)}'}, 400)
+    return BodyStreamingResponse(_stream_batch(body, reader, sources, started), media_type='application/x-ndjson')
+
+
+def _error_line(message, summary):
+    return (core.app.json.dumps({
+        'status': 'error',
+        'message': message,
+        'summary': summary,
+        'timestamp': datetime.now().isoformat()
+    }) + '\n').encode('utf-8')
+
+
+async def _stream_batch(body, reader, sources, started):
+    """
+    NDJSON lines as in app.stream_batch_predictions
+
+    The body is parsed on the event loop as it arrives; only zip member inflation and
+    inference run in the executor, one STREAM_BATCH_SIZE batch at a time.
+    """
+    queue = deque(sources)
+    summary = core.summarize_batch([])
+    index = 0
+    # One model version for the whole stream, as in app.stream_batch_predictions
+    with core.model_registry.hold() as models:
+        while True:
+            try:
+                # Wait for a full batch of image files; an archive's members are all at hand
+                while not reader.finished and len(queue) < core.STREAM_BATCH_SIZE and \
+                        all(isinstance(source, list) for source in queue):
+                    queue.extend(await _next_sources(body, reader))
+                if not queue:
+                    break
+                results, _ = await executor.run(_predict_next_chunk, models, queue, index)
+            except Overloaded:
+                yield _error_line('Batch prediction failed: Server busy', summary)
+                return
+            except Exception as e:
+                if isinstance(e, UploadTooLarge):
+                    core.REJECTIONS.inc(reason='too_large')
+                yield _error_line(f'Batch prediction failed: {str(e)}', summary)
+                return
+            if not results:
+                continue  # an exhausted archive left the queue
+            index += len(results)
+            core.summarize_batch(results, summary)
+            yield ''.join(core.app.json.dumps(r) + '\n' for r in results).encode('utf-8')
+
+    summary['elapsed_ms'] = round((datetime.now() - started).total_seconds() * 1000, 1)
+    yield (core.app.json.dumps({
+        'status': 'success',
+        'summary': summary,
+        'timestamp': datetime.now().isoformat()
+    }) + '\n').encode('utf-8')
+
+
+async def get_recommendations(request: Request):
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        # Severity estimated from an uploaded photo (app.image_recommendations_for)
+        unavailable = await models_unavailable(need_leaf=False)
+        if unavailable is not None:
+            return unavailable
+        _, image_bytes, error = await read_image_upload(request)
+        if error is not None:
+            return error
+        fields = {key: value for key, value in (await request.form()).items() if isinstance(value, str)}
+        try:
+            (body, status), trace = await executor.run(core.image_recommendations_for, image_bytes, fields)
+        except Overloaded:
+            return overloaded_response()
+        return json_response(body, status, trace)
+    try:
+        data = await request.json()
+    except Exception as e:
+        return json_response({'error': f'Server error: {str(e)}'}, 500)
+    if core.recommendation_index.snapshot is not None:
+        # Served from memory, no I/O: cheap enough for the event loop
+        body, status = core.recommendations_for(data)
+    else:
+        body, status = await run_in_threadpool(core.recommendations_for, data)
+    return json_response(body, status)
+
+
+async def reload_models(request: Request):
+    wait = request.query_params.get('wait', '').lower() in ('1', 'true')
+    body, status = await run_in_threadpool(core.reload_models_request, request.headers.get('authorization', ''), wait)
+    return json_response(body, status)
+
+
+async def inference_stats(request: Request):
+    with core.app.app_context():
+        body = core.inference_stats().get_json()
+    body['asgi_executor'] = executor.stats()
+    return json_response(body)
+
+
+async def prometheus_metrics(request: Request):
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def observed(path: str, endpoint):
+    """Count the endpoint's requests and time them for /metrics, as app.py does for Flask views"""
+    async def wrapper(request: Request):
+        started = time.perf_counter()
+        response = await endpoint(request)
+        core.REQUESTS.inc(endpoint=path, status=str(response.status_code))
+        core.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=path)
+        return response
+    return wrapper
+
+
+@asynccontextmanager
+async def lifespan(_):
+    yield
+    executor.shutdown()
+
+
+routes = [
+    Route(path, observed(path, endpoint), methods=methods)
+    for path, endpoint, methods in (
+        ('/', flask_view(core.home), ['GET']),
+        ('/metrics', prometheus_metrics, ['GET']),
+        ('/api/classes', flask_view(core.get_classes), ['GET']),
+        ('/api/model-info', flask_view(core.model_info), ['GET']),
+        ('/api/inference-stats', inference_stats, ['GET']),
+        ('/api/predict', predict, ['POST']),
+        ('/api/predict-disease-only', predict_disease_only, ['POST']),
+        ('/api/predict-and-recommend', predict_and_recommend, ['POST']),
+        ('/api/predict/batch', predict_batch, ['POST']),
+        ('/api/get_recommendations', get_recommendations, ['POST']),
+        ('/api/admin/reload-models', reload_models, ['POST']),
+    )
+]
+
+app = Starlette(routes=routes, lifespan=lifespan,
+                middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])])
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 7860))
+    print(f"ASGI server starting on http://0.0.0.0:{port} "
+          f"({executor.max_workers} inference workers, {ASGI_INFERENCE_QUEUE} queued max)")
+    uvicorn.run(app, host='0.0.0.0', port=port)
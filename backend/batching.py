@@ -0,0 +1,175 @@
+"""
+Dynamic micro-batching for Keras inference.
+
+Concurrent requests each submit a small preprocessed tensor; a single
+worker thread per model drains the queue into one batch (up to
+``max_batch_size`` rows or ``max_wait_ms`` after the first item arrived),
+runs one forward pass and hands every caller back its own rows.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict
+
+import numpy as np
+
+
+class _PendingItem:
+    __slots__ = ('array', 'future', 'enqueued_at')
+
+    def __init__(self, array: np.ndarray):
+        self.array = array
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Queue single-image (or small batch) inference calls and run them together
+
+    Args:
+        name: Label used in stats and the worker thread name
+        predict_fn: Callable taking a (N, H, W, C) array and returning (N, ...) outputs,
+            or a list of such arrays for multi-output models
+        max_batch_size: Upper bound on rows per forward pass
+        max_wait_ms: How long the first queued item may wait for others to join
+    """
+
+    def __init__(self, name: str, predict_fn: Callable[[np.ndarray], np.ndarray],
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.name = name
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._rows = 0
+        self._errors = 0
+        self._batch_size_counts: Dict[int, int] = {}
+        self._max_queue_depth = 0
+        self._total_queue_wait = 0.0
+        self._max_queue_wait = 0.0
+        self._total_inference_time = 0.0
+
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name=f'microbatch-{name}', daemon=True)
+        self._worker.start()
+
+    def submit(self, array: np.ndarray, timeout: float = None) -> np.ndarray:
+        """
+        Queue a (N, H, W, C) array and block until its N output rows are ready
+        """
+        if self._stopped.is_set():
+            raise RuntimeError(f"Batcher '{self.name}' is stopped")
+        item = _PendingItem(array)
+        self._queue.put(item)
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            if depth > self._max_queue_depth:
+                self._max_queue_depth = depth
+        return item.future.result(timeout=timeout)
+
+    def stop(self):
+        """Stop the worker thread after it finishes the current batch"""
+        self._stopped.set()
+        self._queue.put(None)
+        self._worker.join(timeout=5)
+
+    def _collect(self, first: _PendingItem):
+        items = [first]
+        rows = len(first.array)
+        deadline = first.enqueued_at + self.max_wait
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped.set()
+                break
+            items.append(item)
+            rows += len(item.array)
+        return items, rows
+
+    def _run(self):
+        while not self._stopped.is_set():
+            first = self._queue.get()
+            if first is None:
+                break
+            items, rows = self._collect(first)
+
+            started = time.perf_counter()
+            try:
+                if len(items) == 1:
+                    batch = items[0].array
+                else:
+                    batch = np.concatenate([item.array for item in items], axis=0)
+                outputs = self.predict_fn(batch)
+                if isinstance(outputs, (list, tuple)):
+                    outputs = [np.asarray(o) for o in outputs]
+                else:
+                    outputs = np.asarray(outputs)
+            except Exception as e:
+                for item in items:
+                    item.future.set_exception(e)
+                with self._stats_lock:
+                    self._errors += 1
+                continue
+            finished = time.perf_counter()
+
+            offset = 0
+            for item in items:
+                n = len(item.array)
+                if isinstance(outputs, list):
+                    item.future.set_result([o[offset:offset + n] for o in outputs])
+                else:
+                    item.future.set_result(outputs[offset:offset + n])
+                offset += n
+
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(items)
+                self._rows += rows
+                self._batch_size_counts[rows] = self._batch_size_counts.get(rows, 0) + 1
+                self._total_inference_time += finished - started
+                for item in items:
+                    waited = started - item.enqueued_at
+                    self._total_queue_wait += waited
+                    if waited > self._max_queue_wait:
+                        self._max_queue_wait = waited
+
+        # Fail anything still queued so callers don't hang on shutdown
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item.future.set_exception(RuntimeError(f"Batcher '{self.name}' stopped"))
+
+    def stats(self) -> Dict:
+        """Batch-size and queue-depth metrics for tuning max_batch_size / max_wait_ms"""
+        with self._stats_lock:
+            batches = self._batches
+            items = self._items
+            return {
+                'name': self.name,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_queue_depth,
+                'batches': batches,
+                'requests': items,
+                'rows': self._rows,
+                'errors': self._errors,
+                'avg_batch_size': round(self._rows / batches, 3) if batches else 0.0,
+                'batch_size_histogram': {str(k): v for k, v in sorted(self._batch_size_counts.items())},
+                'avg_queue_wait_ms': round(self._total_queue_wait / items * 1000.0, 3) if items else 0.0,
+                'max_queue_wait_ms': round(self._max_queue_wait * 1000.0, 3),
+                'avg_inference_ms': round(self._total_inference_time / batches * 1000.0, 3) if batches else 0.0,
+            }
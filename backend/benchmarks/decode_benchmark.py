@@ -0,0 +1,83 @@
+"""
+Full-resolution vs reduced-size (Image.draft) decode of large phone photos.
+
+For each photo size, a synthetic leaf photo is saved as JPEG and run through
+open_image() + decode_image() with and without draft decoding. The report
+shows the time per image, the size (and RGB bytes) of the decoded image, the
+pixel difference of the 224x224 model input and the largest difference in
+the leaf and disease model outputs.
+
+Usage:
+    python benchmarks/decode_benchmark.py [--sizes 4032x3024,8000x6000] [--iterations 10]
+
+Uses synthetic models with the real input/output shapes unless --leaf and
+--disease point at model files.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from benchmarks.synthetic import encode_image, make_leaf_image
+from preprocessing import decode_image, normalize_image, open_image
+
+# 8 MP, 12 MP (most phones) and 48 MP (quad-bayer main cameras)
+DEFAULT_SIZES = '3264x2448,4032x3024,8000x6000'
+
+
+def time_decode(data, draft, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        with open_image(data, draft=draft) as image:
+            size = image.size
+            pixels = decode_image(image)
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return float(np.median(timings)), size, pixels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='Comma-separated WxH photo sizes')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--quality', type=int, default=90, help='JPEG quality of the synthetic photos')
+    parser.add_argument('--leaf', help='Leaf model file (default: synthetic)')
+    parser.add_argument('--disease', help='Disease model file (default: synthetic)')
+    args = parser.parse_args()
+
+    import tensorflow as tf
+    from benchmarks.synthetic import build_disease_model, build_leaf_model
+    leaf_model = tf.keras.models.load_model(args.leaf, compile=False) if args.leaf else build_leaf_model()
+    disease_model = tf.keras.models.load_model(args.disease, compile=False) if args.disease else build_disease_model()
+
+    print(f"Median of {args.iterations} decodes per photo (JPEG quality {args.quality})\n")
+    print(f"  {'photo':<10} {'mode':<6} {'ms':>8} {'decoded':>11} {'RGB MB':>7} {'speedup':>8} "
+          f"{'|px diff| mean/max':>19} {'|leaf diff|':>11} {'|disease diff|':>14}")
+    for size in args.sizes.split(','):
+        w, h = (int(n) for n in size.split('x'))
+        data = encode_image(make_leaf_image(size=(w, h), seed=w), 'JPEG', quality=args.quality)
+
+        results = {}
+        for label, draft in (('full', False), ('draft', True)):
+            results[label] = time_decode(data, draft, args.iterations)
+
+        full_ms, _, full_pixels = results['full']
+        batch = np.concatenate([normalize_image(results[label][2]) for label in ('full', 'draft')])
+        leaf_out = leaf_model.predict(batch, verbose=0)
+        disease_out = disease_model.predict(batch, verbose=0)
+        for label in ('full', 'draft'):
+            ms, (dw, dh), pixels = results[label]
+            diff = np.abs(pixels.astype(np.int16) - full_pixels.astype(np.int16))
+            extra = ''
+            if label == 'draft':
+                extra = (f" {diff.mean():9.3f}/{diff.max():<9d} {abs(leaf_out[1, 0] - leaf_out[0, 0]):11.2e} "
+                         f"{np.abs(disease_out[1] - disease_out[0]).max():14.2e}")
+            print(f"  {size:<10} {label:<6} {ms:8.1f} {f'{dw}x{dh}':>11} {dw * dh * 3 / 1e6:7.1f} "
+                  f"{full_ms / ms:7.2f}x" + extra)
+
+
+if __name__ == '__main__':
+    main()
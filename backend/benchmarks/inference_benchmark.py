@@ -0,0 +1,79 @@
+"""
+Per-image latency of model.predict vs the compiled (traced tf.function) path.
+
+Usage:
+    python benchmarks/inference_benchmark.py [--iterations 200] [--synthetic]
+
+Uses the models loaded by app.py when they exist, otherwise synthetic models
+with the same input/output shapes.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from benchmarks.synthetic import build_disease_model, build_leaf_model
+from inference import CompiledModel
+
+
+def load_models(use_synthetic: bool):
+    if not use_synthetic:
+        import app as app_module
+        if app_module.wait_for_models():
+            return app_module.leaf_model, app_module.disease_model, 'real'
+        print('Real models not available, falling back to synthetic models.')
+    return build_leaf_model(), build_disease_model(), 'synthetic'
+
+
+def time_calls(fn, batch, iterations):
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(batch)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    latencies = np.array(latencies)
+    return {
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--synthetic', action='store_true', help='Always use synthetic models')
+    args = parser.parse_args()
+
+    leaf_model, disease_model, kind = load_models(args.synthetic)
+    print(f"Models: {kind}, iterations: {args.iterations}\n")
+
+    for name, model in (('leaf', leaf_model), ('disease', disease_model)):
+        batch = np.random.default_rng(0).random((1,) + tuple(model.input_shape[1:]), dtype=np.float32)
+        compiled = CompiledModel(model, name)
+
+        paths = {
+            'model.predict': lambda x: model.predict(x, verbose=0),
+            'compiled': compiled.predict,
+        }
+        results = {}
+        for label, fn in paths.items():
+            for _ in range(args.warmup):
+                fn(batch)
+            results[label] = time_calls(fn, batch, args.iterations)
+
+        max_diff = float(np.max(np.abs(np.asarray(paths['model.predict'](batch)) - np.asarray(compiled.predict(batch)))))
+        print(f"[{name} model] compiled: {compiled.compiled}, max |diff| = {max_diff:.2e}")
+        for label, r in results.items():
+            print(f"  {label:<14} mean {r['mean_ms']:7.2f} ms  p50 {r['p50_ms']:7.2f}  p95 {r['p95_ms']:7.2f}  p99 {r['p99_ms']:7.2f}")
+        speedup = results['model.predict']['mean_ms'] / results['compiled']['mean_ms']
+        print(f"  speedup: {speedup:.2f}x\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,395 @@
+"""
+Load test for /api/predict, /api/predict-disease-only, /api/get_recommendations
+and /api/predict-and-recommend.
+
+Each endpoint is driven at every concurrency level with a fixed number of
+requests. Uploads are synthetic leaf images in several sizes and formats;
+recommendation requests cycle through every disease, severity, farming type
+and budget. For each (endpoint, concurrency) the throughput, error count and
+mean / p50 / p95 / p99 latency are reported, plus the p50 per image variant.
+
+Usage:
+    python benchmarks/load_test.py [--concurrency 1,4,16] [--requests 200] [--output results.json]
+    python benchmarks/load_test.py --url http://localhost:7860 ...
+    python benchmarks/load_test.py --baseline baseline.json [--tolerance 0.15]
+
+By default the app runs in this process behind the Flask test client, with the
+prediction caches off so every request runs the whole pipeline (--cache keeps
+them on). Missing model files are replaced by synthetic models with the real
+input/output shapes (--synthetic forces them), and a missing treatment DB is
+built from treatment_database.sql. With --url the requests go over HTTP to a
+running server (Flask or asgi.py), whose own configuration applies.
+
+With --baseline, the results are compared to a previous --output file and the
+script exits with status 1 if p50 or p95 latency rose, or throughput fell, by
+more than the tolerance (latency also by at least --min-delta-ms), or the error
+rate went up, for any pair present in both.
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+ENDPOINTS = {
+    'predict': '/api/predict',
+    'disease-only': '/api/predict-disease-only',
+    'recommendations': '/api/get_recommendations',
+    'predict-and-recommend': '/api/predict-and-recommend',  # uploads only: severity is estimated from the photo
+}
+IMAGE_FORMATS = {'jpeg': ('JPEG', '.jpg'), 'png': ('PNG', '.png'), 'webp': ('WEBP', '.webp')}
+RECOMMENDATION_DISEASES = ('Bacterial_spot', 'Early_blight', 'Late_blight', 'Leaf_Mold', 'Septoria_leaf_spot',
+                           'Target_Spot', 'Tomato_Yellow_Leaf_Curl_Virus', 'Tomato_mosaic_virus')
+# Metrics that gate --baseline comparisons: name -> True when higher is worse
+GATED_METRICS = {'p50_ms': True, 'p95_ms': True, 'throughput_rps': False}
+
+
+def make_uploads(sizes, formats, variants=4):
+    """
+    Synthetic leaf photos as (variant label, filename, bytes)
+
+    Each size/format pair gets `variants` different images, so caches keyed on
+    the upload (or its perceptual hash) don't collapse them into one.
+    """
+    from benchmarks.synthetic import encode_image, make_leaf_image
+
+    uploads = []
+    for (w, h), fmt in itertools.product(sizes, formats):
+        pil_format, extension = IMAGE_FORMATS[fmt]
+        for seed in range(variants):
+            image = make_leaf_image(size=(w, h), seed=1000 + seed)
+            uploads.append((f'{w}x{h}.{fmt}', f'leaf_{w}x{h}_{seed}{extension}', encode_image(image, pil_format)))
+    return uploads
+
+
+def make_recommendation_requests():
+    return [
+        {'disease_name': disease, 'affected_percentage': percentage, 'farming_type': farming, 'budget': budget}
+        for disease, percentage, farming, budget in itertools.product(
+            RECOMMENDATION_DISEASES, (5.0, 20.0, 45.0, 80.0), ('organic', 'chemical', 'mixed'), ('low', 'medium', 'high'))
+    ]
+
+
+class FlaskClient:
+    """Requests through the Flask test client of the app imported in this process (one per thread)"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.flask_app.test_client()
+        return client
+
+    def post_file(self, path, field, filename, data):
+        return self._client().post(path, data={field: (io.BytesIO(data), filename)}).status_code
+
+    def post_json(self, path, body):
+        return self._client().post(path, json=body).status_code
+
+
+class HttpClient:
+    """Requests over HTTP to a running server"""
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _send(self, path, body, content_type):
+        request = urllib.request.Request(self.base_url + path, data=body, method='POST',
+                                         headers={'Content-Type': content_type})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+        except OSError:
+            return 0  # connection refused / reset / timed out
+
+    def post_file(self, path, field, filename, data):
+        boundary = uuid.uuid4().hex
+        body = b''.join([
+            f'--{boundary}\r\n'.encode(),
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'.encode(),
+            b'Content-Type: application/octet-stream\r\n\r\n',
+            data,
+            f'\r\n--{boundary}--\r\n'.encode(),
+        ])
+        return self._send(path, body, f'multipart/form-data; boundary={boundary}')
+
+    def post_json(self, path, body):
+        return self._send(path, json.dumps(body).encode('utf-8'), 'application/json')
+
+
+def percentiles(latencies_ms):
+    latencies = np.asarray(latencies_ms, dtype=np.float64)
+    if not len(latencies):
+        return {'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    return {
+        'mean_ms': round(float(latencies.mean()), 3),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'max_ms': round(float(latencies.max()), 3),
+    }
+
+
+def run_level(client, endpoint, concurrency, requests, uploads, recommendation_requests, warmup=None):
+    """
+    Send `requests` requests to one endpoint from `concurrency` threads
+
+    Returns:
+        Result dict (throughput, error count, latency percentiles, p50 per image variant)
+    """
+    path = ENDPOINTS[endpoint]
+
+    def one(i):
+        if endpoint == 'recommendations':
+            label, body = 'json', recommendation_requests[i % len(recommendation_requests)]
+            started = time.perf_counter()
+            status = client.post_json(path, body)
+        else:
+            label, filename, data = uploads[i % len(uploads)]
+            started = time.perf_counter()
+            status = client.post_file(path, 'image', filename, data)
+        return label, status, (time.perf_counter() - started) * 1000.0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        list(clients.map(one, range(concurrency if warmup is None else warmup)))
+        started = time.perf_counter()
+        samples = list(clients.map(one, range(requests)))
+        elapsed = time.perf_counter() - started
+
+    ok = [latency for _, status, latency in samples if 200 <= status < 300]
+    statuses = {}
+    by_label = {}
+    for label, status, latency in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if 200 <= status < 300:
+            by_label.setdefault(label, []).append(latency)
+    result = {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': requests - len(ok),
+        'error_rate': round((requests - len(ok)) / requests, 4) if requests else 0.0,
+        'statuses': statuses,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(ok) / elapsed, 2) if elapsed > 0 else None,
+    }
+    result.update(percentiles(ok))
+    if endpoint != 'recommendations':
+        result['p50_ms_by_image'] = {label: percentiles(v)['p50_ms'] for label, v in sorted(by_label.items())}
+    return result
+
+
+def compare(current, baseline, tolerance=0.15, min_delta_ms=1.0):
+    """
+    Compare two load test outputs on the (endpoint, concurrency) pairs they share
+
+    Args:
+        current: Output of this run
+        baseline: A previous output
+        tolerance: Allowed relative change before a gated metric counts as a regression
+        min_delta_ms: Latency changes smaller than this never count (sub-millisecond noise)
+
+    Returns:
+        List of rows {'endpoint', 'concurrency', 'metric', 'baseline', 'current', 'change', 'regression'};
+        change is relative (current / baseline - 1), or absolute for error_rate
+    """
+    previous = {(r['endpoint'], r['concurrency']): r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        base = previous.get((result['endpoint'], result['concurrency']))
+        if base is None:
+            continue
+        for metric, higher_is_worse in GATED_METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = new / old - 1.0
+            regression = change > tolerance if higher_is_worse else change < -tolerance
+            if metric.endswith('_ms') and abs(new - old) < min_delta_ms:
+                regression = False
+            rows.append({'endpoint': result['endpoint'], 'concurrency': result['concurrency'], 'metric': metric,
+                         'baseline': old, 'current': new, 'change': round(change, 4), 'regression': regression})
+        old_rate, new_rate = base.get('error_rate', 0.0), result.get('error_rate', 0.0)
+        rows.append({'endpoint': result['endpoint'], 'concurrency': result['concurrency'], 'metric': 'error_rate',
+                     'baseline': old_rate, 'current': new_rate, 'change': round(new_rate - old_rate, 4),
+                     'regression': new_rate > old_rate})
+    return rows
+
+
+def _ensure_treatment_db(env):
+    if os.path.exists(env.get('TREATMENT_DB_PATH', str(BACKEND_DIR / 'tomato_treatments.db'))):
+        return
+    path = os.path.join(tempfile.mkdtemp(prefix='load-test-db-'), 'tomato_treatments.db')
+    with open(BACKEND_DIR / 'treatment_database.sql', encoding='utf-8') as f:
+        conn = sqlite3.connect(path)
+        conn.executescript(f.read())
+        conn.commit()
+        conn.close()
+    env['TREATMENT_DB_PATH'] = path
+
+
+def load_local_app(synthetic: bool, cache: bool):
+    """
+    Configure the environment, import app.py and wait for its models
+
+    Returns:
+        (Flask app, 'real' or 'synthetic')
+    """
+    env = os.environ
+    leaf = env.get('LEAF_MODEL_PATH', str(BACKEND_DIR / 'models' / 'final_leaf_model.keras'))
+    disease = env.get('DISEASE_MODEL_PATH', str(BACKEND_DIR / 'models' / 'disease_model.keras'))
+    kind = 'real'
+    if synthetic or not (os.path.exists(leaf) and os.path.exists(disease)):
+        from benchmarks.synthetic import build_disease_model, build_leaf_model
+        model_dir = tempfile.mkdtemp(prefix='load-test-models-')
+        leaf, disease = os.path.join(model_dir, 'leaf.keras'), os.path.join(model_dir, 'disease.keras')
+        build_leaf_model().save(leaf)
+        build_disease_model().save(disease)
+        kind = 'synthetic'
+    env.update(LEAF_MODEL_PATH=leaf, DISEASE_MODEL_PATH=disease)
+    _ensure_treatment_db(env)
+    env.setdefault('MODEL_LOAD_MODE', 'eager')
+    env.setdefault('MODEL_RELOAD_INTERVAL', '0')
+    env.setdefault('LOG_LEVEL', 'warning')
+    if not cache:
+        env['PREDICTION_CACHE_ENABLED'] = '0'
+        env['PHASH_CACHE_ENABLED'] = '0'
+
+    import app as app_module
+    if not app_module.wait_for_models():
+        raise RuntimeError(f"Models failed to load: {app_module.model_loading['error']}")
+    return app_module.app, kind
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def _sizes(value):
+    return [tuple(int(n) for n in size.split('x')) for size in value.split(',') if size]
+
+
+RESULT_HEADER = f"  {'endpoint':<16} {'conc':>4} {'req/s':>8} {'errors':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+
+
+def format_result(r):
+    def ms(key):
+        return f"{r[key]:8.1f}" if r[key] is not None else f"{'-':>8}"
+    return (f"  {r['endpoint']:<16} {r['concurrency']:>4} {r['throughput_rps'] or 0:8.1f} {r['errors']:>6} "
+            f"{ms('mean_ms')} {ms('p50_ms')} {ms('p95_ms')} {ms('p99_ms')}")
+
+
+def print_comparison(rows, tolerance):
+    print(f"\nCompared with baseline (tolerance {tolerance:.0%})\n")
+    for row in rows:
+        change = f"{row['change']:+.1%}" if row['metric'] != 'error_rate' else f"{row['change']:+.4f}"
+        flag = 'REGRESSION' if row['regression'] else 'ok'
+        print(f"  {row['endpoint']:<16} {row['concurrency']:>4} {row['metric']:<15} "
+              f"{row['baseline']:>10} -> {row['current']:<10} {change:>8}  {flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Base URL of a running server (default: the app in this process)')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='Comma-separated subset of: '
+                        + ', '.join(ENDPOINTS))
+    parser.add_argument('--concurrency', type=_int_list, default=[1, 4, 16], help='Comma-separated levels')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and level')
+    parser.add_argument('--image-sizes', type=_sizes, default=[(320, 240), (1024, 768), (3000, 2000)],
+                        help='Comma-separated WxH upload sizes')
+    parser.add_argument('--formats', default='jpeg,png,webp', help='Comma-separated upload formats')
+    parser.add_argument('--variants', type=int, default=4, help='Different images per size and format')
+    parser.add_argument('--synthetic', action='store_true', help='Always use synthetic models (local app only)')
+    parser.add_argument('--cache', action='store_true', help='Keep the prediction caches on (local app only)')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='Previous --output file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative regression (default 0.15)')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='Ignore latency changes smaller than this (default 1.0)')
+    args = parser.parse_args()
+
+    endpoints = [e for e in args.endpoints.split(',') if e]
+    unknown = [e for e in endpoints if e not in ENDPOINTS]
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(unknown)}")
+    formats = [f for f in args.formats.lower().split(',') if f]
+
+    if args.url:
+        client, models = HttpClient(args.url), 'server'
+    else:
+        flask_app, models = load_local_app(args.synthetic, args.cache)
+        client = FlaskClient(flask_app)
+
+    uploads = make_uploads(args.image_sizes, formats, args.variants)
+    recommendation_requests = make_recommendation_requests()
+    print(f"Target: {args.url or 'in-process Flask app'} (models: {models}), {args.requests} requests per level, "
+          f"{len(uploads)} distinct uploads\n")
+
+    print(RESULT_HEADER)
+    results = []
+    for endpoint in endpoints:
+        for concurrency in args.concurrency:
+            results.append(run_level(client, endpoint, concurrency, args.requests, uploads, recommendation_requests))
+            print(format_result(results[-1]))
+
+    output = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'target': args.url or 'flask-test-client',
+            'models': models,
+            'cache': args.cache if not args.url else None,
+            'requests_per_level': args.requests,
+            'image_sizes': [f'{w}x{h}' for w, h in args.image_sizes],
+            'formats': formats,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('cpu_count') != os.cpu_count() or \
+                baseline.get('meta', {}).get('target') != output['meta']['target']:
+            print("\n[WARNING] Baseline was recorded on a different machine or target; differences may not be regressions")
+        rows = compare(output, baseline, args.tolerance, args.min_delta_ms)
+        print_comparison(rows, args.tolerance)
+        if any(row['regression'] for row in rows):
+            print("\n[ERROR] Performance regressed against the baseline")
+            sys.exit(1)
+        print("\n[OK] No regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Lookup latency of the perceptual-hash cache as the number of entries grows.
+
+Usage:
+    python benchmarks/phash_benchmark.py [--entries 300000] [--max-distance 4]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from phash_cache import PerceptualCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=300000)
+    parser.add_argument('--max-distance', type=int, default=4)
+    parser.add_argument('--queries', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    cache = PerceptualCache('bench', max_distance=args.max_distance, max_entries=args.entries)
+    stored = []
+    started = time.perf_counter()
+    for i in range(args.entries):
+        value = rng.getrandbits(64)
+        stored.append(value)
+        cache.add(value, {'id': i})
+    print(f"Inserted {args.entries:,} entries in {time.perf_counter() - started:.2f} s")
+
+    for label, near in (('near-duplicate hits', True), ('misses', False)):
+        queries = []
+        for _ in range(args.queries):
+            if near:
+                value = rng.choice(stored)
+                for bit in rng.sample(range(64), rng.randint(0, args.max_distance)):
+                    value ^= 1 << bit
+            else:
+                value = rng.getrandbits(64)
+            queries.append(value)
+
+        latencies = []
+        for value in queries:
+            t0 = time.perf_counter()
+            cache.lookup(value)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[int(len(latencies) * 0.99)]
+        print(f"{label:<20} mean {sum(latencies) / len(latencies):.4f} ms  p50 {p50:.4f} ms  p99 {p99:.4f} ms")
+
+    print(cache.stats())
+
+
+if __name__ == '__main__':
+    main()
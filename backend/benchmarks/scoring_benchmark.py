@@ -0,0 +1,65 @@
+"""
+What-if scoring throughput: calculate_treatment_score() in a loop vs TreatmentScorer.
+
+Scores a synthetic catalog under random preference and cost-multiplier
+scenarios and reports the time for both paths plus top-3 extraction.
+
+Usage:
+    python benchmarks/scoring_benchmark.py [--treatments 2000] [--scenarios 1000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from scoring import TreatmentScorer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--treatments', type=int, default=2000)
+    parser.add_argument('--scenarios', type=int, default=1000)
+    parser.add_argument('--reference-scenarios', type=int, default=50,
+                        help='Scenarios timed on the per-row path (it is slow)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    treatments = [{
+        'treatment_id': i,
+        'effectiveness_percentage': int(rng.integers(40, 100)),
+        'is_organic': int(rng.integers(0, 2)),
+        'cost_per_acre_inr': float(rng.integers(200, 5000)),
+        'priority': int(rng.integers(1, 5))
+    } for i in range(args.treatments)]
+    farming = rng.choice(['organic', 'chemical', 'mixed'], args.scenarios)
+    budget = rng.choice(['low', 'medium', 'high'], args.scenarios)
+    multipliers = rng.uniform(0.5, 2.0, (args.scenarios, 1))
+
+    scorer = TreatmentScorer(treatments)
+    started = time.perf_counter()
+    scores = scorer.score(farming, budget, costs=scorer.cost * multipliers)
+    indices, _ = scorer.top_k(scores, k=3)
+    vectorized = time.perf_counter() - started
+
+    # Imported here so loading the models does not count towards either timing
+    from app import calculate_treatment_score
+    n = min(args.reference_scenarios, args.scenarios)
+    started = time.perf_counter()
+    for row in range(n):
+        repriced = [dict(t, cost_per_acre_inr=t['cost_per_acre_inr'] * multipliers[row, 0]) for t in treatments]
+        ranked = sorted(((calculate_treatment_score(t, farming[row], budget[row]), i) for i, t in enumerate(repriced)),
+                        key=lambda x: x[0], reverse=True)[:3]
+    reference = (time.perf_counter() - started) * args.scenarios / n
+
+    cells = args.scenarios * args.treatments
+    print(f"{args.scenarios:,} scenarios x {args.treatments:,} treatments ({cells:,} scores)")
+    print(f"  per-row reference (extrapolated from {n}): {reference * 1000:10.1f} ms")
+    print(f"  vectorized + top-3:                        {vectorized * 1000:10.1f} ms "
+          f"({reference / vectorized:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Cold-start time of the API per serving role and model loading mode.
+
+Each configuration imports app.py in a fresh interpreter and reports the
+time until the import returns, until /api/classes answers and until /
+reports 'ready' (models loaded and warmed up, where the role serves
+inference), plus whether TensorFlow was imported at all.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 3] [--synthetic]
+
+Uses the models configured for app.py unless --synthetic is given (or they
+don't exist), in which case small models with the real shapes are built.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+CONFIGURATIONS = (
+    ('recommendations role', {'SERVING_ROLE': 'recommendations'}),
+    ('all, lazy models', {'MODEL_LOAD_MODE': 'lazy'}),
+    ('all, background models', {'MODEL_LOAD_MODE': 'background'}),
+    ('all, eager models', {'MODEL_LOAD_MODE': 'eager'}),
+)
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter() - started
+client = app.app.test_client()
+client.get('/api/classes')
+first_request = time.perf_counter() - started
+while client.get('/').get_json()['readiness'] == 'starting':
+    time.sleep(0.01)
+ready = time.perf_counter() - started
+print(json.dumps({'import_s': imported, 'first_request_s': first_request, 'ready_s': ready,
+                  'tensorflow': 'tensorflow' in sys.modules}))
+"""
+
+
+def measure(env):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process_s'] = time.perf_counter() - started
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--synthetic', action='store_true', help='Always use synthetic models')
+    args = parser.parse_args()
+
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='2')
+    leaf = env.get('LEAF_MODEL_PATH', str(BACKEND_DIR / 'models' / 'final_leaf_model.keras'))
+    disease = env.get('DISEASE_MODEL_PATH', str(BACKEND_DIR / 'models' / 'disease_model.keras'))
+    if args.synthetic or not (os.path.exists(leaf) and os.path.exists(disease)):
+        from benchmarks.synthetic import build_disease_model, build_leaf_model
+        model_dir = tempfile.mkdtemp(prefix='startup-bench-')
+        leaf, disease = os.path.join(model_dir, 'leaf.keras'), os.path.join(model_dir, 'disease.keras')
+        build_leaf_model().save(leaf)
+        build_disease_model().save(disease)
+    env.update(LEAF_MODEL_PATH=leaf, DISEASE_MODEL_PATH=disease)
+
+    print(f"Median of {args.runs} runs (seconds)\n")
+    print(f"  {'configuration':<24} {'import':>8} {'1st req':>8} {'ready':>8} {'process':>8}  tensorflow")
+    for label, overrides in CONFIGURATIONS:
+        runs = [measure(dict(env, **overrides)) for _ in range(args.runs)]
+        median = {key: float(np.median([r[key] for r in runs]))
+                  for key in ('import_s', 'first_request_s', 'ready_s', 'process_s')}
+        print(f"  {label:<24} {median['import_s']:8.2f} {median['first_request_s']:8.2f} "
+              f"{median['ready_s']:8.2f} {median['process_s']:8.2f}  {'yes' if runs[0]['tensorflow'] else 'no'}")
+
+
+if __name__ == '__main__':
+    main()
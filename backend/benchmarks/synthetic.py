@@ -0,0 +1,64 @@
+"""
+Synthetic stand-ins for the real models and uploads.
+
+The .keras files are not checked in, so benchmarks and tests build small
+CNNs with the same input and output shapes as final_leaf_model.keras
+(224x224x3 -> sigmoid) and disease_model.keras (224x224x3 -> softmax).
+"""
+import io
+
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+
+
+def build_leaf_model(img_size=(224, 224), seed=0):
+    """Binary leaf / non-leaf classifier with a single sigmoid output"""
+    tf.keras.utils.set_random_seed(seed)
+    inputs = tf.keras.Input(shape=img_size + (3,))
+    x = tf.keras.layers.Conv2D(8, 3, strides=2, activation='relu')(inputs)
+    x = tf.keras.layers.Conv2D(16, 3, strides=2, activation='relu')(x)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    # Biased towards class 0 ('leaf') so synthetic uploads reach the disease stage
+    outputs = tf.keras.layers.Dense(1, activation='sigmoid',
+                                    bias_initializer=tf.keras.initializers.Constant(-2.0))(x)
+    return tf.keras.Model(inputs, outputs, name='synthetic_leaf_model')
+
+
+def build_disease_model(num_classes=11, img_size=(224, 224), seed=1):
+    """Disease classifier with a softmax over num_classes"""
+    tf.keras.utils.set_random_seed(seed)
+    inputs = tf.keras.Input(shape=img_size + (3,))
+    x = tf.keras.layers.Conv2D(8, 3, strides=2, activation='relu')(inputs)
+    x = tf.keras.layers.Conv2D(16, 3, strides=2, activation='relu')(x)
+    x = tf.keras.layers.Conv2D(32, 3, strides=2, activation='relu')(x)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    outputs = tf.keras.layers.Dense(num_classes, activation='softmax')(x)
+    return tf.keras.Model(inputs, outputs, name='synthetic_disease_model')
+
+
+def make_leaf_image(size=(640, 480), seed=0):
+    """Leaf-ish RGB image: green gradient with random brown lesions"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    yy, xx = np.mgrid[0:h, 0:w]
+    img = np.zeros((h, w, 3), dtype=np.float32)
+    img[..., 0] = 40 + 30 * (xx / max(w - 1, 1))
+    img[..., 1] = 110 + 80 * (yy / max(h - 1, 1))
+    img[..., 2] = 30
+    for _ in range(int(rng.integers(3, 12))):
+        cx, cy = rng.integers(0, w), rng.integers(0, h)
+        r = rng.integers(max(2, min(w, h) // 40), max(3, min(w, h) // 10))
+        mask = (xx - cx) ** 2 + (yy - cy) ** 2 < r ** 2
+        img[mask] = (110, 70, 30)
+    img += rng.normal(0, 6, img.shape)
+    return Image.fromarray(np.clip(img, 0, 255).astype(np.uint8), 'RGB')
+
+
+def encode_image(image, fmt='JPEG', **save_kwargs):
+    """Serialize a PIL image the way a client upload would arrive"""
+    buf = io.BytesIO()
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.save(buf, format=fmt, **save_kwargs)
+    return buf.getvalue()
@@ -0,0 +1,86 @@
+"""
+Inference throughput of the worker pool with 1..N worker processes.
+
+For each pool size, concurrent clients send preprocessed batches through
+the leaf and disease models (as /api/predict does) and the sustained
+images/second is reported, next to the same load run in this process.
+
+Usage:
+    python benchmarks/worker_pool_benchmark.py [--max-workers 4] [--requests 400] [--batch-size 1]
+
+Uses synthetic models with the real input/output shapes unless --leaf and
+--disease point at model files.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from worker_pool import InferenceWorkerPool
+
+
+def run_load(predict, batch, requests, concurrency):
+    """Send `requests` batches through leaf then disease from `concurrency` threads; returns images/s"""
+    def one(_):
+        predict('leaf', batch)
+        predict('disease', batch)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        list(clients.map(one, range(concurrency)))  # warm-up
+        started = time.perf_counter()
+        list(clients.map(one, range(requests)))
+        elapsed = time.perf_counter() - started
+    return requests * len(batch) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--batch-size', type=int, default=1, help='Images per request')
+    parser.add_argument('--concurrency', type=int, default=16, help='Client threads')
+    parser.add_argument('--intra-op-threads', type=int, default=1)
+    parser.add_argument('--inter-op-threads', type=int, default=1)
+    parser.add_argument('--leaf', help='Leaf model path (.keras or .tflite)')
+    parser.add_argument('--disease', help='Disease model path (.keras or .tflite)')
+    args = parser.parse_args()
+
+    models = {'leaf': args.leaf, 'disease': args.disease}
+    if not (args.leaf and args.disease):
+        from benchmarks.synthetic import build_disease_model, build_leaf_model
+        model_dir = tempfile.mkdtemp(prefix='worker-pool-bench-')
+        models = {'leaf': os.path.join(model_dir, 'leaf.keras'), 'disease': os.path.join(model_dir, 'disease.keras')}
+        build_leaf_model().save(models['leaf'])
+        build_disease_model().save(models['disease'])
+
+    batch = np.random.default_rng(0).random((args.batch_size, 224, 224, 3), dtype=np.float32)
+    print(f"{args.requests} requests x {args.batch_size} image(s), {args.concurrency} clients, "
+          f"{os.cpu_count()} CPUs\n")
+
+    import tensorflow as tf
+    from inference import CompiledModel
+    local = {name: CompiledModel(tf.keras.models.load_model(path, compile=False), name)
+             for name, path in models.items()}
+    baseline = run_load(lambda name, x: local[name].predict(x), batch, args.requests, args.concurrency)
+    print(f"  in-process   {baseline:8.1f} imgs/s")
+
+    for n in range(1, args.max_workers + 1):
+        pool = InferenceWorkerPool(models, num_workers=n, slot_rows=max(args.batch_size, 1),
+                                   slots_per_worker=max(4, args.concurrency // n),
+                                   intra_op_threads=args.intra_op_threads,
+                                   inter_op_threads=args.inter_op_threads).start()
+        try:
+            throughput = run_load(pool.predict, batch, args.requests, args.concurrency)
+        finally:
+            pool.close()
+        print(f"  {n} worker{'s' if n > 1 else ' '}    {throughput:8.1f} imgs/s ({throughput / baseline:.2f}x in-process)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Offline bulk scoring of image folders.
+
+Images are decoded and resized in a process pool (preprocessing.decode_image,
+the same code the API uses), stacked into batches and run through both
+detection stages with app.detect_batch. Results are appended to a CSV as
+each batch finishes, so an interrupted run picks up where it stopped when
+started again with --resume. A .parquet output is written from that CSV
+once every image has been scored (requires pyarrow).
+
+Usage:
+    python bulk_score.py /data/archive/2024 /data/archive/2025 --output scores.csv
+    python bulk_score.py /data/archive --output scores.parquet --workers 8 --resume
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+
+from preprocessing import DEFAULT_IMG_SIZE, decode_image, normalize_image, open_image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+COLUMNS = ['path', 'status', 'is_leaf', 'leaf_confidence', 'disease', 'disease_confidence',
+           'is_confident', 'error']
+
+
+def list_images(directories, extensions=IMAGE_EXTENSIONS):
+    """All image files under the given directories, sorted so runs are reproducible"""
+    paths = []
+    for directory in directories:
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            paths.extend(os.path.join(root, name) for name in sorted(files)
+                         if name.lower().endswith(extensions))
+    return paths
+
+
+def decode_files(paths, img_size=DEFAULT_IMG_SIZE):
+    """
+    Decode and resize a chunk of files (runs in a worker process)
+
+    Returns:
+        list of (path, uint8 array or None, error message or None)
+    """
+    decoded = []
+    for path in paths:
+        try:
+            with open_image(path, img_size) as image:
+                decoded.append((path, decode_image(image, img_size), None))
+        except Exception as e:
+            decoded.append((path, None, str(e)))
+    return decoded
+
+
+def iter_decoded(executor, paths, chunk_size, max_pending):
+    """
+    Yield decode_files() results in input order, keeping at most max_pending
+    chunks in flight so decoded pixels never pile up ahead of inference
+    """
+    pending = deque()
+    chunks = (paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size))
+    for chunk in chunks:
+        pending.append(executor.submit(decode_files, chunk))
+        if len(pending) >= max_pending:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def checkpoint_path(output):
+    """CSV the results are appended to; the output itself unless writing Parquet"""
+    return output if output.lower().endswith('.csv') else output + '.partial.csv'
+
+
+def load_checkpoint(path):
+    """
+    Paths already scored in an earlier run
+
+    A trailing line cut short by an interruption is truncated away so the
+    file can be appended to again.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row['path'] for row in csv.DictReader(f)}
+
+
+def score_rows(app_module, decoded):
+    """
+    Run both detection stages on a list of decode_files() results
+
+    Returns:
+        One result row (dict with COLUMNS) per input, in order
+    """
+    rows = []
+    ok = [k for k, (_, pixels, _) in enumerate(decoded) if pixels is not None]
+    results = {}
+    if ok:
+        first = decoded[ok[0]][1]
+        batch = np.empty((len(ok),) + first.shape, dtype=np.float32)
+        for j, k in enumerate(ok):
+            normalize_image(decoded[k][1], out=batch[j:j + 1])
+        leaf_results, disease_results, _ = app_module.detect_batch(batch)
+        results = {k: (leaf_results[j], disease_results[j]) for j, k in enumerate(ok)}
+
+    for k, (path, _, error) in enumerate(decoded):
+        row = dict.fromkeys(COLUMNS, '')
+        row['path'] = path
+        if k not in results:
+            row['status'] = 'error'
+            row['error'] = error
+        else:
+            leaf_result, disease_result = results[k]
+            row['is_leaf'] = leaf_result['is_leaf']
+            row['leaf_confidence'] = round(leaf_result['confidence'], 6)
+            if disease_result is None:
+                row['status'] = 'rejected'
+            else:
+                row['status'] = 'success'
+                row['disease'] = disease_result['disease']
+                row['disease_confidence'] = round(disease_result['confidence'], 6)
+                row['is_confident'] = disease_result['is_confident']
+        rows.append(row)
+    return rows
+
+
+def write_parquet(csv_path, output):
+    try:
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+    except ImportError:
+        print(f"[ERROR] Writing Parquet needs pyarrow (pip install pyarrow); results kept in {csv_path}")
+        return False
+    table = pa_csv.read_csv(csv_path)
+    pq.write_table(table, output)
+    os.remove(csv_path)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directories', nargs='+', help='Folders scanned recursively for images')
+    parser.add_argument('--output', required=True, help='Result file (.csv or .parquet)')
+    parser.add_argument('--resume', action='store_true', help='Skip images already in the output checkpoint')
+    parser.add_argument('--batch-size', type=int, default=64, help='Images per inference batch')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Decode processes')
+    parser.add_argument('--chunk-size', type=int, default=16, help='Images per decode task')
+    parser.add_argument('--limit', type=int, help='Score at most this many images')
+    parser.add_argument('--log-every', type=int, default=20, help='Progress line every N batches')
+    args = parser.parse_args(argv)
+
+    paths = list_images(args.directories)
+    csv_path = checkpoint_path(args.output)
+    if args.resume:
+        done = load_checkpoint(csv_path)
+        paths = [p for p in paths if p not in done]
+        print(f"[OK] Resuming: {len(done)} images already scored")
+    elif os.path.exists(csv_path):
+        os.remove(csv_path)
+    if args.limit is not None:
+        paths = paths[:args.limit]
+    print(f"Scoring {len(paths)} images with {args.workers} decode workers, batch size {args.batch_size}")
+
+    # Start the decode workers before TensorFlow is imported, and with 'spawn',
+    # so they never carry a copy of the models or TF's threads
+    executor = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn'))
+    import app as app_module
+    if not app_module.wait_for_models():
+        print("[ERROR] Models not loaded; cannot score")
+        executor.shutdown()
+        return 1
+
+    started = time.perf_counter()
+    scored = errors = batches = 0
+    max_pending = max(2, 2 * args.workers, 2 * args.batch_size // max(1, args.chunk_size))
+    write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+    try:
+        with open(csv_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            if write_header:
+                writer.writeheader()
+            decoded = []
+            stream = iter_decoded(executor, paths, args.chunk_size, max_pending)
+            for item in stream:
+                decoded.append(item)
+                if len(decoded) < args.batch_size:
+                    continue
+                rows = score_rows(app_module, decoded)
+                decoded = []
+                writer.writerows(rows)
+                f.flush()
+                scored += len(rows)
+                errors += sum(row['status'] == 'error' for row in rows)
+                batches += 1
+                if batches % args.log_every == 0:
+                    elapsed = time.perf_counter() - started
+                    print(f"[PROGRESS] {scored}/{len(paths)} images, {scored / elapsed:.1f} imgs/s")
+            if decoded:
+                rows = score_rows(app_module, decoded)
+                writer.writerows(rows)
+                scored += len(rows)
+                errors += sum(row['status'] == 'error' for row in rows)
+    except KeyboardInterrupt:
+        print(f"\n[WARNING] Interrupted after {scored} images; rerun with --resume to continue")
+        executor.shutdown(wait=False, cancel_futures=True)
+        return 130
+    executor.shutdown()
+
+    elapsed = time.perf_counter() - started
+    rate = scored / elapsed if elapsed > 0 else 0.0
+    print(f"[OK] Scored {scored} images ({errors} errors) in {elapsed:.1f}s: {rate:.1f} imgs/s")
+
+    if args.output.lower().endswith('.parquet'):
+        if not write_parquet(csv_path, args.output):
+            return 1
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Pool of read-only SQLite connections to the treatment database.
+
+Connections are opened once with a read-only URI (mode=ro) plus
+query_only, mmap_size and cache_size pragmas and a statement cache, then
+checked out and returned around each use instead of being created per
+request. A checkout blocks for up to `timeout` seconds when every
+connection is in use; wait times are recorded for /api/inference-stats.
+reset() retires all connections, e.g. after the DB file was replaced.
+
+Why a shared pool rather than one connection per thread (threading.local):
+Werkzeug's threaded server and the ASGI thread pool start short-lived
+threads, so per-thread connections would again be opened and torn down
+about once per request, and their number would follow the thread count
+instead of a configured bound. Connections therefore cross threads
+(check_same_thread=False). That is safe because a checked-out connection
+belongs to exactly one thread until it is returned (see
+tests/db_pool_test.py), which is the guarantee per-thread connections
+would have given.
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """No connection became free within the checkout timeout"""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of read-only connections
+
+    Args:
+        db_path: Path to the SQLite database
+        max_size: Maximum number of open connections
+        timeout: Seconds a checkout waits for a free connection
+        mmap_size: Bytes of the file to memory-map (PRAGMA mmap_size)
+        cache_size_kib: Page cache per connection in KiB (PRAGMA cache_size)
+        cached_statements: Prepared statements kept per connection
+    """
+
+    def __init__(self, db_path: str, max_size: int = 4, timeout: float = 5.0,
+                 mmap_size: int = 64 * 1024 * 1024, cache_size_kib: int = 8192, cached_statements: int = 128):
+        self.db_path = db_path
+        self.max_size = max(1, int(max_size))
+        self.timeout = timeout
+        self.mmap_size = int(mmap_size)
+        self.cache_size_kib = int(cache_size_kib)
+        self.cached_statements = int(cached_statements)
+
+        self._cond = threading.Condition()
+        self._idle: List[sqlite3.Connection] = []
+        self._generation = 0
+        self._generations: Dict[int, int] = {}  # id(conn) -> generation it was opened in
+        self._open = 0
+        self._closed = False
+
+        self.created = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.max_in_use = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        try:
+            conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+            conn.execute('PRAGMA query_only = 1')
+            conn.execute(f'PRAGMA mmap_size = {self.mmap_size}')
+            conn.execute(f'PRAGMA cache_size = {-self.cache_size_kib}')
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        started = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError('Connection pool is closed')
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    conn = None
+                    generation = self._generation
+                    break
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f'No treatment DB connection free after {self.timeout}s')
+                self._cond.wait(remaining)
+
+            wait_ms = (time.perf_counter() - started) * 1000
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.max_in_use = max(self.max_in_use, self._open - len(self._idle))
+
+        if conn is None:
+            # Open outside the lock; the slot is already reserved
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._generations[id(conn)] = generation
+                self.created += 1
+        return conn
+
+    def _release(self, conn: sqlite3.Connection, discard: bool = False):
+        with self._cond:
+            stale = self._closed or self._generations.get(id(conn)) != self._generation
+            if discard or stale:
+                self._generations.pop(id(conn), None)
+                self._open -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+        if discard or stale:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a with-block; it is always returned"""
+        conn = self._checkout()
+        discard = False
+        try:
+            yield conn
+        except sqlite3.Error:
+            # Don't reuse a connection that failed (e.g. the file changed underneath it)
+            discard = True
+            raise
+        finally:
+            self._release(conn, discard)
+
+    def reset(self):
+        """Close idle connections and retire checked-out ones when they come back"""
+        with self._cond:
+            self._generation += 1
+            idle, self._idle = self._idle, []
+            for conn in idle:
+                self._generations.pop(id(conn), None)
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def close(self):
+        """Close every idle connection and refuse new checkouts"""
+        with self._cond:
+            self._closed = True
+        self.reset()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'db_path': self.db_path,
+                'max_size': self.max_size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+                'max_in_use': self.max_in_use,
+                'created': self.created,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait_ms, 3)
+            }
+
@@ -0,0 +1,195 @@
+"""
+Export the leaf and disease models as quantized TFLite variants.
+
+For each model three files are written to --output-dir:
+    <name>_dynamic.tflite   dynamic-range quantization (int8 weights, float activations)
+    <name>_float16.tflite   float16 weights
+    <name>_int8.tflite      full-integer quantization, calibrated on --calibration-dir
+
+When --eval-dir is given, every variant is compared to its Keras model and an
+accuracy-drift report is printed and saved as export_report.json. The eval
+directory holds one sub-folder per disease class (named as in CLASS_NAMES)
+plus an optional 'non_leaf' folder for images the leaf detector must reject.
+
+Usage:
+    python export_tflite.py --calibration-dir data/calibration [--eval-dir data/labeled]
+
+Serve a variant with INFERENCE_BACKEND=tflite TFLITE_VARIANT=<dynamic|float16|int8>.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+
+import app as app_module
+from inference import TFLiteModel
+
+VARIANTS = ('dynamic', 'float16', 'int8')
+IMAGE_EXTENSIONS = ('*.png', '*.jpg', '*.jpeg', '*.PNG', '*.JPG', '*.JPEG')
+NON_LEAF_FOLDER = 'non_leaf'
+
+
+def list_images(directory):
+    files = []
+    for ext in IMAGE_EXTENSIONS:
+        files.extend(glob.glob(os.path.join(directory, '**', ext), recursive=True))
+    return sorted(set(files))
+
+
+def load_tensor(path):
+    """Preprocess an image file exactly the way the API does"""
+    with Image.open(path) as image:
+        return app_module.preprocess_image(image)
+
+
+def representative_dataset(image_paths, limit):
+    def generator():
+        for path in image_paths[:limit]:
+            yield [load_tensor(path)]
+    return generator
+
+
+def convert(model, variant, calibration_paths=None, calibration_limit=200):
+    """
+    Convert a Keras model to one TFLite variant
+
+    Returns:
+        Serialized .tflite flatbuffer bytes
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == 'int8':
+        if not calibration_paths:
+            raise ValueError('Full-integer quantization needs calibration images (--calibration-dir)')
+        converter.representative_dataset = representative_dataset(calibration_paths, calibration_limit)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    elif variant != 'dynamic':
+        raise ValueError(f"Unknown variant '{variant}'")
+    return converter.convert()
+
+
+def load_labeled_images(eval_dir, class_names):
+    """
+    Returns:
+        list of (path, is_leaf, class_index or None)
+    """
+    samples = []
+    for folder in sorted(os.listdir(eval_dir)):
+        folder_path = os.path.join(eval_dir, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        if folder == NON_LEAF_FOLDER:
+            samples.extend((path, False, None) for path in list_images(folder_path))
+        elif folder in class_names:
+            samples.extend((path, True, class_names.index(folder)) for path in list_images(folder_path))
+        else:
+            print(f"[WARNING] Skipping eval folder '{folder}' (not a known class)")
+    return samples
+
+
+def evaluate_drift(name, keras_model, tflite_model, samples, batch_size=32):
+    """Compare a TFLite variant to its Keras model on labeled images"""
+    if name == 'disease':
+        samples = [s for s in samples if s[1]]
+    if not samples:
+        return None
+
+    keras_outputs, tflite_outputs = [], []
+    for start in range(0, len(samples), batch_size):
+        batch = np.concatenate([load_tensor(path) for path, _, _ in samples[start:start + batch_size]])
+        keras_outputs.append(np.asarray(keras_model(batch, training=False)))
+        tflite_outputs.append(np.asarray(tflite_model.predict(batch)))
+    keras_outputs = np.concatenate(keras_outputs)
+    tflite_outputs = np.concatenate(tflite_outputs)
+
+    if name == 'leaf':
+        labels = np.array([is_leaf for _, is_leaf, _ in samples])
+        keras_pred = keras_outputs[:, 0] < 0.5
+        tflite_pred = tflite_outputs[:, 0] < 0.5
+    else:
+        labels = np.array([class_idx for _, _, class_idx in samples])
+        keras_pred = keras_outputs.argmax(axis=1)
+        tflite_pred = tflite_outputs.argmax(axis=1)
+
+    keras_accuracy = float(np.mean(keras_pred == labels))
+    tflite_accuracy = float(np.mean(tflite_pred == labels))
+    diff = np.abs(keras_outputs - tflite_outputs)
+    return {
+        'images': len(samples),
+        'keras_accuracy': round(keras_accuracy, 4),
+        'tflite_accuracy': round(tflite_accuracy, 4),
+        'accuracy_drift': round(tflite_accuracy - keras_accuracy, 4),
+        'prediction_agreement': round(float(np.mean(keras_pred == tflite_pred)), 4),
+        'mean_abs_output_diff': round(float(diff.mean()), 6),
+        'max_abs_output_diff': round(float(diff.max()), 6)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output-dir', default=app_module.TFLITE_MODEL_DIR)
+    parser.add_argument('--calibration-dir', help='Representative images for full-integer calibration')
+    parser.add_argument('--calibration-limit', type=int, default=200)
+    parser.add_argument('--eval-dir', help='Labeled folder used to report accuracy drift')
+    parser.add_argument('--variants', nargs='+', choices=VARIANTS, default=list(VARIANTS))
+    args = parser.parse_args()
+
+    # Models load in the background by default (MODEL_LOAD_MODE)
+    if not app_module.wait_for_models():
+        print("[ERROR] Models not loaded; cannot export")
+        return 1
+    models = {'leaf': app_module.leaf_model, 'disease': app_module.disease_model}
+    for name, model in models.items():
+        if not isinstance(model, tf.keras.Model):
+            print(f"[ERROR] Keras {name} model not loaded; run with INFERENCE_BACKEND=keras")
+            return 1
+
+    calibration_paths = list_images(args.calibration_dir) if args.calibration_dir else []
+    variants = list(args.variants)
+    if 'int8' in variants and not calibration_paths:
+        print('[WARNING] No calibration images, skipping the int8 variant')
+        variants.remove('int8')
+
+    samples = load_labeled_images(args.eval_dir, app_module.CLASS_NAMES) if args.eval_dir else []
+    os.makedirs(args.output_dir, exist_ok=True)
+    report = {}
+
+    for name, model in models.items():
+        keras_size = os.path.getsize(app_module.LEAF_MODEL_PATH if name == 'leaf' else app_module.DISEASE_MODEL_PATH)
+        for variant in variants:
+            path = os.path.join(args.output_dir, f'{name}_{variant}.tflite')
+            flatbuffer = convert(model, variant, calibration_paths, args.calibration_limit)
+            with open(path, 'wb') as f:
+                f.write(flatbuffer)
+
+            entry = {'path': path, 'size_bytes': len(flatbuffer), 'keras_size_bytes': keras_size}
+            drift = evaluate_drift(name, model, TFLiteModel(path, name), samples) if samples else None
+            if drift:
+                entry['drift'] = drift
+            report[f'{name}_{variant}'] = entry
+
+            line = f"[OK] {name}_{variant}: {len(flatbuffer) / 1024:.0f} KB (keras {keras_size / 1024:.0f} KB)"
+            if drift:
+                line += (f", accuracy {drift['tflite_accuracy']*100:.2f}% "
+                         f"(drift {drift['accuracy_drift']*100:+.2f} pts), "
+                         f"agreement {drift['prediction_agreement']*100:.2f}%")
+            print(line)
+
+    report_path = os.path.join(args.output_dir, 'export_report.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {report_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
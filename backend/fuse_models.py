@@ -0,0 +1,155 @@
+"""
+Build a single "fused" model from the leaf detector and the disease model.
+
+The fused model takes one 224x224x3 batch and returns
+[leaf_probability (N, 1), disease_probabilities (N, classes)] in a single
+forward pass. When both models are a linear stack around the same backbone
+(same class, identical weights, e.g. a shared frozen MobileNetV2), the
+backbone is run once and both heads are attached to its features.
+Otherwise the two networks are stacked side by side in one graph.
+Either way the result is checked against the separate models before it is
+returned.
+
+Usage:
+    python fuse_models.py [--leaf-model PATH] [--disease-model PATH] [--output PATH]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import tensorflow as tf
+
+DEFAULT_TOLERANCE = 1e-4
+
+
+def _layer_chain(model):
+    """Layers of a single-input model in call order, without the InputLayer"""
+    return [layer for layer in model.layers if not isinstance(layer, tf.keras.layers.InputLayer)]
+
+
+def _split_backbone(model):
+    """
+    Split a linear model into (pre_layers, backbone, head_layers)
+
+    The backbone is the first nested Model in the layer chain; returns None
+    if the model has no nested backbone.
+    """
+    if len(model.inputs) != 1 or len(model.outputs) != 1:
+        return None
+    chain = _layer_chain(model)
+    for i, layer in enumerate(chain):
+        if isinstance(layer, tf.keras.Model):
+            return chain[:i], layer, chain[i + 1:]
+    return None
+
+
+def _same_weights(a, b) -> bool:
+    wa, wb = a.get_weights(), b.get_weights()
+    if type(a) is not type(b) or len(wa) != len(wb):
+        return False
+    return all(x.shape == y.shape and np.array_equal(x, y) for x, y in zip(wa, wb))
+
+
+def _apply(layers, x):
+    for layer in layers:
+        x = layer(x)
+    return x
+
+
+def _build_shared(leaf_model, disease_model):
+    leaf_split = _split_backbone(leaf_model)
+    disease_split = _split_backbone(disease_model)
+    if leaf_split is None or disease_split is None:
+        return None
+    leaf_pre, leaf_backbone, leaf_head = leaf_split
+    disease_pre, disease_backbone, disease_head = disease_split
+    if len(leaf_pre) != len(disease_pre):
+        return None
+    if not all(_same_weights(a, b) for a, b in zip(leaf_pre, disease_pre)):
+        return None
+    if not _same_weights(leaf_backbone, disease_backbone):
+        return None
+
+    inputs = tf.keras.Input(shape=tuple(disease_model.input_shape[1:]), name='image')
+    features = disease_backbone(_apply(disease_pre, inputs))
+    leaf_out = _apply(leaf_head, features)
+    disease_out = _apply(disease_head, features)
+    return tf.keras.Model(inputs, [leaf_out, disease_out], name='fused_shared_backbone')
+
+
+def _build_stacked(leaf_model, disease_model):
+    inputs = tf.keras.Input(shape=tuple(disease_model.input_shape[1:]), name='image')
+    return tf.keras.Model(inputs, [leaf_model(inputs), disease_model(inputs)], name='fused_stacked')
+
+
+def max_output_difference(fused_model, leaf_model, disease_model, batch):
+    """Largest absolute difference between fused and separate outputs on a batch"""
+    fused_leaf, fused_disease = fused_model(batch, training=False)
+    leaf = leaf_model(batch, training=False)
+    disease = disease_model(batch, training=False)
+    return max(
+        float(np.max(np.abs(np.asarray(fused_leaf) - np.asarray(leaf)))),
+        float(np.max(np.abs(np.asarray(fused_disease) - np.asarray(disease))))
+    )
+
+
+def build_fused_model(leaf_model, disease_model, tolerance=DEFAULT_TOLERANCE, probe_batch=None):
+    """
+    Combine the two models into one graph with outputs [leaf, disease]
+
+    Args:
+        leaf_model: Loaded leaf detector
+        disease_model: Loaded disease classifier
+        tolerance: Maximum allowed absolute output difference vs the separate models
+        probe_batch: Optional batch used for the equivalence check (random if omitted)
+
+    Returns:
+        (fused_model, mode) where mode is 'shared_backbone' or 'stacked'
+    """
+    if tuple(leaf_model.input_shape[1:]) != tuple(disease_model.input_shape[1:]):
+        raise ValueError(f"Input shapes differ: {leaf_model.input_shape} vs {disease_model.input_shape}")
+
+    if probe_batch is None:
+        probe_batch = np.random.default_rng(0).random((4,) + tuple(disease_model.input_shape[1:]), dtype=np.float32)
+
+    candidates = []
+    try:
+        shared = _build_shared(leaf_model, disease_model)
+        if shared is not None:
+            candidates.append((shared, 'shared_backbone'))
+    except Exception as e:
+        print(f"[WARNING] Shared-backbone fusion not possible: {str(e)}")
+    candidates.append((_build_stacked(leaf_model, disease_model), 'stacked'))
+
+    for fused, mode in candidates:
+        diff = max_output_difference(fused, leaf_model, disease_model, probe_batch)
+        if diff <= tolerance:
+            return fused, mode
+        print(f"[WARNING] {mode} fusion differs from separate models by {diff:.2e}, trying next option")
+    raise ValueError('Fused model does not match the separate models within tolerance')
+
+
+def main():
+    import app as app_module
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--leaf-model', default=app_module.LEAF_MODEL_PATH)
+    parser.add_argument('--disease-model', default=app_module.DISEASE_MODEL_PATH)
+    parser.add_argument('--output', default=app_module.FUSED_MODEL_PATH)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    leaf_model = tf.keras.models.load_model(args.leaf_model, compile=False)
+    disease_model = tf.keras.models.load_model(args.disease_model, compile=False)
+    fused, mode = build_fused_model(leaf_model, disease_model, tolerance=args.tolerance)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    fused.save(args.output)
+    print(f"[OK] Saved {mode} fused model to {args.output} ({fused.count_params():,} params, "
+          f"separate: {leaf_model.count_params() + disease_model.count_params():,})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Inference runners for the leaf and disease models.
+
+``model.predict`` builds a data adapter and a step function on every call,
+which dominates latency for single-image requests. CompiledModel traces the
+forward pass once as a ``tf.function`` with a fixed input signature (dynamic
+batch dimension) and reuses the concrete function for every call, falling
+back to ``model.predict`` if tracing or execution fails.
+
+TFLiteModel serves a converted .tflite file (see export_tflite.py) through
+``tf.lite.Interpreter`` with the same predict()/warmup()/info() interface.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+import tensorflow as tf
+
+logger = logging.getLogger('tomato.inference')
+
+
+class CompiledModel:
+    """
+    Wrap a loaded Keras model with a traced, warmed-up forward pass
+
+    Args:
+        model: Loaded Keras model
+        name: Label used in log messages and stats
+        compile_graph: Trace a tf.function; when False only model.predict is used
+    """
+
+    def __init__(self, model, name: str, compile_graph: bool = True):
+        self.model = model
+        self.name = name
+        self.input_shape = tuple(model.input_shape)
+        self._fn = None
+        self.fallback_reason = None
+
+        if compile_graph:
+            try:
+                spec = tf.TensorSpec(shape=(None,) + self.input_shape[1:], dtype=tf.float32)
+                fn = tf.function(lambda x: model(x, training=False), input_signature=[spec])
+                fn.get_concrete_function()
+                self._fn = fn
+            except Exception as e:
+                self.fallback_reason = f"tracing failed: {str(e)}"
+                logger.warning("Could not trace %s model, using model.predict: %s", name, e, exc_info=True)
+
+    @property
+    def compiled(self) -> bool:
+        return self._fn is not None
+
+    def predict(self, batch: np.ndarray):
+        """
+        Run the forward pass on a (N, H, W, C) batch
+
+        Returns:
+            numpy outputs (or a list of them for multi-output models)
+        """
+        if self._fn is not None:
+            try:
+                outputs = self._fn(tf.convert_to_tensor(batch, dtype=tf.float32))
+                return tf.nest.map_structure(lambda t: t.numpy(), outputs)
+            except Exception as e:
+                self._fn = None
+                self.fallback_reason = f"execution failed: {str(e)}"
+                logger.warning("Compiled %s model failed, falling back to model.predict: %s", self.name, e)
+        return self.model.predict(batch, verbose=0)
+
+    __call__ = predict
+
+    def warmup(self, batch_sizes=(1,)) -> float:
+        """
+        Run dummy batches so the first real request doesn't pay graph setup
+
+        Returns:
+            Total warm-up time in seconds
+        """
+        started = time.perf_counter()
+        for n in batch_sizes:
+            self.predict(np.zeros((n,) + self.input_shape[1:], dtype=np.float32))
+        return time.perf_counter() - started
+
+    def info(self) -> dict:
+        return {
+            'name': self.name,
+            'backend': 'keras',
+            'compiled': self.compiled,
+            'fallback_reason': self.fallback_reason
+        }
+
+
+class TFLiteModel:
+    """
+    Serve a .tflite model through tf.lite.Interpreter
+
+    Quantized (int8/uint8) inputs and outputs are converted using the tensor's
+    scale and zero point, so callers always pass and receive float32.
+    The interpreter keeps its exported batch size of 1 and batches are run
+    row by row: resizing the input tensor makes the XNNPACK delegate abort
+    when the interpreter is destroyed.
+
+    Args:
+        model_path: Path to the .tflite file
+        name: Label used in log messages and stats
+        num_threads: Interpreter thread count (None lets TFLite decide)
+    """
+
+    def __init__(self, model_path: str, name: str, num_threads: int = None):
+        self.model_path = model_path
+        self.name = name
+        self.num_threads = num_threads
+        self._interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._outputs = self._interpreter.get_output_details()
+        # The interpreter is stateful, so calls from different threads are serialized
+        self._lock = threading.Lock()
+
+        shape = [int(d) for d in self._input['shape']]
+        self.input_shape = (None,) + tuple(shape[1:])
+        output_shapes = [(None,) + tuple(int(d) for d in o['shape'][1:]) for o in self._outputs]
+        self.output_shape = output_shapes[0] if len(output_shapes) == 1 else output_shapes
+
+    @staticmethod
+    def _quantize(batch, details):
+        scale, zero_point = details['quantization']
+        if details['dtype'] in (np.int8, np.uint8) and scale:
+            info = np.iinfo(details['dtype'])
+            return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(details['dtype'])
+        return batch.astype(details['dtype'], copy=False)
+
+    @staticmethod
+    def _dequantize(values, details):
+        scale, zero_point = details['quantization']
+        if details['dtype'] in (np.int8, np.uint8) and scale:
+            return (values.astype(np.float32) - zero_point) * scale
+        return values.astype(np.float32, copy=False)
+
+    def predict(self, batch: np.ndarray):
+        """
+        Run the interpreter on a (N, H, W, C) float32 batch
+
+        Returns:
+            numpy outputs (or a list of them for multi-output models)
+        """
+        rows = [[] for _ in self._outputs]
+        with self._lock:
+            for i in range(len(batch)):
+                self._interpreter.set_tensor(self._input['index'], self._quantize(batch[i:i + 1], self._input))
+                self._interpreter.invoke()
+                for j, o in enumerate(self._outputs):
+                    rows[j].append(self._interpreter.get_tensor(o['index']))
+        outputs = [self._dequantize(np.concatenate(r), o) for r, o in zip(rows, self._outputs)]
+        return outputs[0] if len(outputs) == 1 else outputs
+
+    __call__ = predict
+
+    def warmup(self, batch_sizes=(1,)) -> float:
+        started = time.perf_counter()
+        for n in batch_sizes:
+            self.predict(np.zeros((n,) + self.input_shape[1:], dtype=np.float32))
+        return time.perf_counter() - started
+
+    def info(self) -> dict:
+        return {
+            'name': self.name,
+            'backend': 'tflite',
+            'path': self.model_path,
+            'num_threads': self.num_threads,
+            'input_dtype': np.dtype(self._input['dtype']).name
+        }
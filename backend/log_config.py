@@ -0,0 +1,77 @@
+"""
+Leveled, asynchronous logging for the API.
+
+Modules log to loggers under 'tomato' (e.g. logging.getLogger('tomato.app')).
+configure_logging() puts a QueueHandler on that logger, so a request thread
+only enqueues the record; a QueueListener thread formats it and writes it
+to stderr. LOG_LEVEL=off drops everything before a record is even built.
+
+Configuration (environment):
+    LOG_LEVEL   debug, info, warning, error or off (default: info)
+    LOG_ASYNC   1 to write from a background thread (default), 0 to write inline
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'info').lower()
+LOG_ASYNC = os.environ.get('LOG_ASYNC', '1') == '1'
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+ROOT_LOGGER = 'tomato'
+
+_listener = None
+
+
+def configure_logging(level: str = None, asynchronous: bool = None, stream=None) -> logging.Logger:
+    """
+    Set up the 'tomato' logger (safe to call again; the last call wins)
+
+    Args:
+        level: Level name or 'off' (default: LOG_LEVEL)
+        asynchronous: Write from a listener thread (default: LOG_ASYNC)
+        stream: Where records are written (default: sys.stderr)
+
+    Returns:
+        The 'tomato' logger
+    """
+    global _listener
+    level = (level or LOG_LEVEL).lower()
+    asynchronous = LOG_ASYNC if asynchronous is None else asynchronous
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    stop_logging()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.propagate = False
+
+    if level in ('off', 'none', 'disabled'):
+        logger.setLevel(logging.CRITICAL + 1)
+        logger.addHandler(logging.NullHandler())
+        return logger
+    logger.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    if asynchronous:
+        records = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(records))
+        _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+    else:
+        logger.addHandler(output)
+    return logger
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,195 @@
+"""
+Process-wide counters and latency histograms in the Prometheus text format.
+
+Every timing.span() feeds the stage latency histogram, so the stages shown
+in Server-Timing headers and on /api/inference-stats are also available
+as histograms on /metrics. Counters and histograms may carry labels; keep
+label values to small fixed sets (stage names, endpoints, reasons).
+
+Kept free of third-party imports so any process can use it.
+"""
+import threading
+from typing import Callable, Dict, List, Tuple
+
+# Seconds; covers a cached lookup (~0.1 ms) up to a cold batched forward pass
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry_lock = threading.Lock()
+_registry: List['_Metric'] = []
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    """
+    Monotonic count, optionally split by labels
+
+    Args:
+        name: Metric name (by convention ending in _total)
+        documentation: HELP text
+        labelnames: Label names; inc() must then be given a value for each
+    """
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in fixed cumulative buckets
+
+    Args:
+        name: Metric name (by convention ending in the unit, e.g. _seconds)
+        documentation: HELP text
+        labelnames: Label names; observe() must then be given a value for each
+        buckets: Ascending upper bounds; +Inf is added
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, **labels) -> Dict:
+        """Cumulative bucket counts, sum and count for one label combination"""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            counts, total, count = (list(series[0]), series[1], series[2]) if series else \
+                ([0] * (len(self.buckets) + 1), 0.0, 0)
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return {'buckets': dict(zip(self.buckets + (float('inf'),), cumulative)), 'sum': total, 'count': count}
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        for key, (counts, total, count) in items:
+            running = 0
+            for bound, c in zip(self.buckets + (float('inf'),), counts):
+                running += c
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {running}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    Current value read from a callback at scrape time
+
+    Args:
+        name: Metric name
+        documentation: HELP text
+        callback: Returns the value, or a dict of label value tuple -> value when labelnames are given
+        labelnames: Label names of the dict keys returned by callback
+    """
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, callback: Callable, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        try:
+            value = self.callback()
+        except Exception:
+            return lines
+        if value is None:
+            return lines
+        items = sorted(value.items()) if self.labelnames else [((), value)]
+        for key, v in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, tuple(key))} {_format_value(v)}')
+        return lines
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format (version 0.0.4)"""
+    with _registry_lock:
+        registered = list(_registry)
+    lines = []
+    for metric in registered:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Shared by every module; timing.record() observes each span here
+STAGE_SECONDS = Histogram('tomato_stage_duration_seconds', 'Time spent per request pipeline stage', ('stage',))
+ERRORS = Counter('tomato_errors_total', 'Failures by the pipeline stage they happened in', ('stage',))
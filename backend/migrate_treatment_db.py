@@ -0,0 +1,77 @@
+"""
+Bring an existing tomato_treatments.db up to the current treatment_database.sql schema.
+
+Adds the generated diseases.normalized_name column and the indexes the
+per-request recommendation queries rely on, refreshes the planner
+statistics and switches the file to WAL journaling, so catalog updates
+don't block the API's pooled read-only connections (see db_pool.py).
+Safe to run more than once.
+
+Usage:
+    python migrate_treatment_db.py [path/to/tomato_treatments.db]
+"""
+import os
+import sqlite3
+import sys
+
+DEFAULT_DB_PATH = os.environ.get(
+    'TREATMENT_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tomato_treatments.db'))
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_diseases_normalized_name ON diseases(normalized_name)",
+    "CREATE INDEX IF NOT EXISTS idx_severity_mapping_severity "
+    "ON treatment_severity_mapping(severity_id, is_recommended, treatment_id)",
+    "CREATE INDEX IF NOT EXISTS idx_severity_mapping_treatment "
+    "ON treatment_severity_mapping(treatment_id, severity_id, is_recommended)",
+)
+
+
+def migrate(db_path):
+    """
+    Returns:
+        List of the changes applied (empty if the DB was already current)
+    """
+    applied = []
+    conn = sqlite3.connect(db_path)
+    try:
+        # table_xinfo (unlike table_info) lists generated columns
+        columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(diseases)")}
+        if 'normalized_name' not in columns:
+            conn.execute("ALTER TABLE diseases ADD COLUMN normalized_name VARCHAR(100) "
+                         "GENERATED ALWAYS AS (REPLACE(disease_name, '_', ' ')) VIRTUAL")
+            applied.append('diseases.normalized_name')
+
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        for statement in INDEXES:
+            name = statement.split('EXISTS ')[1].split()[0]
+            if name not in existing:
+                conn.execute(statement)
+                applied.append(name)
+
+        if applied:
+            conn.execute("ANALYZE")
+        conn.commit()
+
+        if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() != 'wal':
+            conn.execute("PRAGMA journal_mode = WAL")
+            applied.append('journal_mode=WAL')
+    finally:
+        conn.close()
+    return applied
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_PATH
+    if not os.path.exists(db_path):
+        print(f"[ERROR] Treatment database not found at {db_path}")
+        return 1
+    applied = migrate(db_path)
+    if applied:
+        print(f"[OK] Migrated {db_path}: added {', '.join(applied)}")
+    else:
+        print(f"[OK] {db_path} is already up to date")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+Versioned model registry with hot reload.
+
+A ModelSet is one loaded version of the models together with everything
+built for it (runners, micro-batchers, worker pool, prediction caches).
+The registry holds the active set. A reload builds and warms a new set in
+the background while the old one keeps serving, then swaps it in with a
+single reference assignment. Requests hold the set they started with
+(acquire(), or hold() for streamed responses), so a request never mixes
+versions and is never cut off; the old set is closed once its last request
+has finished.
+
+Reloads are triggered by reload() (e.g. from an admin endpoint) or by a
+watcher thread that polls a fingerprint of the model files and reloads
+once a changed fingerprint has been stable for one poll interval.
+"""
+import gc
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger('tomato.models')
+
+_request_set: ContextVar = ContextVar('model_set', default=None)
+
+
+class ModelSet:
+    """
+    One loaded version of the models
+
+    Args:
+        version: Version string (e.g. a fingerprint of the model files)
+        models: Model name -> loaded model
+        runners: Model name -> runner used for inference (CompiledModel, TFLiteModel, ...)
+        batchers: Model name -> MicroBatcher in front of the runner
+        prediction_cache: Exact-upload cache for results of this version
+        perceptual_cache: Near-duplicate cache for results of this version
+        pool: InferenceWorkerPool serving these models, if any
+        load_seconds: Time it took to load and warm up
+    """
+
+    def __init__(self, version: str, models: Dict, runners: Dict = None, batchers: Dict = None,
+                 prediction_cache=None, perceptual_cache=None, pool=None, load_seconds: float = None):
+        self.version = version
+        self.models = models
+        self.runners = runners or {}
+        self.batchers = batchers or {}
+        self.prediction_cache = prediction_cache
+        self.perceptual_cache = perceptual_cache
+        self.pool = pool
+        self.load_seconds = load_seconds
+        self.loaded_at = datetime.now().isoformat()
+        self.in_flight = 0
+        self.closed = False
+
+    def get(self, name: str):
+        return self.models.get(name)
+
+    def has(self, *names) -> bool:
+        return all(self.models.get(name) is not None for name in names)
+
+    def find(self, model):
+        """(runner, batcher) for a model of this set, or None if it isn't one"""
+        for name, candidate in self.models.items():
+            if candidate is model:
+                return self.runners.get(name), self.batchers.get(name)
+        return None
+
+    def close(self):
+        """Stop the batchers and worker pool and drop the models"""
+        for batcher in self.batchers.values():
+            batcher.stop()
+        if self.pool is not None:
+            self.pool.close()
+        self.models, self.runners, self.batchers = {}, {}, {}
+        self.prediction_cache = self.perceptual_cache = self.pool = None
+        self.closed = True
+
+    def info(self) -> Dict:
+        return {
+            'version': self.version,
+            'models': sorted(name for name, model in self.models.items() if model is not None),
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+            'in_flight': self.in_flight
+        }
+
+
+class ModelRegistry:
+    """
+    Holds the active ModelSet and replaces it without downtime
+
+    Args:
+        builder: Loads and warms a new ModelSet (runs in a background thread on reload)
+        fingerprint: Cheap version string of the model files on disk, polled by the watcher
+        required: Models a reloaded set must have to be swapped in
+        reload_interval: Seconds between fingerprint checks (0 disables the watcher)
+        drain_timeout: Seconds to wait for requests on a replaced set before closing it anyway
+    """
+
+    def __init__(self, builder: Callable[[], ModelSet], fingerprint: Callable[[], str] = None,
+                 required=('leaf', 'disease'), reload_interval: float = 0, drain_timeout: float = 60):
+        self.builder = builder
+        self.fingerprint = fingerprint
+        self.required = tuple(required)
+        self.reload_interval = reload_interval
+        self.drain_timeout = drain_timeout
+
+        self.active: Optional[ModelSet] = None
+        self._draining: List[ModelSet] = []
+        self._cond = threading.Condition()
+        self._reload_lock = threading.Lock()
+        self._reloading = False
+        self._listeners: List[Callable[[ModelSet], None]] = []
+        self._loaded_fingerprint = None
+        self._pending_fingerprint = None
+        self._failed_fingerprint = None
+        self._stop = threading.Event()
+        self._watcher = None
+
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error = None
+        self.history: List[Dict] = []
+
+    def add_listener(self, callback: Callable[[ModelSet], None]):
+        """Call callback(new_set) after every swap"""
+        self._listeners.append(callback)
+
+    def current(self) -> Optional[ModelSet]:
+        """The set held by the running request, else the active one"""
+        return _request_set.get() or self.active
+
+    @contextmanager
+    def acquire(self):
+        """
+        Pin the active set for the duration of a with-block (a request)
+
+        Nested acquire() calls reuse the outer set. Yields None before the first load.
+        """
+        outer = _request_set.get()
+        if outer is not None:
+            yield outer
+            return
+        with self.hold() as model_set, self.use(model_set):
+            yield model_set
+
+    @contextmanager
+    def hold(self):
+        """
+        Keep the active set serving (not closed after a swap) for the duration of a with-block
+
+        Unlike acquire(), the set is not bound to the current context, so the block may
+        yield in between, as a streamed response does; bind it with use() around each
+        piece of work. Yields None before the first load.
+        """
+        with self._cond:
+            model_set = self.active
+            if model_set is not None:
+                model_set.in_flight += 1
+        try:
+            yield model_set
+        finally:
+            if model_set is not None:
+                with self._cond:
+                    model_set.in_flight -= 1
+                    self._cond.notify_all()
+
+    @contextmanager
+    def use(self, model_set: Optional[ModelSet]):
+        """Serve the with-block, including nested acquire() calls, from a set obtained by hold()"""
+        token = _request_set.set(model_set)
+        try:
+            yield model_set
+        finally:
+            _request_set.reset(token)
+
+    def find(self, model):
+        """(runner, batcher) for a model of the active or a draining set"""
+        with self._cond:
+            sets = [self.active] + self._draining
+        for model_set in sets:
+            if model_set is not None:
+                found = model_set.find(model)
+                if found is not None:
+                    return found
+        return None
+
+    @property
+    def reloading(self) -> bool:
+        return self._reloading
+
+    def load(self, reason: str = 'manual') -> bool:
+        """
+        Build a new set and swap it in (in the calling thread)
+
+        The first load is always swapped in, so a partly loaded set can still serve;
+        later ones only when every required model loaded.
+
+        Returns:
+            True if the new set is now active
+        """
+        with self._reload_lock:
+            self._reloading = True
+            try:
+                fingerprint = self.fingerprint() if self.fingerprint else None
+                started = time.perf_counter()
+                try:
+                    new_set = self.builder()
+                except Exception as e:
+                    new_set = None
+                    error = f'{type(e).__name__}: {e}'
+                else:
+                    missing = [name for name in self.required if new_set.get(name) is None]
+                    error = f"models not loaded: {', '.join(missing)}" if missing else None
+
+                if new_set is None or (error and self.active is not None):
+                    if new_set is not None:
+                        new_set.close()
+                    self.failed_reloads += 1
+                    self.last_error = error
+                    self._failed_fingerprint = fingerprint
+                    logger.error("Model reload (%s) failed, keeping version %s: %s",
+                                 reason, self.active.version if self.active else None, error)
+                    return False
+
+                new_set.load_seconds = round(time.perf_counter() - started, 2)
+                self._loaded_fingerprint = fingerprint
+                self._failed_fingerprint = None
+                self.last_error = error
+                self._swap(new_set, reason)
+                return True
+            finally:
+                self._reloading = False
+
+    def reload(self, reason: str = 'manual', wait: bool = False) -> bool:
+        """
+        Load a new version in a background thread (or the calling one with wait=True)
+
+        Returns:
+            With wait, whether the new set was swapped in; otherwise whether a reload was started
+            (False if one is already running)
+        """
+        if wait:
+            return self.load(reason)
+        if self._reloading:
+            return False
+        self._reloading = True  # until the thread takes the lock
+        threading.Thread(target=self.load, args=(reason,), name='model-reload', daemon=True).start()
+        return True
+
+    def _swap(self, new_set: ModelSet, reason: str):
+        with self._cond:
+            old = self.active
+            self.active = new_set
+            if old is not None:
+                self._draining.append(old)
+        self.reloads += 1
+        self.history.append({
+            'version': new_set.version,
+            'loaded_at': new_set.loaded_at,
+            'load_seconds': new_set.load_seconds,
+            'reason': reason
+        })
+        del self.history[:-10]
+        logger.info("Model version %s active (%s, loaded in %ss)%s", new_set.version, reason, new_set.load_seconds,
+                    f", draining {old.version}" if old is not None else "")
+        for callback in self._listeners:
+            try:
+                callback(new_set)
+            except Exception as e:
+                logger.warning("Model swap listener failed: %s", e)
+        if old is not None:
+            threading.Thread(target=self._drain, args=(old,), name='model-drain', daemon=True).start()
+
+    def _drain(self, old: ModelSet):
+        deadline = time.monotonic() + self.drain_timeout
+        with self._cond:
+            while old.in_flight > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("Closing model version %s with %d requests still running", old.version, old.in_flight)
+                    break
+                self._cond.wait(remaining)
+            self._draining.remove(old)
+        old.close()
+        gc.collect()
+        logger.info("Model version %s drained and released", old.version)
+
+    def start(self):
+        """Start the file watcher (no-op when reload_interval is 0 or there is no fingerprint)"""
+        if self.reload_interval <= 0 or self.fingerprint is None or self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                logger.warning("Model file check failed: %s", e)
+
+    def check_for_changes(self) -> bool:
+        """
+        Reload when the model files changed and have been stable since the previous check
+
+        Returns:
+            True if a reload was started
+        """
+        fingerprint = self.fingerprint()
+        if fingerprint in (self._loaded_fingerprint, self._failed_fingerprint) or self._reloading:
+            self._pending_fingerprint = None
+            return False
+        if fingerprint != self._pending_fingerprint:
+            # Possibly still being copied; wait one more interval
+            self._pending_fingerprint = fingerprint
+            return False
+        self._pending_fingerprint = None
+        return self.reload('model files changed')
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def close(self):
+        """Stop watching and close every set"""
+        self.stop()
+        with self._cond:
+            sets = [self.active] + self._draining
+            self.active = None
+            self._draining = []
+        for model_set in sets:
+            if model_set is not None:
+                model_set.close()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'active': self.active.info() if self.active is not None else None,
+                'draining': [s.info() for s in self._draining],
+                'reloading': self._reloading,
+                'reloads': self.reloads,
+                'failed_reloads': self.failed_reloads,
+                'last_error': self.last_error,
+                'watch_interval': self.reload_interval,
+                'history': list(self.history)
+            }
@@ -0,0 +1,171 @@
+"""
+Near-duplicate cache for disease predictions, keyed by a perceptual hash.
+
+Messaging apps re-compress and resize photos, so the same leaf often comes
+back with different bytes. A 64-bit difference hash (dHash) of the decoded
+image barely changes under such edits; results are looked up by Hamming
+distance using multi-index hashing: the hash is split into 4 chunks of 16
+bits, and any stored hash within distance r of the query must match at
+least one chunk within distance r // 4 (pigeonhole), so a lookup only
+probes a handful of buckets however many entries are stored.
+"""
+import threading
+from collections import OrderedDict
+from itertools import combinations
+from typing import Dict, List, NamedTuple, Optional
+
+from PIL import Image
+
+HASH_BITS = 64
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def dhash(image, hash_size: int = 8) -> int:
+    """
+    Difference hash of a PIL image: 1 bit per horizontally adjacent pixel pair
+    of a (hash_size+1) x hash_size grayscale thumbnail
+    """
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    width = hash_size + 1
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _chunks(value: int) -> List[int]:
+    return [(value >> (i * CHUNK_BITS)) & CHUNK_MASK for i in range(CHUNKS)]
+
+
+def _neighbours(chunk: int, radius: int):
+    """All CHUNK_BITS-bit values within Hamming distance radius of chunk"""
+    yield chunk
+    for r in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), r):
+            flipped = chunk
+            for bit in bits:
+                flipped ^= 1 << bit
+            yield flipped
+
+
+class Match(NamedTuple):
+    value: Dict
+    distance: int
+    hash: int
+
+
+class PerceptualCache:
+    """
+    LRU cache of results indexed by 64-bit perceptual hash
+
+    Args:
+        namespace: Model/threshold version; changing it drops every entry
+        max_distance: Largest Hamming distance (0-64) still treated as the same photo
+        max_entries: Entry limit before least-recently-used entries are evicted
+    """
+
+    def __init__(self, namespace: str, max_distance: int = 4, max_entries: int = 200000):
+        self.max_distance = max(0, min(HASH_BITS, int(max_distance)))
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._tables: List[Dict[int, set]] = [dict() for _ in range(CHUNKS)]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.distance_counts: Dict[int, int] = {}
+        self.namespace = None
+        self.set_namespace(namespace)
+
+    def set_namespace(self, namespace: str):
+        with self._lock:
+            if namespace == self.namespace:
+                return
+            self.namespace = namespace
+            self._entries.clear()
+            self._tables = [dict() for _ in range(CHUNKS)]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _search(self, value: int, max_distance: int) -> Optional[Match]:
+        best = None
+        best_distance = max_distance + 1
+        sub_radius = max_distance // CHUNKS
+        seen = set()
+        for table, chunk in zip(self._tables, _chunks(value)):
+            for probe in _neighbours(chunk, sub_radius):
+                bucket = table.get(probe)
+                if not bucket:
+                    continue
+                for candidate in bucket:
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    distance = hamming(value, candidate)
+                    if distance < best_distance:
+                        best, best_distance = candidate, distance
+                        if distance == 0:
+                            return Match(self._entries[best], 0, best)
+        if best is None:
+            return None
+        return Match(self._entries[best], best_distance, best)
+
+    def lookup(self, value: int, max_distance: int = None) -> Optional[Match]:
+        """Closest stored entry within max_distance (defaults to the configured threshold)"""
+        max_distance = self.max_distance if max_distance is None else max_distance
+        with self._lock:
+            match = self._search(value, max_distance)
+            if match is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(match.hash)
+            self.hits += 1
+            self.distance_counts[match.distance] = self.distance_counts.get(match.distance, 0) + 1
+            return match
+
+    def add(self, value: int, result: Dict):
+        with self._lock:
+            if value in self._entries:
+                self._entries[value] = result
+                self._entries.move_to_end(value)
+                return
+            self._entries[value] = result
+            for table, chunk in zip(self._tables, _chunks(value)):
+                table.setdefault(chunk, set()).add(value)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._remove_from_tables(evicted)
+                self.evictions += 1
+
+    def _remove_from_tables(self, value: int):
+        for table, chunk in zip(self._tables, _chunks(value)):
+            bucket = table.get(chunk)
+            if bucket is not None:
+                bucket.discard(value)
+                if not bucket:
+                    del table[chunk]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'namespace': self.namespace,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'max_distance': self.max_distance,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'hit_distance_histogram': {str(k): v for k, v in sorted(self.distance_counts.items())}
+            }
@@ -0,0 +1,277 @@
+"""
+Content-addressed cache for prediction results.
+
+Entries are keyed by a SHA-256 of the raw upload bytes together with a
+namespace string that encodes the model versions and thresholds in use, so
+a changed model or threshold can never serve a stale result. Values are
+stored as compact JSON bytes in an in-memory LRU bounded by entry count and
+total bytes, with an optional on-disk tier that survives restarts.
+
+The disk tier may be shared by several processes (replicas, or a model
+version still draining beside its successor), so it is bounded per
+namespace by its own entry/byte caps, evicting the least recently used
+files by mtime, and a namespace directory is only removed by the cache
+that created it or once nobody has touched it for disk_ttl seconds.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger('tomato.cache')
+
+
+class PredictionCache:
+    """
+    Two-tier (memory LRU + optional disk) cache of JSON-serializable results
+
+    Args:
+        namespace: Model/threshold version string; changing it invalidates the cache
+        max_entries: Maximum number of entries kept in memory
+        max_bytes: Maximum total size of the serialized entries kept in memory
+        disk_dir: Directory for the persistent tier (None disables it)
+        disk_max_entries: Maximum number of entries kept on disk per namespace
+        disk_max_bytes: Maximum total size of the entries kept on disk per namespace
+        disk_ttl: Seconds after which another cache's idle namespace directory is removed
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 2048, max_bytes: int = 64 * 1024 * 1024,
+                 disk_dir: Optional[str] = None, disk_max_entries: int = 16384,
+                 disk_max_bytes: int = 256 * 1024 * 1024, disk_ttl: float = 7 * 24 * 3600):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.disk_dir = disk_dir
+        self.disk_max_entries = max(1, int(disk_max_entries))
+        self.disk_max_bytes = max(1, int(disk_max_bytes))
+        self.disk_ttl = disk_ttl
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Disk usage of the current namespace as last counted (other processes may add to it)
+        self._disk_entries = 0
+        self._disk_bytes = 0
+        self._disk_evict_lock = threading.Lock()
+        self._created_namespaces = set()
+        self.disk_evictions = 0
+
+        self.namespace = None
+        self.set_namespace(namespace)
+
+    @staticmethod
+    def fingerprint(*parts) -> str:
+        """Short stable hash of the given values, for building namespaces"""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+    def make_key(self, image_bytes, kind: str) -> str:
+        """Cache key for an upload; kind separates endpoints that cache different shapes"""
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return f'{kind}-{digest}'
+
+    def set_namespace(self, namespace: str):
+        """Switch to a new model/threshold version, dropping everything cached for the old one"""
+        with self._lock:
+            if namespace == self.namespace:
+                return
+            if self.namespace is not None:
+                self.invalidations += 1
+            self.namespace = namespace
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk_dir:
+            namespace_dir = self._namespace_dir()
+            if not os.path.isdir(namespace_dir):
+                self._created_namespaces.add(namespace)
+            try:
+                os.makedirs(namespace_dir, exist_ok=True)
+                os.utime(namespace_dir)
+            except OSError as e:
+                logger.warning("Could not create prediction cache directory: %s", e)
+            self._count_disk()
+            self._prune_disk()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(data)
+
+        data = self._read_disk(key) if self.disk_dir else None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, data)
+        return json.loads(data)
+
+    def put(self, key: str, value: Dict):
+        data = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        with self._lock:
+            self._store(key, data)
+        if self.disk_dir:
+            self._write_disk(key, data)
+
+    def clear(self):
+        """Drop all entries (memory and disk) without changing the namespace"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.invalidations += 1
+        if self.disk_dir:
+            shutil.rmtree(self._namespace_dir(), ignore_errors=True)
+            with self._lock:
+                self._disk_entries = self._disk_bytes = 0
+
+    def _store(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[key] = data
+        self._bytes += len(data)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def _namespace_dir(self) -> str:
+        return os.path.join(self.disk_dir, self.namespace)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self._namespace_dir(), key[-2:], f'{key}.json')
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # The mtime orders entries for eviction (least recently used first)
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        path = self._disk_path(key)
+        try:
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = None
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            # Marks the namespace as in use for other caches' _prune_disk()
+            os.utime(self._namespace_dir())
+        except OSError as e:
+            logger.warning("Could not write prediction cache entry to disk: %s", e)
+            return
+        with self._lock:
+            if replaced is None:
+                self._disk_entries += 1
+            self._disk_bytes += len(data) - (replaced or 0)
+            over = self._disk_entries > self.disk_max_entries or self._disk_bytes > self.disk_max_bytes
+        if over:
+            self._evict_disk()
+
+    def _disk_files(self):
+        """(mtime, size, path) of every entry of the current namespace on disk"""
+        files = []
+        for root, _, names in os.walk(self._namespace_dir()):
+            for name in names:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # evicted by another process meanwhile
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _count_disk(self):
+        files = self._disk_files()
+        with self._lock:
+            self._disk_entries = len(files)
+            self._disk_bytes = sum(size for _, size, _ in files)
+
+    def _evict_disk(self):
+        """Delete the least recently used entries on disk until the namespace is at 90% of its caps"""
+        # One scan at a time; writes racing with it are counted by the next one
+        if not self._disk_evict_lock.acquire(blocking=False):
+            return
+        try:
+            files = sorted(self._disk_files())
+            entries, size = len(files), sum(size for _, size, _ in files)
+            evicted = 0
+            for _, file_size, path in files:
+                if entries <= self.disk_max_entries * 0.9 and size <= self.disk_max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                entries -= 1
+                size -= file_size
+                evicted += 1
+            with self._lock:
+                self._disk_entries, self._disk_bytes = entries, size
+                self.disk_evictions += evicted
+        finally:
+            self._disk_evict_lock.release()
+
+    def _prune_disk(self):
+        """
+        Remove other namespaces' directories that this cache created (its own older
+        versions) or that have been idle for disk_ttl seconds; other processes or a
+        draining model version may still be using the rest
+        """
+        try:
+            cutoff = time.time() - self.disk_ttl
+            for name in os.listdir(self.disk_dir):
+                path = os.path.join(self.disk_dir, name)
+                if name == self.namespace or not os.path.isdir(path):
+                    continue
+                if name in self._created_namespaces or os.stat(path).st_mtime < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                    self._created_namespaces.discard(name)
+        except OSError as e:
+            logger.warning("Could not prune prediction cache directory: %s", e)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'namespace': self.namespace,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'disk_tier': bool(self.disk_dir),
+                'disk_entries': self._disk_entries,
+                'disk_bytes': self._disk_bytes,
+                'disk_evictions': self.disk_evictions,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,185 @@
+"""
+Image preprocessing shared by the API, the batch endpoints and offline tools.
+
+Kept free of TensorFlow so that decode workers (e.g. the bulk_score.py
+process pool) can import it without loading the models.
+
+open_image() reads only the header before checking the pixel count, then
+lets the JPEG decoder scale down in the DCT domain (Image.draft) to the
+smallest 1/2, 1/4 or 1/8 scale that still leaves DRAFT_OVERSAMPLE times the
+model input in both dimensions, so a 12-48 MP phone photo is never decoded
+at full resolution.
+"""
+import io
+import mmap
+import os
+import threading
+
+import numpy as np
+from PIL import Image, ImageOps
+
+import timing
+
+DEFAULT_IMG_SIZE = (224, 224)
+
+# Uploads with more pixels than this are refused after reading the header, before decoding
+MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 64_000_000))
+# Reduced-size JPEG decode; the decoded image keeps at least DRAFT_OVERSAMPLE x the model input size
+DRAFT_DECODE = os.environ.get('DRAFT_DECODE', '1') == '1'
+DRAFT_OVERSAMPLE = float(os.environ.get('DRAFT_OVERSAMPLE', 2))
+
+
+class ImageTooLarge(ValueError):
+    """The image header announces more than MAX_IMAGE_PIXELS pixels"""
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Seekable binary file over a bytes-like object (bytes, memoryview, mmap)
+
+    Unlike io.BytesIO(buffer), which copies anything that isn't bytes, only the
+    chunks the decoder asks for are copied out.
+    """
+
+    def __init__(self, buffer):
+        super().__init__()
+        self._view = memoryview(buffer).cast('B')
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        if base + offset < 0:
+            raise ValueError('negative seek position')
+        self._pos = base + offset
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+def open_image(source, img_size=DEFAULT_IMG_SIZE, draft=None, max_pixels=None):
+    """
+    Open and decode an upload at the smallest resolution preprocessing needs
+
+    Args:
+        source: Upload as bytes or another bytes-like object (memoryview, mmap), a path
+            or a binary file object
+        img_size: Model input size (width, height) the image will be resized to
+        draft: Use reduced-size JPEG decoding (default: DRAFT_DECODE)
+        max_pixels: Pixel limit checked before decoding (default: MAX_IMAGE_PIXELS)
+
+    Returns:
+        Loaded PIL Image, upright according to its EXIF orientation
+
+    Raises:
+        ImageTooLarge: The header announces more than max_pixels pixels
+    """
+    draft = DRAFT_DECODE if draft is None else draft
+    max_pixels = MAX_IMAGE_PIXELS if max_pixels is None else max_pixels
+    # Reads the header only
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)  # shares the bytes object, no copy
+    elif isinstance(source, (bytearray, memoryview, mmap.mmap)):
+        source = BufferReader(source)
+    image = Image.open(source)
+    width, height = image.size
+    if width * height > max_pixels:
+        image.close()
+        raise ImageTooLarge(f'Image has {width}x{height} pixels (limit {max_pixels:,})')
+    with timing.span('decode'):
+        if draft and image.format == 'JPEG':
+            # The target is square-ish, so it doesn't matter that draft() sees the stored,
+            # not yet EXIF-rotated, orientation
+            side = int(max(img_size) * DRAFT_OVERSAMPLE)
+            image.draft('RGB', (side, side))
+        image.load()
+        # Only touches the pixels (transpose) when the photo was taken rotated
+        ImageOps.exif_transpose(image, in_place=True)
+        return image
+
+
+def decode_image(image, img_size=DEFAULT_IMG_SIZE):
+    """
+    Convert to RGB and resize the image (decoding it first unless open_image() already did)
+
+    Args:
+        image: PIL Image object
+        img_size: Target size tuple (width, height)
+
+    Returns:
+        uint8 numpy array of shape (height, width, 3)
+    """
+    with timing.span('resize'):
+        # Convert to RGB if needed
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # Resize image
+        image = image.resize(img_size)
+        return np.asarray(image, dtype=np.uint8)
+
+
+def normalize_image(pixels, out=None):
+    """
+    Scale decoded pixels to [0,1] float32 with a batch dimension
+
+    Args:
+        pixels: uint8 array from decode_image()
+        out: Optional float32 buffer of shape (1, height, width, 3) to write into
+
+    Returns:
+        float32 numpy array of shape (1, height, width, 3)
+    """
+    with timing.span('preprocess'):
+        if out is None:
+            out = np.empty((1,) + pixels.shape, dtype=np.float32)
+        np.divide(pixels, np.float32(255.0), out=out[0], dtype=np.float32)
+        return out
+
+
+_preprocess_buffers = threading.local()
+
+
+def get_preprocess_buffer(img_size=DEFAULT_IMG_SIZE):
+    """
+    Per-thread reusable input buffer, so a request preprocesses without allocating
+
+    The buffer is overwritten by the next preprocess on the same thread; copy it
+    if the tensor has to outlive the current request.
+    """
+    shape = (1, img_size[1], img_size[0], 3)
+    buffer = getattr(_preprocess_buffers, 'buffer', None)
+    if buffer is None or buffer.shape != shape:
+        buffer = np.empty(shape, dtype=np.float32)
+        _preprocess_buffers.buffer = buffer
+    return buffer
+
+
+def preprocess_image(image, img_size=DEFAULT_IMG_SIZE, out=None):
+    """
+    Preprocess the image for model prediction
+    
+    Args:
+        image: PIL Image object
+        img_size: Target size tuple (width, height)
+        out: Optional float32 buffer to write the result into (see get_preprocess_buffer)
+    
+    Returns:
+        Preprocessed float32 numpy array of shape (1, height, width, 3)
+    """
+    try:
+        return normalize_image(decode_image(image, img_size), out=out)
+    except Exception as e:
+        raise Exception(f"Error preprocessing image: {str(e)}")
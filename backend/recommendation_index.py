@@ -0,0 +1,196 @@
+"""
+In-memory index of the treatment catalog.
+
+The catalog in tomato_treatments.db is small and rarely changes, so it is
+read once into plain dicts and tuples instead of being queried on every
+request:
+
+    disease name      -> disease row
+    disease id        -> treatments (joined with their category name),
+                         ordered by priority, then effectiveness
+    severity id       -> ids of treatments recommended at that severity
+    disease id        -> cultural practices, most effective first
+
+Each load builds a new CatalogSnapshot and swaps it in with one assignment,
+so readers never see a half-built index and never take a lock. A background
+thread polls the DB file's mtime and reloads when it changes.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger('tomato.recommendations')
+
+
+class CatalogSnapshot(NamedTuple):
+    diseases_by_name: Dict[str, Dict]
+    diseases_by_normalized_name: Dict[str, Dict]
+    treatments_by_disease: Dict[int, Tuple[Dict, ...]]
+    recommended_by_severity: Dict[int, FrozenSet[int]]
+    practices_by_disease: Dict[int, Tuple[Dict, ...]]
+    version: Tuple[int, int]  # (mtime_ns, size) of the DB file it was read from
+    loaded_at: float
+
+
+def normalize_disease_name(name: str) -> str:
+    return name.replace('_', ' ').strip()
+
+
+def _file_version(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def load_snapshot(db_path: str) -> CatalogSnapshot:
+    """Read the whole catalog from db_path"""
+    version = _file_version(db_path)
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        diseases = [dict(row) for row in conn.execute("SELECT * FROM diseases ORDER BY disease_id")]
+
+        treatments_by_disease: Dict[int, list] = {}
+        for row in conn.execute("""
+            SELECT
+                t.*,
+                tc.category_name
+            FROM treatments t
+            JOIN treatment_categories tc ON t.category_id = tc.category_id
+            ORDER BY t.disease_id, t.priority, t.effectiveness_percentage DESC, t.treatment_id
+        """):
+            treatments_by_disease.setdefault(row['disease_id'], []).append(dict(row))
+
+        recommended_by_severity: Dict[int, set] = {}
+        for row in conn.execute("""
+            SELECT severity_id, treatment_id FROM treatment_severity_mapping
+            WHERE is_recommended = 1
+        """):
+            recommended_by_severity.setdefault(row['severity_id'], set()).add(row['treatment_id'])
+
+        practices_by_disease: Dict[int, list] = {}
+        for row in conn.execute("""
+            SELECT * FROM cultural_practices
+            ORDER BY disease_id, effectiveness DESC, practice_id
+        """):
+            practices_by_disease.setdefault(row['disease_id'], []).append(dict(row))
+    finally:
+        conn.close()
+
+    diseases_by_name = {}
+    diseases_by_normalized_name = {}
+    for disease in diseases:
+        # First row wins, as with the original fetchone() lookup
+        diseases_by_name.setdefault(disease['disease_name'], disease)
+        diseases_by_normalized_name.setdefault(normalize_disease_name(disease['disease_name']), disease)
+
+    return CatalogSnapshot(
+        diseases_by_name=diseases_by_name,
+        diseases_by_normalized_name=diseases_by_normalized_name,
+        treatments_by_disease={k: tuple(v) for k, v in treatments_by_disease.items()},
+        recommended_by_severity={k: frozenset(v) for k, v in recommended_by_severity.items()},
+        practices_by_disease={k: tuple(v) for k, v in practices_by_disease.items()},
+        version=version,
+        loaded_at=time.time()
+    )
+
+
+class RecommendationIndex:
+    """
+    Hot-reloading in-memory copy of the treatment catalog
+
+    Args:
+        db_path: Path to the SQLite treatment database
+        reload_interval: Seconds between mtime checks by the watcher thread (0 disables it)
+    """
+
+    def __init__(self, db_path: str, reload_interval: float = 2.0):
+        self.db_path = db_path
+        self.reload_interval = reload_interval
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self.reloads = 0
+        self.last_error = None
+        self._failed_version = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_listener(self, callback):
+        """Call callback(snapshot) after every successful (re)load"""
+        self._listeners.append(callback)
+
+    def load(self) -> bool:
+        """(Re)read the catalog; on failure the previous snapshot stays in place"""
+        with self._lock:
+            try:
+                snapshot = load_snapshot(self.db_path)
+            except (OSError, sqlite3.Error) as e:
+                self.last_error = str(e)
+                logger.warning("Could not load treatment catalog from %s: %s", self.db_path, e)
+                return False
+            self.snapshot = snapshot
+            self.reloads += 1
+            self.last_error = None
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.warning("Treatment catalog reload listener failed: %s", e)
+        return True
+
+    def maybe_reload(self) -> bool:
+        """Reload if the DB file changed since the current snapshot was read"""
+        try:
+            version = _file_version(self.db_path)
+        except OSError:
+            return False
+        if self.snapshot is not None and version == self.snapshot.version:
+            return False
+        if version == self._failed_version:
+            return False  # already failed on this exact file; wait for it to change
+        if self.snapshot is not None:
+            logger.info("Treatment database changed, reloading catalog")
+        if not self.load():
+            self._failed_version = version
+            return False
+        return True
+
+    def start(self):
+        """Start the background mtime watcher"""
+        if self.reload_interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._watch, name='recommendation-index', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            self.maybe_reload()
+
+    def find_disease(self, disease_name: str) -> Optional[Dict]:
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+        return (snapshot.diseases_by_name.get(disease_name)
+                or snapshot.diseases_by_normalized_name.get(normalize_disease_name(disease_name)))
+
+    def stats(self) -> Dict:
+        snapshot = self.snapshot
+        return {
+            'db_path': self.db_path,
+            'loaded': snapshot is not None,
+            'diseases': len(snapshot.diseases_by_name) if snapshot else 0,
+            'treatments': sum(len(t) for t in snapshot.treatments_by_disease.values()) if snapshot else 0,
+            'reloads': self.reloads,
+            'loaded_at': snapshot.loaded_at if snapshot else None,
+            'reload_interval_s': self.reload_interval,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,96 @@
+"""
+Precomputed /api/get_recommendations responses.
+
+A recommendation depends only on the disease, the severity bucket, the
+farming type and the budget; the affected percentage is echoed back but
+changes nothing else. Every combination (11 diseases x 4 severities x 3
+farming types x 3 budgets) is computed once per catalog version and kept as
+serialized JSON split around the affected_percentage value, so a request
+is a dict lookup plus one byte concatenation.
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+FARMING_TYPES = ('organic', 'chemical', 'mixed')
+BUDGETS = ('low', 'medium', 'high')
+
+_MARKER = '__affected_percentage__'
+
+Key = Tuple[str, int, str, str]
+
+
+class RecommendationMatrix:
+    """
+    Table of pre-serialized responses keyed by (disease, severity_id, farming_type, budget)
+
+    Args:
+        dumps: JSON serializer for the response body (use the app's, so bytes match jsonify)
+    """
+
+    def __init__(self, dumps: Callable[[object], str]):
+        self.dumps = dumps
+        self._entries: Dict[Key, Tuple[bytes, bytes]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.build_ms = 0.0
+
+    def rebuild(self, disease_names: Iterable[str], severity_samples: Dict[int, float],
+                compute: Callable[[str, float, str, str], Dict]) -> int:
+        """
+        Recompute every combination and swap the new table in
+
+        Args:
+            disease_names: Canonical disease names from the catalog
+            severity_samples: One affected percentage per severity_id, used to drive compute()
+            compute: The live path, compute(disease_name, affected_percentage, farming_type, budget)
+
+        Returns:
+            Number of entries built (combinations whose result was an error are left out)
+        """
+        started = time.perf_counter()
+        entries = {}
+        for disease_name in disease_names:
+            for severity_id, percentage in severity_samples.items():
+                for farming_type in FARMING_TYPES:
+                    for budget in BUDGETS:
+                        result = compute(disease_name, percentage, farming_type, budget)
+                        if 'error' in result:
+                            continue
+                        result['disease_info']['affected_percentage'] = _MARKER
+                        body = (self.dumps(result) + '\n').encode('utf-8')
+                        head, tail = body.split(self.dumps(_MARKER).encode('utf-8'), 1)
+                        entries[(disease_name, severity_id, farming_type, budget)] = (head, tail)
+
+        with self._lock:
+            self._entries = entries
+            self.builds += 1
+            self.build_ms = round((time.perf_counter() - started) * 1000, 1)
+        return len(entries)
+
+    def get(self, disease_name: str, severity_id: int, farming_type: str, budget: str,
+            affected_percentage: float) -> Optional[bytes]:
+        """Serialized response with affected_percentage filled in, or None if not precomputed"""
+        entry = self._entries.get((disease_name, severity_id, farming_type, budget))
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        head, tail = entry
+        return head + self.dumps(affected_percentage).encode('utf-8') + tail
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'builds': self.builds,
+                'build_ms': self.build_ms,
+                'hits': self.hits,
+                'misses': self.misses
+            }
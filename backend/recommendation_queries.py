@@ -0,0 +1,99 @@
+"""
+Per-request SQL for /api/get_recommendations when it reads the database directly.
+
+Normally recommendations come from the in-memory catalog (see
+recommendation_index.py); these queries serve the same result when the
+catalog is not loaded. Each one is answered from an index: diseases are
+found through disease_name or the generated normalized_name column, and
+a single query selects, scores and ranks a disease's treatments for a
+severity with the same rules as calculate_treatment_score().
+tests/query_plan_test.py fails if any of them needs a table scan.
+"""
+import sqlite3
+from typing import Dict, List, Optional
+
+DISEASE_QUERY = """
+    SELECT * FROM diseases
+    WHERE disease_name = :disease_name OR normalized_name = :normalized_name
+    LIMIT 1
+"""
+
+# Treatments recommended for the severity, or every treatment of the disease when none is,
+# scored like calculate_treatment_score() and ranked like the stable sort over it: by the score
+# rounded to one decimal (as returned), ties in catalog order
+RANKED_TREATMENTS_QUERY = """
+    SELECT
+        t.*,
+        tc.category_name,
+        MAX(0, MIN(100,
+            t.effectiveness_percentage
+            + CASE
+                WHEN :farming_type = 'organic' THEN CASE WHEN COALESCE(t.is_organic, 0) THEN 25 ELSE -20 END
+                WHEN :farming_type = 'chemical' AND NOT COALESCE(t.is_organic, 0) THEN 15
+                ELSE 0
+              END
+            + CASE
+                WHEN :budget = 'low' AND COALESCE(NULLIF(t.cost_per_acre_inr, 0), 1000) < 1000 THEN 15
+                WHEN :budget = 'low' AND COALESCE(NULLIF(t.cost_per_acre_inr, 0), 1000) > 2000 THEN -15
+                WHEN :budget = 'high' AND COALESCE(NULLIF(t.cost_per_acre_inr, 0), 1000) > 2000 THEN 5
+                ELSE 0
+              END
+            + (5 - COALESCE(NULLIF(t.priority, 0), 3)) * 2
+        )) AS recommendation_score
+    FROM treatments t
+    JOIN treatment_categories tc ON tc.category_id = t.category_id
+    WHERE t.disease_id = :disease_id
+      AND (
+        EXISTS (
+            SELECT 1 FROM treatment_severity_mapping m
+            WHERE m.treatment_id = t.treatment_id AND m.severity_id = :severity_id AND m.is_recommended = 1
+        )
+        OR NOT EXISTS (
+            SELECT 1 FROM treatments t2
+            JOIN treatment_severity_mapping m2 ON m2.treatment_id = t2.treatment_id
+            WHERE t2.disease_id = :disease_id AND m2.severity_id = :severity_id AND m2.is_recommended = 1
+        )
+      )
+    ORDER BY ROUND(recommendation_score, 1) DESC, t.priority, t.effectiveness_percentage DESC, t.treatment_id
+"""
+
+CULTURAL_PRACTICES_QUERY = """
+    SELECT * FROM cultural_practices
+    WHERE disease_id = :disease_id
+    ORDER BY effectiveness DESC, practice_id
+"""
+
+PER_REQUEST_QUERIES = {
+    'disease': DISEASE_QUERY,
+    'ranked_treatments': RANKED_TREATMENTS_QUERY,
+    'cultural_practices': CULTURAL_PRACTICES_QUERY
+}
+
+
+def find_disease(conn: sqlite3.Connection, disease_name: str) -> Optional[Dict]:
+    row = conn.execute(DISEASE_QUERY, {
+        'disease_name': disease_name,
+        'normalized_name': disease_name.replace('_', ' ').strip()
+    }).fetchone()
+    return dict(row) if row is not None else None
+
+
+def ranked_treatments(conn: sqlite3.Connection, disease_id: int, severity_id: int,
+                      farming_type: str, budget: str) -> List[Dict]:
+    """Treatments for a disease and severity, best recommendation_score first"""
+    rows = conn.execute(RANKED_TREATMENTS_QUERY, {
+        'disease_id': disease_id,
+        'severity_id': severity_id,
+        'farming_type': farming_type,
+        'budget': budget
+    }).fetchall()
+    treatments = []
+    for row in rows:
+        treatment = dict(row)
+        treatment['recommendation_score'] = round(float(treatment['recommendation_score']), 1)
+        treatments.append(treatment)
+    return treatments
+
+
+def cultural_practices(conn: sqlite3.Connection, disease_id: int) -> List[Dict]:
+    return [dict(row) for row in conn.execute(CULTURAL_PRACTICES_QUERY, {'disease_id': disease_id})]
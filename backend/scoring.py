@@ -0,0 +1,103 @@
+"""
+Vectorized treatment scoring.
+
+TreatmentScorer holds the scoring inputs of a set of treatments as NumPy
+columns and evaluates app.calculate_treatment_score() for every treatment
+under many preference combinations at once, returning a (preferences x
+treatments) score matrix. Costs can be overridden per preference row for
+what-if pricing simulations. top_k() ranks with argpartition and breaks
+ties by catalog order, matching the stable sort in get_recommendations_from_db().
+
+calculate_treatment_score() stays the reference implementation; the two
+are checked against each other in tests/scoring_test.py.
+"""
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+FARMING_TYPE_CODES = {'organic': 1, 'chemical': 2}  # anything else (e.g. 'mixed') scores neutrally
+BUDGET_CODES = {'low': 1, 'high': 2}  # anything else (e.g. 'medium') scores neutrally
+DEFAULT_COST = 1000.0
+DEFAULT_PRIORITY = 3
+
+
+def encode_preferences(farming_types: Sequence[str], budgets: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Integer codes for preference vectors, as accepted by TreatmentScorer.score()"""
+    farming = np.array([FARMING_TYPE_CODES.get(f, 0) for f in farming_types], dtype=np.int8)
+    budget = np.array([BUDGET_CODES.get(b, 0) for b in budgets], dtype=np.int8)
+    return farming, budget
+
+
+class TreatmentScorer:
+    """
+    Columnar copy of the treatment fields calculate_treatment_score() reads
+
+    Args:
+        treatments: Treatment rows (dicts with effectiveness_percentage, is_organic,
+            cost_per_acre_inr and priority), e.g. from the recommendation index
+    """
+
+    def __init__(self, treatments: Sequence[Dict]):
+        self.treatments = list(treatments)
+        self.treatment_ids = np.array([t.get('treatment_id', i) for i, t in enumerate(self.treatments)])
+        self.effectiveness = np.array([float(t['effectiveness_percentage']) for t in self.treatments])
+        self.is_organic = np.array([bool(t['is_organic']) for t in self.treatments])
+        # Falsy values fall back to the defaults exactly as in calculate_treatment_score()
+        self.cost = np.array([float(t['cost_per_acre_inr']) if t['cost_per_acre_inr'] else DEFAULT_COST
+                              for t in self.treatments])
+        priority = np.array([int(t['priority']) if t['priority'] else DEFAULT_PRIORITY
+                             for t in self.treatments], dtype=np.float64)
+        self.base = self.effectiveness + (5 - priority) * 2
+
+    def __len__(self):
+        return len(self.treatments)
+
+    def score(self, farming_types, budgets, costs: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Score every treatment under every preference row
+
+        Args:
+            farming_types: P farming types (strings, or codes from encode_preferences)
+            budgets: P budgets (strings, or codes from encode_preferences)
+            costs: Optional cost override broadcastable to (P, T), for pricing scenarios
+
+        Returns:
+            float64 array of shape (P, T), clipped to 0-100
+        """
+        farming = np.asarray(farming_types)
+        budget = np.asarray(budgets)
+        if farming.dtype.kind in 'US' or budget.dtype.kind in 'US':
+            farming, budget = encode_preferences(farming.tolist(), budget.tolist())
+        farming = farming.reshape(-1, 1)
+        budget = budget.reshape(-1, 1)
+        cost = self.cost[None, :] if costs is None else np.broadcast_to(costs, (len(farming), len(self)))
+
+        organic = self.is_organic[None, :]
+        farming_adj = np.where(farming == 1, np.where(organic, 25.0, -20.0),
+                               np.where((farming == 2) & ~organic, 15.0, 0.0))
+        budget_adj = np.where(budget == 1, np.where(cost < 1000, 15.0, np.where(cost > 2000, -15.0, 0.0)),
+                              np.where((budget == 2) & (cost > 2000), 5.0, 0.0))
+        return np.clip(self.base[None, :] + farming_adj + budget_adj, 0, 100)
+
+    def top_k(self, scores: np.ndarray, k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Highest-scoring treatments per preference row
+
+        Scores are ranked at the response's 0.1 precision; equal scores keep catalog order.
+
+        Returns:
+            (indices, scores), both of shape (P, min(k, T)), best first
+        """
+        n = scores.shape[1]
+        k = min(k, n)
+        if k == 0:
+            return np.empty((len(scores), 0), dtype=np.intp), np.empty((len(scores), 0))
+        # One integer key per cell: tenths of a point, then earlier treatments first
+        keys = np.rint(scores * 10).astype(np.int64) * n + (n - 1 - np.arange(n))
+        if k < n:
+            part = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+        else:
+            part = np.broadcast_to(np.arange(n), keys.shape)
+        order = np.argsort(-np.take_along_axis(keys, part, axis=1), axis=1)
+        indices = np.take_along_axis(part, order, axis=1)
+        return indices, np.round(np.take_along_axis(scores, indices, axis=1), 1)
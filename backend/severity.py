@@ -0,0 +1,144 @@
+"""
+Affected-leaf fraction estimated from the photo itself.
+
+/api/get_recommendations buckets a client-supplied affected_percentage into a
+severity (app.get_severity()). For uploads, tile_image() instead cuts the photo
+into a grid of tiles laid out on its own resolution (tiles are never smaller
+than the model input, and there are at most SEVERITY_MAX_TILES of them), the
+disease model scores all tiles in one batch, and estimate_coverage() turns the
+per-tile probabilities into the expected share of leaf tiles that are not
+healthy. Tiles that are mostly background (unsaturated: paper, soil in shade,
+sky, white bench tops) are left out of the share.
+
+Kept free of TensorFlow, like preprocessing.py; app.py runs the model.
+"""
+import math
+import os
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+import timing
+from preprocessing import DEFAULT_IMG_SIZE
+
+# Upper bound on tiles per image, i.e. on the rows of the one disease-model batch
+SEVERITY_MAX_TILES = int(os.environ.get('SEVERITY_MAX_TILES', 16))
+# Tiles with less foreground than this don't count towards the estimate
+SEVERITY_MIN_FOREGROUND = float(os.environ.get('SEVERITY_MIN_FOREGROUND', 0.25))
+# HSV saturation / value a foreground pixel needs (leaves, green or lesioned, are saturated)
+FOREGROUND_MIN_SATURATION = 0.2
+FOREGROUND_MIN_VALUE = 0.15
+
+
+def tile_grid(width: int, height: int, tile_size=DEFAULT_IMG_SIZE,
+              max_tiles: int = SEVERITY_MAX_TILES) -> Tuple[int, int]:
+    """
+    Columns and rows of the tile grid for an image
+
+    Tiles are as close to square as the image allows, at least tile_size (the
+    model input) in image pixels, and there are no more than max_tiles of them.
+
+    Returns:
+        (columns, rows)
+    """
+    side = max(max(tile_size), math.sqrt(width * height / max(1, max_tiles)))
+    columns = max(1, int(width // side))
+    rows = max(1, int(height // side))
+    # A very elongated image can still leave one dimension over budget
+    while columns * rows > max_tiles:
+        if columns >= rows:
+            columns -= 1
+        else:
+            rows -= 1
+    return columns, rows
+
+
+def tile_image(image, tile_size=DEFAULT_IMG_SIZE, max_tiles: int = SEVERITY_MAX_TILES):
+    """
+    Cut a decoded image into a grid of model-input sized tiles
+
+    The image is resized once to the grid's size and the tiles are then views
+    of that array, reshaped into a batch.
+
+    Args:
+        image: PIL Image, decoded at full resolution (open_image(..., draft=False));
+            a draft-decoded photo has lost the fine detail of small lesions already
+        tile_size: Model input size (width, height)
+        max_tiles: Upper bound on the number of tiles
+
+    Returns:
+        (tiles, (columns, rows)) where tiles is a uint8 array of shape
+        (columns * rows, height, width, 3) in row-major grid order
+    """
+    columns, rows = tile_grid(image.width, image.height, tile_size, max_tiles)
+    tile_w, tile_h = tile_size
+    with timing.span('tile'):
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        # Bilinear after a box reduction: the grid is a downscale of the full-resolution photo
+        grid = np.asarray(image.resize((columns * tile_w, rows * tile_h), Image.BILINEAR, reducing_gap=2.0),
+                          dtype=np.uint8)
+        tiles = grid.reshape(rows, tile_h, columns, tile_w, 3).swapaxes(1, 2).reshape(-1, tile_h, tile_w, 3)
+    return tiles, (columns, rows)
+
+
+def foreground_fraction(tiles: np.ndarray) -> np.ndarray:
+    """
+    Share of saturated, not too dark pixels per tile
+
+    Args:
+        tiles: uint8 array of shape (N, H, W, 3)
+
+    Returns:
+        float array of shape (N,)
+    """
+    # Pairwise over the channels; a max()/min() reduction over the 3-wide last axis is several times slower
+    red, green, blue = tiles[..., 0], tiles[..., 1], tiles[..., 2]
+    high = np.maximum(np.maximum(red, green), blue)
+    low = np.minimum(np.minimum(red, green), blue)
+    # saturation (high - low) / high >= FOREGROUND_MIN_SATURATION, without dividing
+    saturated = (high - low) >= (high * np.float32(FOREGROUND_MIN_SATURATION))
+    foreground = saturated & (high >= FOREGROUND_MIN_VALUE * 255)
+    return foreground.mean(axis=(1, 2))
+
+
+def estimate_coverage(probabilities: np.ndarray, foreground: np.ndarray, class_names: Sequence[str],
+                      healthy_index: int, min_foreground: float = SEVERITY_MIN_FOREGROUND) -> Dict:
+    """
+    Aggregate per-tile disease probabilities into an affected-leaf percentage
+
+    Each leaf tile (foreground >= min_foreground) counts with its foreground share
+    as weight; its chance of being affected is 1 - P(healthy). When no tile has
+    enough foreground, all tiles count equally.
+
+    Args:
+        probabilities: Disease model softmax outputs, shape (N, classes)
+        foreground: foreground_fraction() of the same tiles
+        class_names: Class name per output column
+        healthy_index: Column of the healthy class
+
+    Returns:
+        Dict with affected_percentage (0-100), the most likely disease over the leaf
+        tiles (healthy excluded), its share of the disease probability and tile counts
+    """
+    weights = np.where(foreground >= min_foreground, foreground, 0.0)
+    leaf_tiles = int(np.count_nonzero(weights))
+    if leaf_tiles == 0:
+        weights = np.ones(len(probabilities))
+    weights = weights / weights.sum()
+
+    affected = 1.0 - probabilities[:, healthy_index]
+    mean_probabilities = weights @ probabilities
+    mean_probabilities[healthy_index] = 0.0
+    disease_index = int(np.argmax(mean_probabilities))
+    disease_mass = float(mean_probabilities.sum())
+
+    return {
+        'affected_percentage': round(float(weights @ affected) * 100, 1),
+        'disease': class_names[disease_index],
+        'disease_share': round(float(mean_probabilities[disease_index]) / disease_mass * 100, 1) if disease_mass else 0.0,
+        'tiles': len(probabilities),
+        'leaf_tiles': leaf_tiles,
+        'affected_tiles': int(np.count_nonzero((affected >= 0.5) & (weights > 0)))
+    }
@@ -0,0 +1,138 @@
+import asyncio
+import io
+import json
+import sys
+import threading
+import zipfile
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('starlette')
+httpx = pytest.importorskip('httpx')
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+import asgi
+from benchmarks.synthetic import encode_image, make_leaf_image
+
+
+def _client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url='http://test')
+
+
+def test_routes_match_flask():
+    image = encode_image(make_leaf_image(seed=700))
+    flask_client = app_module.app.test_client()
+
+    async def run():
+        async with _client() as client:
+            predicted = await client.post('/api/predict', files={'image': ('leaf.jpg', image, 'image/jpeg')})
+            classes = await client.get('/api/classes')
+            missing = await client.post('/api/predict', files={})
+            recommendations = await client.post('/api/get_recommendations', json={
+                'disease_name': 'Early_blight', 'affected_percentage': 12})
+            batch = await client.post('/api/predict/batch', files=[
+                ('images', ('a.jpg', image, 'image/jpeg')), ('images', ('b.jpg', b'broken', 'image/jpeg'))])
+            return predicted, classes, missing, recommendations, batch
+
+    predicted, classes, missing, recommendations, batch = asyncio.run(run())
+
+    expected = flask_client.post('/api/predict', data={'image': (io.BytesIO(image), 'leaf.jpg')}).get_json()
+    assert predicted.status_code == 200
+    assert predicted.json()['status'] == expected['status']
+    assert predicted.json()['leaf_detection'] == expected['leaf_detection']
+    assert classes.json() == flask_client.get('/api/classes').get_json()
+    assert missing.status_code == 400
+    assert recommendations.json() == flask_client.post('/api/get_recommendations', json={
+        'disease_name': 'Early_blight', 'affected_percentage': 12}).get_json()
+    assert [r['status'] for r in batch.json()['results']][1] == 'error'
+
+
+def test_light_endpoints_stay_responsive_and_overload_is_refused(monkeypatch):
+    executor = asgi.InferenceExecutor(max_workers=1, max_queue=1)
+    monkeypatch.setattr(asgi, 'executor', executor)
+    release = threading.Event()
+
+    def slow_predict(image_bytes, filename):
+        release.wait(5)
+        return {'status': 'success'}, 200
+    monkeypatch.setattr(app_module, 'predict_upload', slow_predict)
+    image = encode_image(make_leaf_image(seed=701))
+
+    async def run():
+        async with _client() as client:
+            busy = [asyncio.create_task(client.post('/api/predict', files={'image': ('a.jpg', image, 'image/jpeg')}))
+                    for _ in range(2)]
+            while executor.in_flight < 2:
+                await asyncio.sleep(0.01)
+            rejected = await client.post('/api/predict', files={'image': ('a.jpg', image, 'image/jpeg')})
+            health = await asyncio.wait_for(client.get('/api/classes'), timeout=2)
+            release.set()
+            done = await asyncio.gather(*busy)
+            return rejected, health, done
+
+    rejected, health, done = asyncio.run(run())
+    assert rejected.status_code == 503
+    assert rejected.headers['Retry-After'] == '1'
+    assert health.status_code == 200
+    assert [r.status_code for r in done] == [200, 200]
+    assert executor.stats()['rejected'] == 1
+    executor.shutdown()
+
+
+def test_oversized_archive_is_rejected(monkeypatch):
+    archive = b'PK' + b'\0' * 4096
+    monkeypatch.setattr(app_module, 'MAX_ARCHIVE_SIZE', 1024)
+
+    async def run():
+        async with _client() as client:
+            return [await client.post('/api/predict/batch' + query,
+                                      files={'archive': ('plot.zip', archive, 'application/zip')})
+                    for query in ('', '?stream=1')]
+
+    for response in asyncio.run(run()):
+        assert response.status_code == 413
+        assert response.json()['status'] == 'error'
+
+
+def test_stream_mode_predicts_while_the_body_is_arriving(monkeypatch):
+    monkeypatch.setattr(app_module, 'STREAM_BATCH_SIZE', 2)
+    boundary = 'xyzBOUNDARY'
+    images = [encode_image(make_leaf_image(seed=710 + i)) for i in range(5)]
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        for i in range(3):
+            zf.writestr(f'plot/{i}.png', encode_image(make_leaf_image(seed=720 + i), 'PNG'))
+    parts = [f'--{boundary}\r\nContent-Disposition: form-data; name="images"; filename="{i}.jpg"\r\n'
+             f'Content-Type: image/jpeg\r\n\r\n'.encode() + data + b'\r\n' for i, data in enumerate(images)]
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="archive"; filename="plot.zip"\r\n'
+                 f'Content-Type: application/zip\r\n\r\n'.encode() + archive.getvalue() + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+
+    received, sent = [], []
+
+    async def receive():
+        if len(received) < len(parts):
+            received.append(parts[len(received)])
+            return {'type': 'http.request', 'body': received[-1], 'more_body': len(received) < len(parts)}
+        await asyncio.sleep(60)  # no disconnect; cancelled once the response is complete
+
+    async def send(message):
+        if message['type'] == 'http.response.body' and message.get('body'):
+            sent.append((len(received), message['body']))
+
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+             'scheme': 'http', 'path': '/api/predict/batch', 'raw_path': b'/api/predict/batch',
+             'query_string': b'stream=1', 'root_path': '', 'server': ('test', 80), 'client': ('test', 1),
+             'headers': [(b'host', b'test'),
+                         (b'content-type', f'multipart/form-data; boundary={boundary}'.encode())]}
+    asyncio.run(asgi.app(scope, receive, send))
+
+    # The first batch went out after its two images (and the next part's boundary), not at the end of the body
+    assert sent[0][0] <= 3 < len(parts)
+    lines = [json.loads(line) for _, body in sent for line in body.decode().splitlines()]
+    results, final = lines[:-1], lines[-1]
+    assert [r['filename'] for r in results] == [f'{i}.jpg' for i in range(5)] + [f'plot/{i}.png' for i in range(3)]
+    assert [r['index'] for r in results] == list(range(8))
+    assert final['status'] == 'success' and final['summary']['total'] == 8
@@ -0,0 +1,66 @@
+import io
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+from benchmarks.synthetic import encode_image, make_leaf_image
+
+
+def _client():
+    return app_module.app.test_client()
+
+
+def test_batch_matches_single_predictions(monkeypatch):
+    client = _client()
+    images = [encode_image(make_leaf_image(seed=100 + i)) for i in range(4)]
+    files = [(io.BytesIO(data), f'leaf_{i}.jpg') for i, data in enumerate(images)]
+    files.append((io.BytesIO(b'not an image'), 'broken.jpg'))
+
+    response = client.post('/api/predict/batch', data={'images': files})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['summary']['total'] == 5
+    assert body['summary']['errors'] == 1
+    assert [r['filename'] for r in body['results']] == [f'leaf_{i}.jpg' for i in range(4)] + ['broken.jpg']
+    assert body['results'][4]['status'] == 'error'
+
+    # Predicted again, not answered from what the batch cached
+    models = app_module.model_registry.active
+    monkeypatch.setattr(models, 'prediction_cache', None)
+    monkeypatch.setattr(models, 'perceptual_cache', None)
+    single = client.post('/api/predict', data={'image': (io.BytesIO(images[0]), 'leaf_0.jpg')}).get_json()
+    assert single['status'] == 'success', single
+    assert 'cache' not in single
+    batched = body['results'][0]
+    assert batched['status'] == single['status']
+    assert set(single) <= set(batched)
+    # Batched and single forward passes may differ in the last float bits
+    assert batched['leaf_detection']['is_leaf'] == single['leaf_detection']['is_leaf']
+    assert batched['leaf_detection']['confidence'] == pytest.approx(single['leaf_detection']['confidence'], abs=1e-3)
+    assert batched['disease_detection']['disease'] == single['disease_detection']['disease']
+    assert batched['disease_detection']['confidence'] == \
+        pytest.approx(single['disease_detection']['confidence'], abs=1e-3)
+
+
+def test_zip_archive_upload():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as archive:
+        for i in range(3):
+            archive.writestr(f'plot/{i}.png', encode_image(make_leaf_image(seed=200 + i), 'PNG'))
+        archive.writestr('plot/readme.txt', 'not an image')
+    buf.seek(0)
+
+    response = _client().post('/api/predict/batch', data={'archive': (buf, 'plot.zip')})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['summary']['total'] == 3
+    assert [r['filename'] for r in body['results']] == [f'plot/{i}.png' for i in range(3)]
+
+
+def test_batch_requires_images():
+    response = _client().post('/api/predict/batch', data={})
+    assert response.status_code == 400
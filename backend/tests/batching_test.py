@@ -0,0 +1,56 @@
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from batching import MicroBatcher
+
+
+def test_results_are_routed_back_to_each_caller():
+    calls = []
+
+    def predict_fn(batch):
+        calls.append(len(batch))
+        return batch.reshape(len(batch), -1).sum(axis=1, keepdims=True)
+
+    batcher = MicroBatcher('test', predict_fn, max_batch_size=8, max_wait_ms=50)
+    results = {}
+
+    def worker(i):
+        results[i] = batcher.submit(np.full((1, 2, 2, 1), i, dtype=np.float32))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.stop()
+
+    for i in range(8):
+        assert results[i].shape == (1, 1)
+        assert results[i][0][0] == i * 4
+    assert sum(calls) == 8
+    assert len(calls) < 8
+
+    stats = batcher.stats()
+    assert stats['rows'] == 8
+    assert stats['requests'] == 8
+    assert stats['queue_depth'] == 0
+
+
+def test_errors_propagate_to_callers():
+    def predict_fn(batch):
+        raise ValueError('boom')
+
+    batcher = MicroBatcher('failing', predict_fn, max_batch_size=4, max_wait_ms=1)
+    try:
+        batcher.submit(np.zeros((1, 2, 2, 1), dtype=np.float32))
+    except ValueError as e:
+        assert 'boom' in str(e)
+    else:
+        raise AssertionError('expected ValueError')
+    finally:
+        batcher.stop()
+    assert batcher.stats()['errors'] == 1
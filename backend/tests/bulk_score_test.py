@@ -0,0 +1,40 @@
+import csv
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import bulk_score
+from benchmarks.synthetic import make_leaf_image
+
+
+def _read(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_bulk_score_and_resume(tmp_path):
+    images = tmp_path / 'images'
+    (images / 'plot_b').mkdir(parents=True)
+    (images / 'plot_a').mkdir()
+    for i in range(3):
+        make_leaf_image((320, 240), seed=500 + i).save(images / 'plot_a' / f'{i}.jpg')
+        make_leaf_image((320, 240), seed=600 + i).save(images / 'plot_b' / f'{i}.png')
+    (images / 'plot_b' / 'broken.jpg').write_bytes(b'not an image')
+
+    output = tmp_path / 'scores.csv'
+    args = [str(images), '--output', str(output), '--workers', '1', '--batch-size', '2']
+    assert bulk_score.main(args) == 0
+
+    rows = _read(output)
+    assert [Path(r['path']).name for r in rows] == ['0.jpg', '1.jpg', '2.jpg', '0.png', '1.png', '2.png', 'broken.jpg']
+    assert rows[-1]['status'] == 'error'
+    assert all(r['status'] in ('success', 'rejected') for r in rows[:-1])
+
+    # Simulate an interruption: keep two rows plus half of the third
+    lines = output.read_text(encoding='utf-8').splitlines(keepends=True)
+    output.write_text(''.join(lines[:3]) + lines[3][:10], encoding='utf-8')
+
+    assert bulk_score.main(args + ['--resume']) == 0
+    resumed = _read(output)
+    assert sorted(r['path'] for r in resumed) == sorted(r['path'] for r in rows)
+    assert [r['status'] for r in resumed] == [r['status'] for r in rows]
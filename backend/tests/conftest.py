@@ -0,0 +1,34 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# app.py loads its models at import time; point it at synthetic models with the
+# real input/output shapes unless real model paths were given explicitly.
+if 'LEAF_MODEL_PATH' not in os.environ or 'DISEASE_MODEL_PATH' not in os.environ:
+    from benchmarks.synthetic import build_disease_model, build_leaf_model
+
+    _model_dir = tempfile.mkdtemp(prefix='tomato-test-models-')
+    os.environ['LEAF_MODEL_PATH'] = os.path.join(_model_dir, 'leaf.keras')
+    os.environ['DISEASE_MODEL_PATH'] = os.path.join(_model_dir, 'disease.keras')
+    build_leaf_model().save(os.environ['LEAF_MODEL_PATH'])
+    build_disease_model().save(os.environ['DISEASE_MODEL_PATH'])
+
+# Tests use the models right after importing app.py instead of waiting for the background load
+os.environ.setdefault('MODEL_LOAD_MODE', 'eager')
+# Model reloads are triggered explicitly by the tests that need them
+os.environ.setdefault('MODEL_RELOAD_INTERVAL', '0')
+
+# The treatment DB is generated from treatment_database.sql and not checked in
+if 'TREATMENT_DB_PATH' not in os.environ:
+    import sqlite3
+
+    _db_dir = tempfile.mkdtemp(prefix='tomato-test-db-')
+    os.environ['TREATMENT_DB_PATH'] = os.path.join(_db_dir, 'tomato_treatments.db')
+    with open(Path(__file__).resolve().parents[1] / 'treatment_database.sql', encoding='utf-8') as _f:
+        _conn = sqlite3.connect(os.environ['TREATMENT_DB_PATH'])
+        _conn.executescript(_f.read())
+        _conn.commit()
+        _conn.close()
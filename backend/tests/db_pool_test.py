@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from db_pool import ConnectionPool, PoolTimeout
+
+
+def test_connections_are_read_only_and_reused():
+    pool = ConnectionPool(os.environ['TREATMENT_DB_PATH'], max_size=2)
+    with pool.connection() as conn:
+        assert conn.execute('PRAGMA query_only').fetchone()[0] == 1
+        assert conn.execute('SELECT COUNT(*) FROM diseases').fetchone()[0] == 11
+        first = conn
+    with pool.connection() as conn:
+        assert conn is first
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection() as conn:
+            conn.execute("DELETE FROM diseases")
+    assert pool.stats()['open'] == 0  # the failed connection is not reused
+    with pool.connection() as conn:
+        conn.execute('SELECT 1')
+
+    stats = pool.stats()
+    assert stats['created'] == 2
+    assert stats['checkouts'] == 4
+    assert stats['open'] == 1 and stats['in_use'] == 0
+    pool.close()
+    assert pool.stats()['open'] == 0
+
+
+def test_checkout_waits_then_times_out():
+    pool = ConnectionPool(os.environ['TREATMENT_DB_PATH'], max_size=1, timeout=0.05)
+    released = threading.Event()
+
+    def hold():
+        with pool.connection():
+            released.wait(1)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    while pool.stats()['in_use'] == 0:
+        pass
+    with pytest.raises(PoolTimeout):
+        with pool.connection():
+            pass
+    released.set()
+    holder.join()
+
+    with pool.connection() as conn:
+        conn.execute('SELECT 1')
+    stats = pool.stats()
+    assert stats['timeouts'] == 1
+    assert stats['waits'] == 0 or stats['max_wait_ms'] > 0
+    pool.close()
+
+
+def test_missing_database_is_not_created(tmp_path):
+    path = tmp_path / 'missing.db'
+    pool = ConnectionPool(str(path))
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection():
+            pass
+    assert not path.exists()
+    assert pool.stats()['open'] == 0
+
+
+def test_a_connection_is_never_used_by_two_threads_at_once():
+    pool = ConnectionPool(os.environ['TREATMENT_DB_PATH'], max_size=3, timeout=10)
+    users = {}  # id(conn) -> thread currently holding it
+    users_lock = threading.Lock()
+    overlaps = []
+    threads_per_conn = {}
+
+    def work():
+        for _ in range(50):
+            with pool.connection() as conn:
+                me = threading.get_ident()
+                with users_lock:
+                    if users.get(id(conn)) is not None:
+                        overlaps.append(id(conn))
+                    users[id(conn)] = me
+                    threads_per_conn.setdefault(id(conn), set()).add(me)
+                conn.execute('SELECT COUNT(*) FROM treatments').fetchone()
+                with users_lock:
+                    users[id(conn)] = None
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert overlaps == []
+    stats = pool.stats()
+    assert stats['created'] <= 3 and stats['max_in_use'] <= 3
+    assert stats['checkouts'] == 8 * 50
+    # Connections do move between threads; that is what the exclusive checkout makes safe
+    assert any(len(threads) > 1 for threads in threads_per_conn.values())
+    pool.close()
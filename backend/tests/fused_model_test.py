@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from benchmarks.synthetic import build_disease_model, build_leaf_model
+from fuse_models import build_fused_model, max_output_difference
+
+TOLERANCE = 1e-5
+
+
+def _probe_batch(n=3):
+    return np.random.default_rng(42).random((n, 224, 224, 3), dtype=np.float32)
+
+
+def _shared_backbone_models():
+    backbone = tf.keras.Sequential([
+        tf.keras.Input(shape=(224, 224, 3)),
+        tf.keras.layers.Conv2D(8, 3, strides=4, activation='relu'),
+        tf.keras.layers.Conv2D(16, 3, strides=2, activation='relu'),
+    ], name='backbone')
+    leaf = tf.keras.Sequential([
+        tf.keras.Input(shape=(224, 224, 3)), backbone,
+        tf.keras.layers.GlobalAveragePooling2D(), tf.keras.layers.Dense(1, activation='sigmoid')
+    ])
+    disease = tf.keras.Sequential([
+        tf.keras.Input(shape=(224, 224, 3)), backbone,
+        tf.keras.layers.GlobalAveragePooling2D(), tf.keras.layers.Dense(11, activation='softmax')
+    ])
+    return leaf, disease
+
+
+def test_stacked_fusion_matches_separate_models(tmp_path):
+    leaf, disease = build_leaf_model(), build_disease_model()
+    fused, mode = build_fused_model(leaf, disease)
+    assert mode == 'stacked'
+
+    path = str(tmp_path / 'fused_model.keras')
+    fused.save(path)
+    reloaded = tf.keras.models.load_model(path, compile=False)
+    assert max_output_difference(reloaded, leaf, disease, _probe_batch()) <= TOLERANCE
+
+
+def test_shared_backbone_fusion_matches_separate_models(tmp_path):
+    leaf, disease = _shared_backbone_models()
+    fused, mode = build_fused_model(leaf, disease)
+    assert mode == 'shared_backbone'
+    assert fused.count_params() < leaf.count_params() + disease.count_params()
+
+    path = str(tmp_path / 'fused_model.keras')
+    fused.save(path)
+    reloaded = tf.keras.models.load_model(path, compile=False)
+    leaf_out, disease_out = reloaded(_probe_batch(), training=False)
+    assert leaf_out.shape == (3, 1)
+    assert disease_out.shape == (3, 11)
+    assert max_output_difference(reloaded, leaf, disease, _probe_batch()) <= TOLERANCE
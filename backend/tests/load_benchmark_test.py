@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+from benchmarks.load_test import FlaskClient, compare, make_recommendation_requests, make_uploads, run_level
+
+
+def _result(endpoint, concurrency, p50, p95, throughput, error_rate=0.0):
+    return {'endpoint': endpoint, 'concurrency': concurrency, 'p50_ms': p50, 'p95_ms': p95,
+            'throughput_rps': throughput, 'error_rate': error_rate}
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {'results': [_result('predict', 4, 40.0, 80.0, 50.0), _result('recommendations', 4, 0.4, 0.8, 2000.0)]}
+    current = {'results': [
+        _result('predict', 4, 44.0, 100.0, 49.0),           # p95 +25%
+        _result('recommendations', 4, 0.6, 1.2, 1900.0),    # +50%, but well under a millisecond
+        _result('predict', 16, 90.0, 200.0, 10.0),          # not in the baseline
+    ]}
+    rows = compare(current, baseline, tolerance=0.15)
+    regressions = {(r['endpoint'], r['metric']) for r in rows if r['regression']}
+    assert regressions == {('predict', 'p95_ms')}
+    assert all(r['concurrency'] == 4 for r in rows)
+
+    current['results'][0]['error_rate'] = 0.05
+    assert ('predict', 'error_rate') in {(r['endpoint'], r['metric']) for r in compare(current, baseline) if r['regression']}
+
+
+def test_run_level_reports_latency_percentiles():
+    client = FlaskClient(app_module.app)
+    uploads = make_uploads([(320, 240)], ['jpeg', 'png'], variants=1)
+    result = run_level(client, 'predict', 2, 6, uploads, make_recommendation_requests())
+    assert result['errors'] == 0
+    assert result['throughput_rps'] > 0
+    assert result['p50_ms'] <= result['p95_ms'] <= result['p99_ms'] <= result['max_ms']
+    assert set(result['p50_ms_by_image']) == {'320x240.jpeg', '320x240.png'}
+
+    result = run_level(client, 'recommendations', 2, 10, uploads, make_recommendation_requests())
+    assert result['statuses'] == {'200': 10}
@@ -0,0 +1,104 @@
+import io
+import logging
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+import metrics
+import timing
+from benchmarks.synthetic import encode_image, make_leaf_image
+from log_config import configure_logging, stop_logging
+
+
+def _sample(text, line_prefix):
+    """Value of the first exposition line starting with line_prefix"""
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+def test_histogram_and_counter_exposition():
+    histogram = metrics.Histogram('test_latency_seconds', 'Test latency', ('stage',), buckets=(0.01, 0.1))
+    counter = metrics.Counter('test_events_total', 'Test events', ('kind',))
+    for value in (0.005, 0.05, 0.5):
+        histogram.observe(value, stage='a')
+    counter.inc(kind='x')
+    counter.inc(2, kind='x')
+    with pytest.raises(ValueError):
+        counter.inc(other='y')
+
+    text = metrics.render()
+    assert '# TYPE test_latency_seconds histogram' in text
+    assert _sample(text, 'test_latency_seconds_bucket{stage="a",le="0.01"}') == 1
+    assert _sample(text, 'test_latency_seconds_bucket{stage="a",le="0.1"}') == 2
+    assert _sample(text, 'test_latency_seconds_bucket{stage="a",le="+Inf"}') == 3
+    assert _sample(text, 'test_latency_seconds_count{stage="a"}') == 3
+    assert _sample(text, 'test_events_total{kind="x"}') == 3
+
+
+def test_error_is_counted_once_in_innermost_stage():
+    before = metrics.ERRORS.value(stage='test_inner')
+    with pytest.raises(RuntimeError):
+        with timing.span('test_outer'):
+            with timing.span('test_inner'):
+                raise RuntimeError('boom')
+    assert metrics.ERRORS.value(stage='test_inner') == before + 1
+    assert metrics.ERRORS.value(stage='test_outer') == 0
+
+
+def test_prediction_pipeline_stages_on_metrics_endpoint():
+    client = app_module.app.test_client()
+    response = client.post('/api/predict', data={'image': (io.BytesIO(encode_image(make_leaf_image())), 'leaf.jpg')})
+    assert response.status_code == 200
+    stages = {entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')}
+    assert {'upload_read', 'decode', 'preprocess', 'leaf_inference', 'json_serialize'} <= stages
+
+    client.post('/api/get_recommendations', json={'disease_name': 'Late_blight', 'affected_percentage': 30,
+                                                   'farming_type': 'organic-ish'})
+    metrics_response = client.get('/metrics')
+    assert metrics_response.status_code == 200
+    assert metrics_response.content_type.startswith('text/plain')
+    text = metrics_response.get_data(as_text=True)
+    for stage in ('upload_read', 'decode', 'preprocess', 'leaf_inference', 'db_lookup', 'json_serialize'):
+        assert _sample(text, f'tomato_stage_duration_seconds_count{{stage="{stage}"}}') >= 1
+    assert _sample(text, 'tomato_requests_total{endpoint="/api/predict",status="200"}') >= 1
+    assert _sample(text, 'tomato_request_duration_seconds_count{endpoint="/api/predict"}') >= 1
+
+
+def test_rejections_low_confidence_and_errors_are_counted():
+    rejected = app_module.REJECTIONS.value(reason='not_leaf')
+    low = app_module.LOW_CONFIDENCE.value(model='disease')
+    app_module.count_prediction_outcomes([
+        {'status': 'rejected'},
+        {'status': 'success', 'disease_detection': {'is_confident': False}},
+        {'status': 'success', 'disease_detection': {'is_confident': True}},
+    ])
+    assert app_module.REJECTIONS.value(reason='not_leaf') == rejected + 1
+    assert app_module.LOW_CONFIDENCE.value(model='disease') == low + 1
+
+    errors = metrics.ERRORS.value(stage='predict')
+    response = app_module.app.test_client().post('/api/predict', data={'image': (io.BytesIO(b'not an image'), 'x.jpg')})
+    assert response.status_code == 500
+    assert metrics.ERRORS.value(stage='predict') == errors + 1
+    assert app_module.PREDICTIONS.value(outcome='error') >= 1
+
+
+def test_logging_is_asynchronous_and_can_be_disabled():
+    stream = io.StringIO()
+    logger = logging.getLogger('tomato.test')
+    try:
+        configure_logging('info', asynchronous=True, stream=stream)
+        logger.debug('hidden')
+        logger.info('written by the listener')
+        stop_logging()  # flushes the queue
+        assert 'INFO tomato.test: written by the listener' in stream.getvalue()
+        assert 'hidden' not in stream.getvalue()
+
+        configure_logging('off', stream=stream)
+        assert not logger.isEnabledFor(logging.CRITICAL)
+    finally:
+        configure_logging()
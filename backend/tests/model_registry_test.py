@@ -0,0 +1,113 @@
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+from benchmarks.synthetic import encode_image, make_leaf_image
+from model_registry import ModelRegistry, ModelSet
+
+
+class FakeBuilder:
+    def __init__(self):
+        self.count = 0
+        self.fail = False
+        self.missing = False
+
+    def __call__(self):
+        if self.fail:
+            raise RuntimeError('corrupt model file')
+        self.count += 1
+        models = {'leaf': object(), 'disease': None if self.missing else object()}
+        return ModelSet(f'v{self.count}', models)
+
+
+def _wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_swap_keeps_in_flight_requests_on_their_version():
+    registry = ModelRegistry(FakeBuilder())
+    assert registry.load()
+    with registry.acquire() as old:
+        assert registry.reload(wait=True)
+        assert registry.active.version == 'v2'
+        # The request keeps its version, also through nested acquire() and current()
+        with registry.acquire() as nested:
+            assert nested is old
+        assert registry.current() is old
+        assert not old.closed
+        assert registry.find(old.get('leaf')) is not None
+    assert _wait_until(lambda: old.closed)
+    assert registry.stats()['draining'] == []
+    assert [h['version'] for h in registry.stats()['history']] == ['v1', 'v2']
+
+
+def test_failed_or_incomplete_reload_keeps_active_version():
+    builder = FakeBuilder()
+    registry = ModelRegistry(builder)
+    registry.load()
+    builder.fail = True
+    assert not registry.reload(wait=True)
+    assert registry.active.version == 'v1'
+    assert 'corrupt model file' in registry.last_error
+
+    builder.fail, builder.missing = False, True
+    assert not registry.reload(wait=True)
+    assert registry.active.version == 'v1'
+    assert registry.stats()['failed_reloads'] == 2
+
+
+def test_watcher_reloads_once_changed_files_are_stable():
+    files = {'fingerprint': 'a'}
+    registry = ModelRegistry(FakeBuilder(), fingerprint=lambda: files['fingerprint'])
+    registry.load()
+    assert not registry.check_for_changes()
+
+    files['fingerprint'] = 'b'
+    assert not registry.check_for_changes()  # seen once: maybe still being written
+    assert registry.check_for_changes()
+    assert _wait_until(lambda: registry.active.version == 'v2' and not registry.reloading)
+    assert not registry.check_for_changes()
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(app_module, 'MODEL_ADMIN_TOKEN', 'secret')
+    return {'Authorization': 'Bearer secret'}
+
+
+def _predict(client):
+    return client.post('/api/predict', data={'image': (io.BytesIO(encode_image(make_leaf_image())), 'leaf.jpg')})
+
+
+def test_admin_reload_swaps_in_changed_model_files(admin_token):
+    client = app_module.app.test_client()
+    old = app_module.model_registry.active
+    assert _predict(client).get_json()['model_version'] == old.version
+
+    assert client.post('/api/admin/reload-models').status_code == 401
+    stat = os.stat(os.environ['LEAF_MODEL_PATH'])
+    os.utime(os.environ['LEAF_MODEL_PATH'], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    response = client.post('/api/admin/reload-models?wait=1', headers=admin_token)
+    assert response.status_code == 200
+    new_version = response.get_json()['model_version']
+    assert new_version != old.version
+
+    assert _predict(client).get_json()['model_version'] == new_version
+    info = client.get('/api/model-info').get_json()
+    assert info['configuration']['model_version'] == new_version
+    assert info['registry']['active']['version'] == new_version
+    assert _wait_until(lambda: old.closed)
+
+
+def test_reload_endpoint_disabled_without_token():
+    assert app_module.MODEL_ADMIN_TOKEN is None
+    assert app_module.app.test_client().post('/api/admin/reload-models').status_code == 404
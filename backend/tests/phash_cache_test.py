@@ -0,0 +1,54 @@
+import io
+import random
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from benchmarks.synthetic import encode_image, make_leaf_image
+from phash_cache import PerceptualCache, dhash, hamming
+
+
+def test_dhash_tolerates_recompression_and_resize():
+    original = make_leaf_image((1024, 768), seed=5)
+    recompressed = Image.open(io.BytesIO(encode_image(original.resize((512, 384)), quality=40)))
+    unrelated = make_leaf_image((1024, 768), seed=6).transpose(Image.FLIP_LEFT_RIGHT)
+
+    assert hamming(dhash(original), dhash(recompressed)) <= 4
+    assert hamming(dhash(original), dhash(unrelated)) > 4
+
+
+def test_lookup_matches_brute_force():
+    rng = random.Random(0)
+    cache = PerceptualCache('v1', max_distance=6)
+    stored = [rng.getrandbits(64) for _ in range(5000)]
+    for i, value in enumerate(stored):
+        cache.add(value, {'id': i})
+
+    for _ in range(300):
+        base = rng.choice(stored)
+        query = base
+        for bit in rng.sample(range(64), rng.randint(0, 9)):
+            query ^= 1 << bit
+        expected = min(hamming(query, v) for v in stored)
+        match = cache.lookup(query)
+        if expected <= 6:
+            assert match is not None
+            assert match.distance == expected
+            assert hamming(query, match.hash) == expected
+        else:
+            assert match is None
+
+
+def test_eviction_and_namespace():
+    cache = PerceptualCache('v1', max_entries=2)
+    cache.add(1, {'id': 1})
+    cache.add(2, {'id': 2})
+    cache.add(1 << 40, {'id': 3})
+    assert len(cache) == 2
+    assert cache.lookup(1, max_distance=0) is None
+    assert cache.lookup(2).value == {'id': 2}
+
+    cache.set_namespace('v2')
+    assert len(cache) == 0
@@ -0,0 +1,137 @@
+import asyncio
+import io
+import itertools
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+from benchmarks.synthetic import encode_image, make_leaf_image
+
+
+def _post(image, query='', **fields):
+    client = app_module.app.test_client()
+    return client.post('/api/predict-and-recommend' + query, data=dict(fields, image=(io.BytesIO(image), 'leaf.jpg')))
+
+
+def test_detection_and_recommendations_in_one_response():
+    image = encode_image(make_leaf_image(seed=800))
+    response = _post(image, affected_percentage='25', farming_type='organic', budget='low')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['status'] == 'success'
+    assert {'leaf_detection', 'disease_detection', 'recommendations'} <= set(body)
+    assert 'disease_info' in body['disease_detection'] and 'top_predictions' in body['disease_detection']
+    # affected_percentage was given: nothing to estimate, and the section says so
+    assert body['severity_estimate'] == {'skipped': True, 'message': 'Not estimated: affected_percentage was given'}
+
+    # The same section /api/get_recommendations returns for the detected disease
+    expected = app_module.app.test_client().post('/api/get_recommendations', json={
+        'disease_name': body['disease_detection']['disease'], 'affected_percentage': 25,
+        'farming_type': 'organic', 'budget': 'low'}).get_json()
+    assert body['recommendations'] == expected
+    assert body['recommendations']['disease_info']['severity'] == 'Moderate'
+    stages = {entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')}
+    assert {'leaf_inference', 'db_lookup', 'json_serialize'} <= stages
+
+
+def test_affected_percentage_is_estimated_when_missing():
+    body = _post(encode_image(make_leaf_image(size=(1200, 900), seed=801))).get_json()
+    estimate = body['severity_estimate']
+    assert body['recommendations']['disease_info']['affected_percentage'] == estimate['affected_percentage']
+
+
+def test_sections_can_be_selected():
+    image = encode_image(make_leaf_image(seed=802))
+    body = _post(image, query='?include=disease_detection', affected_percentage='5').get_json()
+    assert body['status'] == 'success'
+    assert set(body['disease_detection']) == {'disease', 'confidence', 'is_confident'}
+    assert 'leaf_detection' not in body and 'recommendations' not in body
+
+    body = _post(image, include='recommendations', affected_percentage='5').get_json()
+    assert 'recommendations' in body and 'disease_detection' not in body
+
+    response = _post(image, query='?include=disease_detection,everything')
+    assert response.status_code == 400
+    assert 'everything' in response.get_json()['message']
+
+
+def test_detection_and_estimate_share_one_model_version_and_decode(monkeypatch):
+    calls = []
+    open_image, predict, estimate = app_module.open_image, app_module._predict_upload, app_module._estimate_severity
+
+    def counting_open_image(*args, **kwargs):
+        calls.append('decode')
+        return open_image(*args, **kwargs)
+
+    def recording(name, fn):
+        def wrapper(models, *args):
+            calls.append((name, models))
+            return fn(models, *args)
+        return wrapper
+    monkeypatch.setattr(app_module, 'open_image', counting_open_image)
+    monkeypatch.setattr(app_module, '_predict_upload', recording('predict', predict))
+    monkeypatch.setattr(app_module, '_estimate_severity', recording('estimate', estimate))
+
+    body = _post(encode_image(make_leaf_image(size=(1200, 900), seed=806))).get_json()
+    assert 'affected_percentage' in body['severity_estimate']
+    assert calls.count('decode') == 1
+    (_, detection_models), (_, estimate_models) = [c for c in calls if c != 'decode']
+    assert detection_models is estimate_models
+
+
+def test_every_section_combination_is_valid_json():
+    image = encode_image(make_leaf_image(seed=805))
+    names = app_module.PREDICT_AND_RECOMMEND_SECTIONS
+    combinations = [()] + [c for n in range(1, len(names) + 1) for c in itertools.combinations(names, n)]
+    for combination in combinations:
+        query = '?include=' + ','.join(combination) if combination else ''
+        response = _post(image, query=query)
+        assert response.status_code == 200
+        body = json.loads(response.get_data())
+        sections = set(combination or names)
+        assert ('recommendations' in body) == ('recommendations' in sections)
+        assert ('severity_estimate' in body) == ('severity_estimate' in sections)
+        if 'recommendations' in body:
+            assert body['recommendations']['disease_info']['affected_percentage'] == \
+                body.get('severity_estimate', body['recommendations']['disease_info'])['affected_percentage']
+
+
+@pytest.mark.parametrize('disease', ['healthy', None])
+def test_nothing_to_recommend_without_a_disease(monkeypatch, disease):
+    def fake_predict(models, image_bytes, filename, image=None):
+        leaf_result = {'is_leaf': disease is not None, 'confidence': 0.9, 'label': '', 'raw_probability': 0.1}
+        disease_result = disease and {'disease': disease, 'confidence': 0.9, 'confidence_percent': 90.0,
+                                      'is_confident': True, 'all_predictions': []}
+        return app_module.build_prediction_response(leaf_result, disease_result), 200
+    monkeypatch.setattr(app_module, '_predict_upload', fake_predict)
+
+    response = _post(encode_image(make_leaf_image(seed=803)), affected_percentage='40')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['status'] == ('success' if disease else 'rejected')
+    assert 'recommendations' not in body
+
+
+def test_asgi_route_matches_flask():
+    httpx = pytest.importorskip('httpx')
+    import asgi
+
+    image = encode_image(make_leaf_image(seed=804))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url='http://test') as client:
+            return await client.post('/api/predict-and-recommend?include=disease_detection,recommendations',
+                                     files={'image': ('leaf.jpg', image, 'image/jpeg')},
+                                     data={'affected_percentage': '70'})
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    expected = _post(image, query='?include=disease_detection,recommendations', affected_percentage='70').get_json()
+    body = response.json()
+    assert set(body) == set(expected) - {'cache'}  # the second upload of the image is a cache hit
+    assert body['recommendations'] == expected['recommendations']
+    assert body['disease_detection']['disease'] == expected['disease_detection']['disease']
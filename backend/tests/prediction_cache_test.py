@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from prediction_cache import PredictionCache
+
+
+def test_hit_miss_and_counters():
+    cache = PredictionCache('v1')
+    key = cache.make_key(b'image-bytes', 'predict')
+
+    assert cache.get(key) is None
+    cache.put(key, {'disease': 'Early_blight', 'confidence': 0.9})
+    assert cache.get(key) == {'disease': 'Early_blight', 'confidence': 0.9}
+    assert cache.make_key(b'other-bytes', 'predict') != key
+    assert cache.make_key(b'image-bytes', 'disease-only') != key
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['entries'] == 1
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = PredictionCache('v1', max_entries=2)
+    for name in ('a', 'b'):
+        cache.put(name, {'v': name})
+    cache.get('a')
+    cache.put('c', {'v': 'c'})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'v': 'a'}
+
+    small = PredictionCache('v1', max_bytes=30)
+    small.put('x', {'v': 'x' * 10})
+    small.put('y', {'v': 'y' * 10})
+    assert small.get('x') is None
+    assert small.stats()['bytes'] <= 30
+
+
+def test_namespace_change_invalidates(tmp_path):
+    cache = PredictionCache('model-a', disk_dir=str(tmp_path))
+    cache.put('k', {'v': 1})
+    cache.set_namespace('model-b')
+    assert cache.get('k') is None
+    assert cache.stats()['invalidations'] == 1
+    assert not (tmp_path / 'model-a').exists()
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    PredictionCache('v1', disk_dir=str(tmp_path)).put('k', {'v': 1})
+
+    restarted = PredictionCache('v1', disk_dir=str(tmp_path))
+    assert restarted.get('k') == {'v': 1}
+    assert restarted.stats()['disk_hits'] == 1
+    assert restarted.get('k') == {'v': 1}
+    assert restarted.stats()['hits'] == 1
+
+
+def test_disk_tier_is_bounded_and_evicts_least_recently_used(tmp_path):
+    cache = PredictionCache('v1', max_entries=1, disk_dir=str(tmp_path), disk_max_entries=10)
+    for i in range(10):
+        cache.put(f'k{i:02d}', {'v': i})
+        # Distinct mtimes, oldest first; k00 is then read again and becomes the most recent
+        os.utime(cache._disk_path(f'k{i:02d}'), (1000 + i, 1000 + i))
+    assert PredictionCache('v1', disk_dir=str(tmp_path)).get('k00') == {'v': 0}
+
+    cache.put('k10', {'v': 10})
+    stats = cache.stats()
+    assert stats['disk_entries'] <= 9 and stats['disk_evictions'] >= 2
+    assert len(list((tmp_path / 'v1').rglob('*.json'))) == stats['disk_entries']
+    restarted = PredictionCache('v1', disk_dir=str(tmp_path))
+    assert restarted.get('k00') == {'v': 0} and restarted.get('k10') == {'v': 10}
+    assert restarted.get('k01') is None and restarted.get('k02') is None
+
+    small = PredictionCache('v2', disk_dir=str(tmp_path / 'small'), disk_max_bytes=100)
+    for i in range(20):
+        small.put(f'k{i}', {'v': 'x' * 20})
+    assert small.stats()['disk_bytes'] <= 100
+
+
+def test_other_namespaces_are_pruned_only_when_owned_or_idle(tmp_path):
+    # Another replica (or a draining model version) still serving v1
+    PredictionCache('v1', disk_dir=str(tmp_path)).put('k', {'v': 1})
+    PredictionCache('stale', disk_dir=str(tmp_path)).put('k', {'v': 0})
+    os.utime(tmp_path / 'stale', (time.time() - 3600, time.time() - 3600))
+
+    cache = PredictionCache('v2', disk_dir=str(tmp_path), disk_ttl=600)
+    assert (tmp_path / 'v1').exists()
+    assert not (tmp_path / 'stale').exists()
+    assert PredictionCache('v1', disk_dir=str(tmp_path)).get('k') == {'v': 1}
+
+    # Its own previous namespace is dropped on a switch
+    cache.put('k', {'v': 2})
+    cache.set_namespace('v3')
+    assert not (tmp_path / 'v2').exists()
+    assert (tmp_path / 'v1').exists()
@@ -0,0 +1,87 @@
+import io
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image, ImageFile
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+import preprocessing
+from benchmarks.synthetic import make_leaf_image
+
+
+def test_preprocess_matches_reference_pipeline():
+    image = make_leaf_image((640, 480))
+    reference = np.asarray(image.resize(app_module.IMG_SIZE), dtype=np.float32)[None] / np.float32(255.0)
+
+    result = app_module.preprocess_image(image)
+
+    assert result.dtype == np.float32
+    assert result.shape == (1, 224, 224, 3)
+    np.testing.assert_array_equal(result, reference)
+
+
+def test_preprocess_reuses_thread_buffer():
+    buffer = app_module.get_preprocess_buffer()
+    first = app_module.preprocess_image(make_leaf_image(seed=1), out=buffer)
+    second = app_module.preprocess_image(make_leaf_image(seed=2).convert('RGBA'), out=app_module.get_preprocess_buffer())
+
+    assert first is buffer
+    assert second is buffer
+
+
+def test_decode_converts_to_rgb():
+    pixels = preprocessing.decode_image(Image.new('L', (50, 80), color=128))
+    assert pixels.shape == (224, 224, 3)
+    assert pixels.dtype == np.uint8
+
+
+def _jpeg(image, **kwargs):
+    buf = io.BytesIO()
+    image.save(buf, format='JPEG', quality=90, **kwargs)
+    return buf.getvalue()
+
+
+def test_draft_decode_of_large_photo_stays_within_tolerance():
+    data = _jpeg(make_leaf_image((3264, 2448), seed=3))
+    full = preprocessing.open_image(data, draft=False)
+    reduced = preprocessing.open_image(data, draft=True)
+    assert full.size == (3264, 2448)
+    # Scaled down in the DCT domain, but never below twice the model input
+    assert reduced.size[0] < 3264 and min(reduced.size) >= 2 * 224
+
+    full_input = app_module.preprocess_image(full)
+    reduced_input = app_module.preprocess_image(reduced)
+    assert np.abs(full_input - reduced_input).mean() * 255 < 1.0
+
+    batch = np.concatenate([full_input, reduced_input])
+    leaf = app_module.leaf_model.predict(batch, verbose=0)
+    disease = app_module.disease_model.predict(batch, verbose=0)
+    assert abs(leaf[0, 0] - leaf[1, 0]) < 0.01
+    assert np.abs(disease[0] - disease[1]).max() < 0.01
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # stored sideways, display rotated 90 degrees clockwise
+    data = _jpeg(make_leaf_image((640, 480)), exif=exif.tobytes())
+    image = preprocessing.open_image(data)
+    assert image.size == (480, 640)
+    assert image.getexif().get(0x0112) is None
+
+
+def test_decompression_bomb_rejected_before_decoding(monkeypatch):
+    def fail(self):
+        raise AssertionError('pixels decoded')
+
+    data = _jpeg(make_leaf_image((640, 480)))
+    monkeypatch.setattr(ImageFile.ImageFile, 'load', fail)
+    with pytest.raises(preprocessing.ImageTooLarge):
+        preprocessing.open_image(data, max_pixels=640 * 480 - 1)
+    monkeypatch.undo()
+
+    monkeypatch.setattr(preprocessing, 'MAX_IMAGE_PIXELS', 1000)
+    response = app_module.app.test_client().post('/api/predict', data={'image': (io.BytesIO(data), 'big.jpg')})
+    assert response.status_code == 413
@@ -0,0 +1,101 @@
+import itertools
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+import recommendation_queries
+from migrate_treatment_db import migrate
+
+SCHEMA_PATH = Path(__file__).resolve().parents[1] / 'treatment_database.sql'
+PARAMS = {'disease_name': 'Late_blight', 'normalized_name': 'Late blight', 'disease_id': 1,
+          'severity_id': 2, 'farming_type': 'organic', 'budget': 'low'}
+
+
+def _scans(conn):
+    found = []
+    for name, sql in recommendation_queries.PER_REQUEST_QUERIES.items():
+        for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, PARAMS):
+            if row[3].startswith('SCAN'):
+                found.append(f'{name}: {row[3]}')
+    return found
+
+
+def test_per_request_queries_use_indexes():
+    conn = sqlite3.connect(os.environ['TREATMENT_DB_PATH'])
+    try:
+        assert _scans(conn) == []
+    finally:
+        conn.close()
+
+
+def test_migration_removes_scans(tmp_path):
+    # Recreate the schema as it was before normalized_name and the mapping indexes
+    old_schema = SCHEMA_PATH.read_text(encoding='utf-8')
+    old_schema = '\n'.join(
+        line for line in old_schema.splitlines()
+        if 'normalized_name' not in line and 'idx_severity_mapping' not in line
+        and 'Lookup key for names' not in line
+    ).replace('prevention_tips TEXT,\n);', 'prevention_tips TEXT\n);')
+    db_path = tmp_path / 'old.db'
+    conn = sqlite3.connect(db_path)
+    conn.executescript(old_schema)
+    conn.close()
+
+    assert len(migrate(str(db_path))) == 5
+    assert migrate(str(db_path)) == []
+    conn = sqlite3.connect(db_path)
+    try:
+        assert _scans(conn) == []
+    finally:
+        conn.close()
+
+
+def test_sql_path_matches_in_memory_catalog():
+    combos = itertools.product(['Late_blight', 'Late blight', 'healthy', 'Leaf_Mold', 'Unknown'],
+                               [1, 2, 3, 4], ['organic', 'chemical', 'mixed'], ['low', 'medium', 'high'])
+    for disease_name, severity_id, farming_type, budget in combos:
+        disease, treatments, practices = app_module.rank_treatments_from_index(
+            disease_name, severity_id, farming_type, budget)
+        sql_disease, sql_treatments, sql_practices = app_module.rank_treatments_from_sql(
+            disease_name, severity_id, farming_type, budget)
+        assert (disease or {}).get('disease_id') == (sql_disease or {}).get('disease_id')
+        assert [(t['treatment_id'], t['recommendation_score']) for t in treatments] == \
+            [(t['treatment_id'], t['recommendation_score']) for t in sql_treatments]
+        assert [p['practice_id'] for p in practices] == [p['practice_id'] for p in sql_practices]
+
+
+def test_tied_scores_rank_the_same_on_both_paths(tmp_path, monkeypatch):
+    db_path = tmp_path / 'tied.db'
+    source = sqlite3.connect(os.environ['TREATMENT_DB_PATH'])
+    conn = sqlite3.connect(db_path)
+    source.backup(conn)
+    source.close()
+    disease_name = conn.execute('SELECT disease_name FROM diseases WHERE disease_id = 1').fetchone()[0]
+    first, second = [row[0] for row in conn.execute(
+        'SELECT treatment_id FROM treatments WHERE disease_id = 1 ORDER BY treatment_id LIMIT 2')]
+    # 80.00 + priority 1 (+8) and 82.04 + priority 2 (+6): 88.00 and 88.04, both 88.0 once rounded
+    conn.execute('DELETE FROM treatment_severity_mapping')
+    conn.execute('UPDATE treatments SET is_organic = 0, cost_per_acre_inr = 1500, priority = 1, '
+                 'effectiveness_percentage = 80.0 WHERE treatment_id = ?', (first,))
+    conn.execute('UPDATE treatments SET is_organic = 0, cost_per_acre_inr = 1500, priority = 2, '
+                 'effectiveness_percentage = 82.04 WHERE treatment_id = ?', (second,))
+    conn.commit()
+    conn.close()
+
+    index = app_module.RecommendationIndex(str(db_path), reload_interval=0)
+    assert index.load()
+    monkeypatch.setattr(app_module, 'recommendation_index', index)
+    pool = app_module.ConnectionPool(str(db_path), max_size=1)
+    monkeypatch.setattr(app_module, 'get_db_connection', pool.connection)
+
+    _, treatments, _ = app_module.rank_treatments_from_index(disease_name, 2, 'mixed', 'medium')
+    _, sql_treatments, _ = app_module.rank_treatments_from_sql(disease_name, 2, 'mixed', 'medium')
+    pool.close()
+    ranked = [t['treatment_id'] for t in treatments]
+    scores = {t['treatment_id']: t['recommendation_score'] for t in treatments}
+    assert scores[first] == scores[second] == 88.0
+    assert ranked.index(first) < ranked.index(second)
+    assert ranked == [t['treatment_id'] for t in sql_treatments]
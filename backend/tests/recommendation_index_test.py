@@ -0,0 +1,58 @@
+import os
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+from recommendation_index import RecommendationIndex
+
+
+def test_index_matches_catalog():
+    index = RecommendationIndex(os.environ['TREATMENT_DB_PATH'], reload_interval=0)
+    assert index.load()
+    stats = index.stats()
+    assert stats['diseases'] == 11
+    assert stats['treatments'] == 45
+    assert index.find_disease('Late blight') is index.find_disease('Late_blight')
+
+    disease = index.find_disease('Late_blight')
+    treatments = index.snapshot.treatments_by_disease[disease['disease_id']]
+    assert all(t['category_name'] for t in treatments)
+    assert [(t['priority'], -t['effectiveness_percentage']) for t in treatments] == \
+        sorted((t['priority'], -t['effectiveness_percentage']) for t in treatments)
+
+
+def test_recommendations_do_no_io(monkeypatch):
+    def no_connect(*args, **kwargs):
+        raise AssertionError('request path opened a database connection')
+    monkeypatch.setattr(sqlite3, 'connect', no_connect)
+
+    response = app_module.app.test_client().post('/api/get_recommendations', json={
+        'disease_name': 'Early_blight', 'affected_percentage': 25, 'farming_type': 'organic', 'budget': 'low'
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['disease_info']['severity'] == 'Moderate'
+    assert 1 <= len(body['treatments']) <= 3
+    scores = [t['recommendation_score'] for t in body['treatments']]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_reloads_when_db_file_changes(tmp_path):
+    db_path = tmp_path / 'catalog.db'
+    shutil.copy(os.environ['TREATMENT_DB_PATH'], db_path)
+    index = RecommendationIndex(str(db_path), reload_interval=0)
+    assert index.load()
+    assert not index.maybe_reload()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE diseases SET description = 'updated' WHERE disease_name = 'Leaf_Mold'")
+    conn.commit()
+    conn.close()
+    os.utime(db_path, ns=(index.snapshot.version[0] + 10**9,) * 2)
+
+    assert index.maybe_reload()
+    assert index.find_disease('Leaf_Mold')['description'] == 'updated'
+    assert index.reloads == 2
@@ -0,0 +1,42 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+from recommendation_matrix import BUDGETS, FARMING_TYPES
+
+
+def test_precomputed_matches_live_scoring():
+    catalog = app_module.recommendation_index.snapshot
+    assert len(app_module.recommendation_matrix) == len(catalog.diseases_by_name) * 4 * 3 * 3
+
+    for disease_name in catalog.diseases_by_name:
+        for affected_percentage in (0.0, 10.0, 10.5, 27.0, 30.0, 59.9, 61.0, 100.0):
+            for farming_type in FARMING_TYPES:
+                for budget in BUDGETS:
+                    body = app_module.get_precomputed_recommendations(
+                        disease_name, affected_percentage, farming_type, budget)
+                    live = app_module.get_recommendations_from_db(
+                        disease_name, affected_percentage, farming_type, budget)
+                    assert body is not None
+                    assert json.loads(body) == json.loads(app_module.app.json.dumps(live))
+
+
+def test_endpoint_serves_precomputed_and_live_paths():
+    client = app_module.app.test_client()
+    payload = {'disease_name': 'Tomato_Late_blight', 'affected_percentage': 42, 'farming_type': 'organic'}
+    response = client.post('/api/get_recommendations', json=payload)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['disease_info']['affected_percentage'] == 42.0
+    assert body['disease_info']['severity'] == 'Severe'
+    assert body['preferences'] == {'farming_type': 'organic', 'budget': 'medium'}
+
+    # Values outside the matrix fall back to live scoring
+    response = client.post('/api/get_recommendations', json=dict(payload, budget='unlimited'))
+    assert response.status_code == 200
+    assert response.get_json()['preferences']['budget'] == 'unlimited'
+
+    response = client.post('/api/get_recommendations', json=dict(payload, disease_name='Unknown'))
+    assert response.status_code == 400
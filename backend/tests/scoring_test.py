@@ -0,0 +1,60 @@
+import itertools
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+from scoring import TreatmentScorer
+
+FARMING_TYPES = ['organic', 'chemical', 'mixed', 'other']
+BUDGETS = ['low', 'medium', 'high', 'other']
+
+
+def _reference_top(treatments, farming_type, budget, k=3):
+    scored = [(round(app_module.calculate_treatment_score(t, farming_type, budget), 1), i)
+              for i, t in enumerate(treatments)]
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return scored[:k]
+
+
+def test_vectorized_scores_match_reference():
+    catalog = app_module.recommendation_index.snapshot
+    treatments = [t for rows in catalog.treatments_by_disease.values() for t in rows]
+    # Edge cases for the defaults and cost thresholds
+    treatments += [
+        dict(treatments[0], cost_per_acre_inr=None, priority=None),
+        dict(treatments[0], cost_per_acre_inr=1000, priority=0, is_organic=1),
+        dict(treatments[0], cost_per_acre_inr=2000.5, effectiveness_percentage=100),
+    ]
+    scorer = TreatmentScorer(treatments)
+    combos = list(itertools.product(FARMING_TYPES, BUDGETS))
+    scores = scorer.score([f for f, _ in combos], [b for _, b in combos])
+
+    expected = np.array([[app_module.calculate_treatment_score(t, f, b) for t in treatments] for f, b in combos])
+    np.testing.assert_allclose(scores, expected)
+
+
+def test_top_k_matches_reference_ranking():
+    catalog = app_module.recommendation_index.snapshot
+    for treatments in catalog.treatments_by_disease.values():
+        scorer = TreatmentScorer(treatments)
+        combos = list(itertools.product(FARMING_TYPES, BUDGETS))
+        indices, top_scores = scorer.top_k(scorer.score([f for f, _ in combos], [b for _, b in combos]), k=3)
+        for row, (farming_type, budget) in enumerate(combos):
+            reference = _reference_top(treatments, farming_type, budget)
+            assert indices[row].tolist() == [i for _, i in reference]
+            assert top_scores[row].tolist() == [s for s, _ in reference]
+
+
+def test_cost_override_for_pricing_scenarios():
+    treatments = app_module.recommendation_index.snapshot.treatments_by_disease[1]
+    scorer = TreatmentScorer(treatments)
+    multipliers = np.array([0.5, 1.0, 3.0])[:, None]
+    scores = scorer.score(['mixed'] * 3, ['low'] * 3, costs=scorer.cost * multipliers)
+
+    for row, multiplier in enumerate(multipliers[:, 0]):
+        repriced = [dict(t, cost_per_acre_inr=c) for t, c in zip(treatments, scorer.cost * multiplier)]
+        np.testing.assert_allclose(
+            scores[row], [app_module.calculate_treatment_score(t, 'mixed', 'low') for t in repriced])
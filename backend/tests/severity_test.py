@@ -0,0 +1,93 @@
+import io
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+from benchmarks.synthetic import encode_image, make_leaf_image
+from severity import SEVERITY_MAX_TILES, estimate_coverage, foreground_fraction, tile_grid, tile_image
+
+
+def test_tile_grid_is_bounded_and_never_upsamples():
+    for width, height in ((4032, 3024), (8000, 6000), (640, 480), (200, 150), (6000, 300)):
+        columns, rows = tile_grid(width, height, (224, 224), 16)
+        assert 1 <= columns * rows <= 16
+        if width >= 224 and height >= 224:
+            assert width // columns >= 224 and height // rows >= 224
+    assert tile_grid(4032, 3024, (224, 224), 16) == (4, 3)
+    assert tile_grid(200, 150) == (1, 1)
+
+
+def test_tiles_are_laid_out_in_row_major_grid_order():
+    colors = [(200, 30, 30), (30, 200, 30), (30, 30, 200), (200, 200, 30)]
+    image = Image.new('RGB', (448, 448))
+    for i, color in enumerate(colors):
+        image.paste(color, (224 * (i % 2), 224 * (i // 2), 224 * (i % 2 + 1), 224 * (i // 2 + 1)))
+
+    tiles, grid = tile_image(image, (224, 224), max_tiles=4)
+    assert grid == (2, 2)
+    assert tiles.shape == (4, 224, 224, 3) and tiles.dtype == np.uint8
+    for tile, color in zip(tiles, colors):
+        assert tuple(tile[112, 112]) == color
+
+
+def test_coverage_counts_leaf_tiles_only():
+    class_names = ['Early_blight', 'Late_blight', 'healthy']
+    probabilities = np.array([
+        [0.1, 0.8, 0.1],  # affected
+        [0.0, 0.1, 0.9],  # healthy
+        [0.2, 0.7, 0.1],  # affected
+        [0.0, 0.1, 0.9],  # healthy
+        [0.9, 0.1, 0.0],  # background: ignored
+    ])
+    foreground = np.array([1.0, 1.0, 1.0, 1.0, 0.05])
+    estimate = estimate_coverage(probabilities, foreground, class_names, healthy_index=2)
+    assert estimate['affected_percentage'] == 50.0
+    assert estimate['disease'] == 'Late_blight'
+    assert estimate['tiles'] == 5 and estimate['leaf_tiles'] == 4 and estimate['affected_tiles'] == 2
+
+    # No tile looks like leaf: every tile counts
+    estimate = estimate_coverage(probabilities, np.zeros(5), class_names, healthy_index=2)
+    assert estimate['leaf_tiles'] == 0
+    assert estimate['affected_percentage'] == 60.0
+
+
+def test_foreground_ignores_grey_and_dark_tiles():
+    tiles = np.zeros((3, 8, 8, 3), dtype=np.uint8)
+    tiles[0] = (60, 140, 40)  # leaf green
+    tiles[1] = (180, 180, 175)  # grey bench
+    tiles[2] = (10, 20, 5)  # shadow
+    assert foreground_fraction(tiles).tolist() == [1.0, 0.0, 0.0]
+
+
+def test_estimated_severity_feeds_the_recommendations():
+    photo = encode_image(make_leaf_image(size=(1600, 1200), seed=3), 'JPEG', quality=90)
+    response = app_module.app.test_client().post('/api/get_recommendations', data={
+        'image': (io.BytesIO(photo), 'field.jpg'),
+        'disease_name': 'Late_blight',
+        'farming_type': 'organic'
+    })
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    estimate = body['severity_estimate']
+    assert 0 <= estimate['affected_percentage'] <= 100
+    assert 1 <= estimate['tiles'] <= SEVERITY_MAX_TILES
+    assert estimate['tiles'] == estimate['grid'][0] * estimate['grid'][1]
+    assert body['disease_info']['affected_percentage'] == estimate['affected_percentage']
+    assert body['disease_info']['severity'] == app_module.get_severity(estimate['affected_percentage'])[1]
+    assert body['preferences']['farming_type'] == 'organic'
+    assert {'tile', 'severity_inference', 'db_lookup'} <= {
+        entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')}
+
+    # Without a disease name, the disease estimated from the tiles is used
+    response = app_module.app.test_client().post('/api/get_recommendations', data={
+        'image': (io.BytesIO(photo), 'field.jpg')
+    })
+    estimate = response.get_json()['severity_estimate']
+    assert estimate['disease'] != 'healthy'
+    if response.status_code == 200:
+        assert response.get_json()['disease_info']['name'] == \
+            app_module.DISEASE_NAME_MAPPING.get(estimate['disease'], estimate['disease'])
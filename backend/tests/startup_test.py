@@ -0,0 +1,101 @@
+import io
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+from benchmarks.synthetic import encode_image, make_leaf_image
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def _run_app(env, script):
+    """Import app.py in a fresh interpreter with the given environment, run script, return its JSON output"""
+    result = subprocess.run(
+        [sys.executable, '-c', script],
+        cwd=BACKEND_DIR, env=dict(os.environ, TF_CPP_MIN_LOG_LEVEL='2', **env),
+        capture_output=True, text=True, timeout=300
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_recommendation_role_never_imports_tensorflow():
+    out = _run_app({'SERVING_ROLE': 'recommendations'}, """
+import json, sys
+import app
+client = app.app.test_client()
+home = client.get('/')
+recs = client.post('/api/get_recommendations', json={'disease_name': 'Early_blight', 'affected_percentage': 20})
+predict = client.post('/api/predict', data={})
+print(json.dumps({
+    'tensorflow': 'tensorflow' in sys.modules,
+    'home': [home.status_code, home.get_json()['readiness']],
+    'recommendations': recs.status_code,
+    'classes': client.get('/api/classes').status_code,
+    'predict': predict.status_code
+}))
+""")
+    assert out == {
+        'tensorflow': False,
+        'home': [200, 'ready'],
+        'recommendations': 200,
+        'classes': 200,
+        'predict': 503
+    }
+
+
+def test_lazy_loading_waits_for_first_prediction():
+    out = _run_app({'MODEL_LOAD_MODE': 'lazy'}, """
+import io, json, sys
+import app
+client = app.app.test_client()
+before = {'tensorflow': 'tensorflow' in sys.modules, 'state': app.model_loading['state'],
+          'home': client.get('/').status_code}
+from benchmarks.synthetic import encode_image, make_leaf_image
+response = client.post('/api/predict', data={'image': (io.BytesIO(encode_image(make_leaf_image())), 'leaf.jpg')})
+print(json.dumps({'before': before, 'predict': response.status_code, 'state': app.model_loading['state'],
+                  'home': client.get('/').get_json()['readiness']}))
+""")
+    assert out == {
+        'before': {'tensorflow': False, 'state': 'not_started', 'home': 200},
+        'predict': 200,
+        'state': 'ready',
+        'home': 'ready'
+    }
+
+
+def test_home_reports_starting_until_models_load(monkeypatch):
+    client = app_module.app.test_client()
+    assert client.get('/').get_json()['readiness'] == 'ready'
+
+    monkeypatch.setattr(app_module.model_registry, 'active', None)
+    monkeypatch.setitem(app_module.model_loading, 'state', 'loading')
+    response = client.get('/')
+    assert response.status_code == 503
+    assert response.get_json()['readiness'] == 'starting'
+    assert response.get_json()['models']['leaf_model']['status'] == 'Loading'
+
+    monkeypatch.setitem(app_module.model_loading, 'state', 'failed')
+    response = client.get('/')
+    assert response.status_code == 200
+    assert response.get_json()['readiness'] == 'degraded'
+
+
+def test_prediction_while_loading_is_retryable(monkeypatch):
+    monkeypatch.setattr(app_module.model_registry, 'active', None)
+    monkeypatch.setitem(app_module.model_loading, 'state', 'loading')
+    monkeypatch.setattr(app_module, 'MODEL_LOAD_WAIT', 0)
+    response = app_module.app.test_client().post(
+        '/api/predict', data={'image': (io.BytesIO(encode_image(make_leaf_image())), 'leaf.jpg')})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+
+
+def test_models_are_not_compiled():
+    # Inference-only serving: no optimizer state is built
+    assert getattr(app_module.leaf_model, 'optimizer', None) is None
+    assert getattr(app_module.disease_model, 'optimizer', None) is None
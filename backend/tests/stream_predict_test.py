@@ -0,0 +1,107 @@
+import io
+import json
+import sys
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+from benchmarks.synthetic import encode_image, make_leaf_image
+from model_registry import ModelSet
+from upload_stream import iter_multipart_files
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+
+def test_stream_matches_buffered_batch(monkeypatch):
+    monkeypatch.setattr(app_module, 'STREAM_BATCH_SIZE', 2)
+    client = app_module.app.test_client()
+    images = [encode_image(make_leaf_image(seed=300 + i)) for i in range(5)]
+
+    def files():
+        return [(io.BytesIO(data), f'leaf_{i}.jpg') for i, data in enumerate(images)] + \
+            [(io.BytesIO(b'not an image'), 'broken.jpg')]
+
+    buffered = client.post('/api/predict/batch', data={'images': files()}).get_json()
+    response = client.post('/api/predict/batch?stream=1', data={'images': files()})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+
+    lines = _lines(response)
+    results, final = lines[:-1], lines[-1]
+    assert [r['index'] for r in results] == list(range(6))
+    assert [r['filename'] for r in results] == [r['filename'] for r in buffered['results']]
+    assert [r['status'] for r in results] == [r['status'] for r in buffered['results']]
+    for key in ('total', 'success', 'rejected', 'errors', 'diseases'):
+        assert final['summary'][key] == buffered['summary'][key]
+
+
+def test_stream_zip_archive():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as archive:
+        for i in range(3):
+            archive.writestr(f'plot/{i}.png', encode_image(make_leaf_image(seed=400 + i), 'PNG'))
+    buf.seek(0)
+
+    response = app_module.app.test_client().post(
+        '/api/predict/batch', data={'archive': (buf, 'plot.zip')},
+        headers={'Accept': 'application/x-ndjson'})
+    lines = _lines(response)
+    assert [r['filename'] for r in lines[:-1]] == [f'plot/{i}.png' for i in range(3)]
+    assert lines[-1]['summary']['total'] == 3
+
+
+def test_multipart_reader_is_incremental():
+    boundary = 'xyzBOUNDARY'
+    parts = []
+    for i in range(3):
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="images"; filename="{i}.jpg"\r\n'
+                     f'Content-Type: image/jpeg\r\n\r\n'.encode() + bytes([i]) * 1000 + b'\r\n')
+    body = b''.join(parts) + f'--{boundary}--\r\n'.encode()
+
+    stream = io.BytesIO(body)
+    uploads = iter_multipart_files(stream, boundary, max_file_size=500, chunk_size=256)
+    name, data = next(uploads)
+    assert name == '0.jpg' and data is None  # over max_file_size, not buffered
+    assert stream.tell() < len(body)  # later parts not read yet
+    assert [n for n, _ in uploads] == ['1.jpg', '2.jpg']
+
+
+def test_stream_keeps_one_model_version(monkeypatch):
+    monkeypatch.setattr(app_module, 'STREAM_BATCH_SIZE', 2)
+    registry = app_module.model_registry
+    started_on = registry.active
+    seen = []
+    predict_image_batch = app_module.predict_image_batch
+
+    def predict_and_swap(chunk, start_index=0):
+        seen.append((registry.current(), started_on.in_flight))
+        # A reload lands while the stream is running
+        monkeypatch.setattr(registry, 'active', ModelSet('swapped', {}))
+        return predict_image_batch(chunk, start_index=start_index)
+    monkeypatch.setattr(app_module, 'predict_image_batch', predict_and_swap)
+
+    files = [(io.BytesIO(encode_image(make_leaf_image(seed=500 + i))), f'leaf_{i}.jpg') for i in range(5)]
+    response = app_module.app.test_client().post('/api/predict/batch?stream=1', data={'images': files})
+    lines = _lines(response)
+    assert lines[-1]['summary']['total'] == 5
+    assert [r['status'] for r in lines[:-1]].count('error') == 0
+    assert len(seen) == 3
+    assert all(models is started_on and in_flight > 0 for models, in_flight in seen)
+
+
+def test_oversized_archive_is_rejected(monkeypatch):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as archive:
+        for i in range(3):
+            archive.writestr(f'{i}.png', encode_image(make_leaf_image(seed=600 + i), 'PNG'))
+    data = buf.getvalue()
+    monkeypatch.setattr(app_module, 'MAX_ARCHIVE_SIZE', len(data) // 2)
+
+    client = app_module.app.test_client()
+    for query in ('', '?stream=1'):
+        response = client.post('/api/predict/batch' + query, data={'archive': (io.BytesIO(data), 'plot.zip')})
+        assert response.status_code == 413
+        assert response.get_json()['status'] == 'error'
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from benchmarks.synthetic import build_disease_model, make_leaf_image
+from export_tflite import convert
+from inference import TFLiteModel
+import app as app_module
+
+
+def _batch():
+    return np.concatenate([app_module.preprocess_image(make_leaf_image(seed=i)) for i in range(3)])
+
+
+def _export(tmp_path, model, variant, calibration_paths=None):
+    path = tmp_path / f'disease_{variant}.tflite'
+    path.write_bytes(convert(model, variant, calibration_paths))
+    return TFLiteModel(str(path), 'disease', num_threads=1)
+
+
+def test_float_variants_match_keras(tmp_path):
+    model = build_disease_model()
+    batch = _batch()
+    expected = np.asarray(model(batch, training=False))
+
+    for variant in ('dynamic', 'float16'):
+        tflite_model = _export(tmp_path, model, variant)
+        outputs = tflite_model.predict(batch)
+        assert outputs.shape == expected.shape
+        np.testing.assert_allclose(outputs, expected, atol=1e-2)
+
+
+def test_int8_variant_takes_and_returns_float(tmp_path):
+    model = build_disease_model()
+    calibration = []
+    for i in range(4):
+        path = tmp_path / f'calib_{i}.jpg'
+        make_leaf_image(seed=10 + i).save(path)
+        calibration.append(str(path))
+
+    tflite_model = _export(tmp_path, model, 'int8', calibration)
+    outputs = tflite_model.predict(_batch())
+
+    assert tflite_model.info()['input_dtype'] == 'int8'
+    assert outputs.dtype == np.float32
+    assert outputs.shape == (3, 11)
+    np.testing.assert_allclose(outputs.sum(axis=1), 1.0, atol=0.1)
@@ -0,0 +1,119 @@
+import asyncio
+import io
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import app as app_module
+from benchmarks.synthetic import encode_image, make_leaf_image
+from preprocessing import BufferReader
+from upload_stream import upload_buffer
+
+
+def _large_jpeg(seed):
+    data = encode_image(make_leaf_image(size=(4000, 3000), seed=seed), 'JPEG', quality=95)
+    assert 3 * app_module.UPLOAD_SPOOL_SIZE < len(data) < app_module.MAX_FILE_SIZE
+    return data
+
+
+def _ingest_peak(path, data, handler):
+    """Peak Python allocation of reading one upload, and of running the endpoint's work on it"""
+    # The request body itself is built before measuring; it arrives from the socket in production
+    with app_module.app.test_request_context(path, method='POST',
+                                             data={'image': (io.BytesIO(data), 'leaf.jpg')}):
+        tracemalloc.start()
+        try:
+            filename, upload, error = app_module.read_image_upload()
+            assert error is None and len(upload) == len(data)
+            _, read_peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            response, status = handler(upload, filename)
+            _, work_peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    assert status == 200, response
+    return read_peak, work_peak
+
+
+def test_upload_buffer_shares_memory_and_maps_spooled_files():
+    data = b'\xff\xd8' + bytes(range(256)) * 10
+    in_memory = io.BytesIO(data)
+    assert upload_buffer(in_memory).obj is in_memory.getvalue()
+
+    with tempfile.SpooledTemporaryFile(max_size=16) as spooled:
+        spooled.write(data)  # rolled over to a real file
+        view = upload_buffer(spooled)
+        assert view.tobytes() == data
+        view.release()
+
+    reader = BufferReader(memoryview(data))
+    reader.seek(-4, io.SEEK_END)
+    assert reader.read() == data[-4:]
+    reader.seek(2)
+    assert reader.read(3) == data[2:5]
+
+
+def test_ingest_peak_memory_is_bounded_by_the_spool_size():
+    endpoints = (
+        ('/api/predict', app_module.predict_upload),
+        ('/api/predict-disease-only', lambda upload, filename: app_module.predict_disease_only_upload(upload)),
+    )
+    for seed, (path, handler) in enumerate(endpoints):
+        _ingest_peak(path, _large_jpeg(seed), handler)  # warm up lazy model state outside the measurement
+        data = _large_jpeg(seed + 10)  # a new image, so the prediction cache can't answer
+        read_peak, work_peak = _ingest_peak(path, data, handler)
+        # Only Werkzeug's in-memory spool is held while parsing; the upload is then mapped, not copied
+        assert read_peak < 2 * app_module.UPLOAD_SPOOL_SIZE, f'{path}: read peak {read_peak} bytes'
+        assert max(read_peak, work_peak) < len(data) / 2, \
+            f'{path}: peak {max(read_peak, work_peak)} bytes for a {len(data)} byte upload'
+
+
+def test_oversized_body_is_rejected_from_content_length():
+    client = app_module.app.test_client()
+    body = b'x' * (app_module.MAX_UPLOAD_REQUEST_SIZE + 1)
+    for path in ('/api/predict', '/api/predict-disease-only'):
+        response = client.post(path, data=body, content_type='multipart/form-data; boundary=unused')
+        assert response.status_code == 413
+        assert response.get_json()['status'] == 'error'
+
+    # The ASGI app: the same 413 before the form is parsed, and for a file just over MAX_FILE_SIZE
+    httpx = pytest.importorskip('httpx')
+    import asgi
+
+    oversized_file = b'x' * (app_module.MAX_FILE_SIZE + 1)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url='http://test') as client:
+            responses = []
+            for path in ('/api/predict', '/api/predict-disease-only', '/api/predict-and-recommend'):
+                responses.append(await client.post(path, content=body, headers={
+                    'Content-Type': 'multipart/form-data; boundary=unused'}))
+                responses.append(await client.post(path, files={'image': ('big.jpg', oversized_file, 'image/jpeg')}))
+            return responses
+
+    for response in asyncio.run(run()):
+        assert response.status_code == 413
+        assert response.json()['status'] == 'error'
+
+
+def test_oversized_batch_body_is_rejected_from_content_length(monkeypatch):
+    monkeypatch.setattr(app_module, 'MAX_BATCH_REQUEST_SIZE', 64 * 1024)
+    body = b'x' * (app_module.MAX_BATCH_REQUEST_SIZE + 1)
+    headers = {'Content-Type': 'multipart/form-data; boundary=unused'}
+    response = app_module.app.test_client().post('/api/predict/batch', data=body, headers=headers)
+    assert response.status_code == 413
+
+    httpx = pytest.importorskip('httpx')
+    import asgi
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url='http://test') as client:
+            return await client.post('/api/predict/batch', content=body, headers=headers)
+
+    response = asyncio.run(run())
+    assert response.status_code == 413
+    assert response.json()['status'] == 'error'
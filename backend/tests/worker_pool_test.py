@@ -0,0 +1,98 @@
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+import tensorflow as tf
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from worker_pool import InferenceWorkerPool, RemoteModel, TensorRing
+
+
+@pytest.fixture(scope='module')
+def pool():
+    pool = InferenceWorkerPool(
+        {'leaf': os.environ['LEAF_MODEL_PATH'], 'disease': os.environ['DISEASE_MODEL_PATH']},
+        num_workers=2, slots_per_worker=2, slot_rows=4
+    ).start()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture(scope='module')
+def local_models():
+    return {name: tf.keras.models.load_model(os.environ[var], compile=False)
+            for name, var in (('leaf', 'LEAF_MODEL_PATH'), ('disease', 'DISEASE_MODEL_PATH'))}
+
+
+def _batch(n, seed=0):
+    return np.random.default_rng(seed).random((n, 224, 224, 3), dtype=np.float32)
+
+
+def test_outputs_match_in_process_models(pool, local_models):
+    batch = _batch(10)  # spans three 4-image slots
+    for name, model in local_models.items():
+        np.testing.assert_allclose(pool.predict(name, batch), model.predict(batch, verbose=0), atol=1e-5)
+
+
+def test_remote_model_exposes_model_interface(pool, local_models):
+    disease = RemoteModel(pool, 'disease')
+    assert tuple(disease.input_shape) == (None, 224, 224, 3)
+    assert tuple(disease.output_shape) == tuple(local_models['disease'].output_shape)
+    assert disease.predict(_batch(1)).shape == (1, local_models['disease'].output_shape[-1])
+
+
+def test_concurrent_requests_more_than_slots(pool, local_models):
+    batches = [_batch(3, seed) for seed in range(12)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda b: pool.predict('disease', b), batches))
+    for batch, result in zip(batches, results):
+        np.testing.assert_allclose(result, local_models['disease'].predict(batch, verbose=0), atol=1e-5)
+    assert all(w['in_flight'] == 0 for w in pool.stats()['workers'])
+
+
+def test_crashed_worker_is_restarted_and_job_rerun(pool, local_models):
+    batch = _batch(4, seed=7)
+    victim = pool.stats()['workers'][0]
+    future = pool.submit('leaf', batch)
+    os.kill(victim['pid'], signal.SIGKILL)
+    np.testing.assert_allclose(future.result(timeout=120), local_models['leaf'].predict(batch, verbose=0), atol=1e-5)
+
+    deadline = time.monotonic() + 120
+    while pool.stats()['workers'][0]['state'] != 'ready' and time.monotonic() < deadline:
+        time.sleep(0.2)
+    restarted = pool.stats()['workers'][0]
+    assert restarted['restarts'] == victim['restarts'] + 1
+    assert restarted['pid'] != victim['pid']
+    np.testing.assert_allclose(pool.predict('leaf', batch), local_models['leaf'].predict(batch, verbose=0), atol=1e-5)
+
+
+def test_rejects_wrong_shapes_and_unknown_models(pool):
+    with pytest.raises(ValueError):
+        pool.submit('leaf', np.zeros((1, 32, 32, 3), dtype=np.float32))
+    with pytest.raises(KeyError):
+        pool.submit('missing', _batch(1))
+
+
+def test_unloadable_model_fails_start(tmp_path):
+    broken = tmp_path / 'broken.keras'
+    broken.write_bytes(b'not a model')
+    pool = InferenceWorkerPool({'leaf': str(broken)}, num_workers=1, max_restarts_in_row=1)
+    with pytest.raises(RuntimeError, match='No inference worker started'):
+        pool.start()
+
+
+def test_ring_slots_are_shared_between_attachments():
+    ring = TensorRing(2, 1, (4, 4, 3))
+    try:
+        other = TensorRing(2, 1, (4, 4, 3), name=ring.name)
+        ring.array[1, 0] = 5.0
+        assert float(other.array[1, 0].sum()) == 5.0 * 48
+        other.close()
+    finally:
+        ring.close()
+        ring.unlink()
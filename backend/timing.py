@@ -0,0 +1,94 @@
+"""
+Lightweight timed spans for the request pipeline.
+
+``span(name)`` measures a block and records it both on the current trace
+(a per-request list, reported via the Server-Timing header), in the
+process-wide aggregates shown on /api/inference-stats and in the stage
+latency histogram on /metrics. A span that raises counts as an error of
+that stage (only the innermost span, so nested spans don't double count).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+
+_current_trace: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar('current_trace', default=None)
+
+_totals_lock = threading.Lock()
+_totals: Dict[str, Dict[str, float]] = {}
+
+
+def start_trace() -> List[Tuple[str, float]]:
+    """Begin collecting spans for the current request"""
+    trace = []
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> List[Tuple[str, float]]:
+    """Spans recorded since start_trace() as (name, seconds) pairs"""
+    return _current_trace.get() or []
+
+
+def record(name: str, seconds: float):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append((name, seconds))
+    with _totals_lock:
+        entry = _totals.get(name)
+        if entry is None:
+            entry = _totals[name] = {'count': 0, 'total': 0.0, 'max': 0.0}
+        entry['count'] += 1
+        entry['total'] += seconds
+        if seconds > entry['max']:
+            entry['max'] = seconds
+    metrics.STAGE_SECONDS.observe(seconds, stage=name)
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block under the given span name"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        if failed_stage(e) is None:
+            try:
+                e.failed_stage = name
+            except AttributeError:
+                pass
+            metrics.ERRORS.inc(stage=name)
+        raise
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+def failed_stage(error: BaseException) -> Optional[str]:
+    """Name of the span an exception (or the one it was raised from) escaped, if any"""
+    while error is not None:
+        stage = getattr(error, 'failed_stage', None)
+        if stage is not None:
+            return stage
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def server_timing_header(trace: List[Tuple[str, float]]) -> str:
+    """Format spans for the Server-Timing response header"""
+    return ', '.join(f'{name};dur={seconds * 1000.0:.3f}' for name, seconds in trace)
+
+
+def summary() -> Dict[str, Dict[str, float]]:
+    """Per-span count, mean and max in milliseconds"""
+    with _totals_lock:
+        return {
+            name: {
+                'count': int(entry['count']),
+                'mean_ms': round(entry['total'] / entry['count'] * 1000.0, 3) if entry['count'] else 0.0,
+                'max_ms': round(entry['max'] * 1000.0, 3)
+            }
+            for name, entry in _totals.items()
+        }
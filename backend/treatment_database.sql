@@ -6,7 +6,9 @@ CREATE TABLE diseases (
     symptoms TEXT,
     favorable_conditions TEXT,
     spread_method TEXT,
-    prevention_tips TEXT
+    prevention_tips TEXT,
+    -- Lookup key for names sent with spaces instead of underscores ('Late blight')
+    normalized_name VARCHAR(100) GENERATED ALWAYS AS (REPLACE(disease_name, '_', ' ')) VIRTUAL
 );
 
 CREATE TABLE treatment_categories (
@@ -97,6 +99,9 @@ CREATE INDEX idx_treatments_disease ON treatments(disease_id);
 CREATE INDEX idx_treatments_category ON treatments(category_id);
 CREATE INDEX idx_treatments_effectiveness ON treatments(effectiveness_percentage DESC);
 CREATE INDEX idx_cultural_disease ON cultural_practices(disease_id);
+CREATE INDEX idx_diseases_normalized_name ON diseases(normalized_name);
+CREATE INDEX idx_severity_mapping_severity ON treatment_severity_mapping(severity_id, is_recommended, treatment_id);
+CREATE INDEX idx_severity_mapping_treatment ON treatment_severity_mapping(treatment_id, severity_id, is_recommended);
 
 -- =========================
 -- DISEASES (10+ healthy)
@@ -0,0 +1,206 @@
+"""
+Incremental readers for multi-image uploads.
+
+``iter_multipart_files`` parses a multipart/form-data body straight from the
+request stream with Werkzeug's sans-IO decoder and yields one file at a
+time, so a request with thousands of images never has to be held (or
+spooled) in full; ``MultipartFileReader`` is the same parser fed chunk by
+chunk, for bodies that arrive asynchronously. Zip archives need their central directory, which sits at
+the end of the file, so an archive part is spooled to a temporary file and
+its members are then read one by one.
+
+``upload_buffer`` exposes an already parsed upload (Werkzeug FileStorage or
+Starlette UploadFile stream) as a memoryview without copying it.
+"""
+import io
+import mmap
+import os
+import tempfile
+import zipfile
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+DEFAULT_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+SPOOL_MEMORY_LIMIT = 8 * 1024 * 1024
+
+Upload = Tuple[str, Optional[Union[bytes, memoryview]]]
+
+
+class UploadTooLarge(ValueError):
+    """An upload part exceeded its size limit (e.g. a zip archive over max_archive_size)"""
+
+
+def upload_buffer(file_obj) -> memoryview:
+    """
+    Contents of an uploaded file as a memoryview, copying nothing where possible
+
+    Uploads held in memory (io.BytesIO, also inside a SpooledTemporaryFile) share
+    their buffer; uploads spooled to disk are memory-mapped. Anything else is read once.
+
+    Args:
+        file_obj: The upload's stream, e.g. FileStorage.stream or UploadFile.file
+    """
+    # SpooledTemporaryFile keeps the BytesIO, or the real file once rolled over, in _file
+    raw = getattr(file_obj, '_file', file_obj)
+    if isinstance(raw, io.BytesIO):
+        # getvalue() hands out the internal bytes object itself; no buffer export
+        # keeps the stream from being closed at the end of the request
+        return memoryview(raw.getvalue())
+    try:
+        fileno = raw.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        fileno = None
+    if fileno is not None:
+        raw.flush()
+        if os.fstat(fileno).st_size == 0:
+            return memoryview(b'')
+        return memoryview(mmap.mmap(fileno, 0, access=mmap.ACCESS_READ))
+    raw.seek(0)
+    return memoryview(raw.read())
+
+
+def iter_zip_members(file_obj, max_file_size: int, max_images: Optional[int] = None,
+                     extensions: Sequence[str] = DEFAULT_IMAGE_EXTENSIONS) -> Iterator[Upload]:
+    """
+    Yield (name, bytes) for image members of a zip archive, in archive order
+
+    Members larger than max_file_size are yielded with bytes=None (without
+    inflating them) so the caller can report them individually.
+    """
+    with zipfile.ZipFile(file_obj) as archive:
+        count = 0
+        for member in archive.infolist():
+            name = member.filename
+            if member.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('.'):
+                continue
+            if not name.lower().endswith(tuple(extensions)):
+                continue
+            count += 1
+            if max_images is not None and count > max_images:
+                raise ValueError(f'Archive contains more than {max_images} images')
+            if member.file_size > max_file_size:
+                yield name, None
+                continue
+            yield name, archive.read(member)
+
+
+class MultipartFileReader:
+    """
+    Incremental multipart/form-data parser fed with body chunks as they arrive
+
+    The parsing half of iter_multipart_files(), for callers that receive the body
+    themselves (the ASGI app reads it from the event loop). feed() returns the
+    uploads completed by a chunk as sources to iterate: a one-item list for an
+    image file, and a lazy member iterator for a zip archive, whose members are
+    only inflated while it is iterated.
+
+    Args:
+        boundary: Multipart boundary from the Content-Type header
+        max_file_size: Larger files are yielded with bytes=None and not buffered
+        file_fields: Form fields that carry individual images
+        archive_field: Form field that carries a zip archive of images
+        extensions: Archive members with other extensions are skipped
+        max_archive_size: Bytes an archive may have; a larger one raises UploadTooLarge
+            as soon as the limit is passed, instead of being spooled further
+    """
+
+    def __init__(self, boundary: str, max_file_size: int,
+                 file_fields: Sequence[str] = ('images', 'image'), archive_field: str = 'archive',
+                 extensions: Sequence[str] = DEFAULT_IMAGE_EXTENSIONS,
+                 max_archive_size: Optional[int] = None):
+        self.max_file_size = max_file_size
+        self.file_fields = tuple(file_fields)
+        self.archive_field = archive_field
+        self.extensions = extensions
+        self.max_archive_size = max_archive_size
+        self.finished = False
+        self._decoder = MultipartDecoder(boundary.encode('latin-1'))
+        self._current = None  # (field, filename, buffer or None if oversized, spool file for archives)
+
+    def feed(self, chunk: bytes) -> List[Iterable[Upload]]:
+        """
+        Parse the next chunk of the body; an empty chunk marks its end
+
+        Raises:
+            UploadTooLarge: An archive part exceeded max_archive_size
+        """
+        sources = []
+        if self.finished:
+            return sources
+        self._decoder.receive_data(chunk if chunk else None)
+
+        while True:
+            event = self._decoder.next_event()
+            if isinstance(event, NeedData):
+                if not chunk:
+                    self.finished = True
+                break
+            if isinstance(event, Epilogue):
+                self.finished = True
+                break
+            if isinstance(event, File):
+                if event.name == self.archive_field:
+                    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_LIMIT)
+                    self._current = (event.name, event.filename, None, spool)
+                elif event.name in self.file_fields:
+                    self._current = (event.name, event.filename, bytearray(), None)
+                else:
+                    self._current = None
+            elif isinstance(event, Field):
+                self._current = None
+            elif isinstance(event, Data) and self._current is not None:
+                field, filename, buffer, spool = self._current
+                if spool is not None:
+                    spool.write(event.data)
+                    if self.max_archive_size is not None and spool.tell() > self.max_archive_size:
+                        spool.close()
+                        self._current = None
+                        raise UploadTooLarge(
+                            f'Archive exceeds the {self.max_archive_size / (1024*1024):.0f}MB limit')
+                elif buffer is not None:
+                    buffer.extend(event.data)
+                    if len(buffer) > self.max_file_size:
+                        self._current = (field, filename, None, None)
+
+                if not event.more_data:
+                    field, filename, buffer, spool = self._current
+                    self._current = None
+                    if spool is not None:
+                        sources.append(self._archive_members(spool))
+                    elif filename:
+                        # Each file gets its own bytearray, so it can be handed out as is
+                        sources.append([(filename, memoryview(buffer) if buffer is not None else None)])
+        return sources
+
+    def _archive_members(self, spool) -> Iterator[Upload]:
+        spool.seek(0)
+        with spool:
+            yield from iter_zip_members(spool, self.max_file_size, extensions=self.extensions)
+
+
+def iter_multipart_files(stream, boundary: str, max_file_size: int,
+                         file_fields: Sequence[str] = ('images', 'image'), archive_field: str = 'archive',
+                         chunk_size: int = 64 * 1024,
+                         extensions: Sequence[str] = DEFAULT_IMAGE_EXTENSIONS,
+                         max_archive_size: Optional[int] = None) -> Iterator[Upload]:
+    """
+    Yield uploaded images as (filename, memoryview) while the body is still being read
+
+    Args:
+        stream: Raw request body stream
+        boundary: Multipart boundary from the Content-Type header
+        max_file_size: Larger files are yielded with bytes=None and not buffered
+        file_fields: Form fields that carry individual images
+        archive_field: Form field that carries a zip archive of images
+        chunk_size: Bytes read from the stream per step
+        max_archive_size: Bytes an archive may have; a larger one raises UploadTooLarge
+            as soon as the limit is passed, instead of being spooled further
+
+    Raises:
+        UploadTooLarge: An archive part exceeded max_archive_size
+    """
+    reader = MultipartFileReader(boundary, max_file_size, file_fields, archive_field, extensions, max_archive_size)
+    while not reader.finished:
+        for source in reader.feed(stream.read(chunk_size)):
+            yield from source
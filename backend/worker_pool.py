@@ -0,0 +1,556 @@
+"""
+Inference worker processes with shared-memory tensor handoff.
+
+Each worker is a separate Python process that loads the models itself
+(Keras, or .tflite files), is pinned to its own cores and runs TensorFlow
+with a fixed number of intra- and inter-op threads, so N workers use N
+cores without fighting over the GIL. The front end keeps no models.
+
+Tensors are never pickled: every worker owns a ring of fixed-size slots
+in a shared-memory block, each holding up to `slot_rows` preprocessed
+(224, 224, 3) float32 rows. The front end copies a batch into a free slot
+and sends only (job id, model, slot, rows) over the worker's socket; the
+worker runs the model on a view of that slot and sends back the (small)
+outputs. Batches larger than a slot are split across slots and workers.
+
+When a worker dies, its socket closes, a replacement is started on the
+same ring, and the jobs it held are run again (their input is still in
+the slots) up to `max_retries` times.
+
+Workers are started with subprocess rather than multiprocessing: spawn
+re-imports the parent's __main__, which for `python app.py` would load
+the whole app (and its models) in every worker.
+
+Usage:
+    pool = InferenceWorkerPool({'leaf': LEAF_MODEL_PATH, 'disease': DISEASE_MODEL_PATH}, num_workers=4)
+    pool.start()
+    leaf_model = RemoteModel(pool, 'leaf')   # predict() like a loaded model
+"""
+import itertools
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection, wait
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger('tomato.workers')
+
+
+class WorkerCrashed(RuntimeError):
+    """A job's worker died more often than the retry limit, or no worker is left"""
+
+
+class TensorRing:
+    """
+    Fixed-size float32 slots in one shared-memory block
+
+    Args:
+        slots: Number of slots
+        slot_rows: Rows (images) per slot
+        row_shape: Shape of one row, e.g. (224, 224, 3)
+        name: Attach to an existing block instead of creating one
+        track: When attaching, register the block with this process's resource
+            tracker; workers don't, or the block is unlinked when they exit
+    """
+
+    def __init__(self, slots: int, slot_rows: int, row_shape=(224, 224, 3), name: str = None, track: bool = True):
+        self.slots = int(slots)
+        self.slot_rows = int(slot_rows)
+        self.row_shape = tuple(int(d) for d in row_shape)
+        shape = (self.slots, self.slot_rows) + self.row_shape
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+        elif track:
+            self.shm = shared_memory.SharedMemory(name=name)
+        else:
+            self.shm = _attach_untracked(name)
+        self.array = np.ndarray(shape, dtype=np.float32, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes
+
+    def spec(self) -> dict:
+        return {'name': self.name, 'slots': self.slots, 'slot_rows': self.slot_rows, 'row_shape': list(self.row_shape)}
+
+    def close(self):
+        self.array = None  # the buffer can't be released while a view exists
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def _attach_untracked(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _concat(parts):
+    if len(parts) == 1:
+        return parts[0]
+    if isinstance(parts[0], (list, tuple)):
+        return [np.concatenate(outputs) for outputs in zip(*parts)]
+    return np.concatenate(parts)
+
+
+class _Job:
+    __slots__ = ('future', 'model', 'slot', 'rows', 'attempts', 'staged')
+
+    def __init__(self, model, slot, rows):
+        self.future = Future()
+        self.model = model
+        self.slot = slot
+        self.rows = rows
+        self.attempts = 0
+        self.staged = False  # input copied into the slot, may be sent
+
+
+class _Worker:
+    def __init__(self, index: int, ring: TensorRing, cores: List[int]):
+        self.index = index
+        self.ring = ring
+        self.cores = cores
+        self.free_slots = list(range(ring.slots))
+        self.jobs: Dict[int, _Job] = {}
+        self.conn: Optional[Connection] = None
+        self.process: Optional[subprocess.Popen] = None
+        self.state = 'stopped'  # starting, ready, failed
+        self.error = None
+        self.restarts = 0
+        self.failures_in_row = 0
+        self.completed = 0
+        self.rows = 0
+
+
+class InferenceWorkerPool:
+    """
+    Pool of model-serving worker processes
+
+    Args:
+        models: Model name -> .keras or .tflite path, loaded by every worker
+        num_workers: Worker processes
+        slots_per_worker: Shared-memory slots (jobs in flight) per worker
+        slot_rows: Images per slot; larger batches are split
+        row_shape: Shape of one preprocessed image
+        intra_op_threads: TensorFlow intra-op threads per worker (also cores pinned per worker)
+        inter_op_threads: TensorFlow inter-op threads per worker
+        pin_cores: Pin each worker to its own cores (Linux only)
+        compile_graph: Serve Keras models through a traced tf.function (CompiledModel)
+        max_retries: Times a job is re-run after its worker crashed
+        max_restarts_in_row: Consecutive failed starts before a worker is given up
+        start_timeout: Seconds start() waits for the workers to load their models
+    """
+
+    def __init__(self, models: Dict[str, str], num_workers: int = 1, slots_per_worker: int = 4,
+                 slot_rows: int = 16, row_shape=(224, 224, 3), intra_op_threads: int = 1,
+                 inter_op_threads: int = 1, pin_cores: bool = True, compile_graph: bool = True,
+                 max_retries: int = 1, max_restarts_in_row: int = 3, start_timeout: float = 300):
+        self.models = dict(models)
+        self.num_workers = max(1, int(num_workers))
+        self.slots_per_worker = max(1, int(slots_per_worker))
+        self.slot_rows = max(1, int(slot_rows))
+        self.row_shape = tuple(row_shape)
+        self.intra_op_threads = max(1, int(intra_op_threads))
+        self.inter_op_threads = max(1, int(inter_op_threads))
+        self.pin_cores = pin_cores and hasattr(os, 'sched_setaffinity')
+        self.compile_graph = compile_graph
+        self.max_retries = max_retries
+        self.max_restarts_in_row = max_restarts_in_row
+        self.start_timeout = start_timeout
+
+        self.model_shapes: Dict[str, dict] = {}
+        self._workers: List[_Worker] = []
+        self._cond = threading.Condition()
+        self._job_ids = itertools.count()
+        self._collector = None
+        self._closed = False
+
+        self.submitted = 0
+        self.retried = 0
+        self.failed = 0
+
+    def _worker_cores(self, index: int) -> List[int]:
+        if not self.pin_cores:
+            return []
+        available = sorted(os.sched_getaffinity(0))
+        n = self.intra_op_threads
+        return sorted({available[(index * n + i) % len(available)] for i in range(n)})
+
+    def _spawn(self, worker: _Worker):
+        """Start a process for worker (called with the lock held or before the collector runs)"""
+        parent_sock, child_sock = socket.socketpair()
+        config = {
+            'index': worker.index,
+            'fd': child_sock.fileno(),
+            'ring': worker.ring.spec(),
+            'models': self.models,
+            'cores': worker.cores,
+            'intra_op_threads': self.intra_op_threads,
+            'inter_op_threads': self.inter_op_threads,
+            'compile_graph': self.compile_graph
+        }
+        try:
+            worker.process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), json.dumps(config)],
+                pass_fds=(child_sock.fileno(),),
+                cwd=os.path.dirname(os.path.abspath(__file__))
+            )
+        finally:
+            child_sock.close()
+        worker.conn = Connection(parent_sock.detach())
+        worker.state = 'starting'
+
+    def start(self):
+        """Start the workers and wait until they have loaded their models"""
+        for index in range(self.num_workers):
+            ring = TensorRing(self.slots_per_worker, self.slot_rows, self.row_shape)
+            worker = _Worker(index, ring, self._worker_cores(index))
+            self._workers.append(worker)
+            self._spawn(worker)
+
+        self._collector = threading.Thread(target=self._collect, name='inference-worker-collector', daemon=True)
+        self._collector.start()
+
+        deadline = time.monotonic() + self.start_timeout
+        with self._cond:
+            while any(w.state == 'starting' for w in self._workers):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            ready = [w for w in self._workers if w.state == 'ready']
+            errors = [w.error for w in self._workers if w.error]
+        if not ready:
+            self.close()
+            raise RuntimeError(f"No inference worker started: {errors[0] if errors else 'timed out'}")
+        logger.info("%d/%d inference workers ready (%d intra-op / %d inter-op threads each, "
+                    "%d x %d-image shared-memory slots)", len(ready), self.num_workers, self.intra_op_threads,
+                    self.inter_op_threads, self.slots_per_worker, self.slot_rows)
+        return self
+
+    def _collect(self):
+        """Read worker messages and replace workers whose socket closed"""
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                conns = {w.conn: w for w in self._workers if w.conn is not None}
+            for conn in wait(list(conns), timeout=0.2):
+                worker = conns[conn]
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    self._on_exit(worker)
+                    continue
+                self._on_message(worker, message)
+
+    def _on_message(self, worker: _Worker, message):
+        kind = message[0]
+        with self._cond:
+            if kind == 'ready':
+                _, shapes, pid = message
+                self.model_shapes = shapes
+                worker.state = 'ready'
+                worker.error = None
+                worker.failures_in_row = 0
+                # Jobs left over from a crashed process: their input is still in the slots
+                for job_id, job in worker.jobs.items():
+                    if job.staged:
+                        self._send(worker, job_id, job)
+                logger.info("Inference worker %d ready (pid %s, cores: %s)", worker.index, pid, worker.cores or 'any')
+            elif kind == 'failed':
+                worker.error = message[1]
+                logger.error("Inference worker %d failed to load models: %s", worker.index, message[1])
+            else:
+                _, job_id, payload = message
+                job = worker.jobs.pop(job_id, None)
+                if job is None:
+                    return
+                worker.free_slots.append(job.slot)
+                worker.completed += 1
+                worker.rows += job.rows
+                if kind == 'ok':
+                    job.future.set_result(payload)
+                else:
+                    self.failed += 1
+                    job.future.set_exception(RuntimeError(f'Inference failed in worker {worker.index}: {payload}'))
+            self._cond.notify_all()
+
+    def _on_exit(self, worker: _Worker):
+        exit_code = worker.process.wait() if worker.process is not None else None
+        with self._cond:
+            worker.conn.close()
+            worker.conn = None
+            if self._closed:
+                return
+            was_ready = worker.state == 'ready'
+            worker.failures_in_row = 0 if was_ready else worker.failures_in_row + 1
+            give_up = worker.failures_in_row >= self.max_restarts_in_row
+
+            for job_id, job in list(worker.jobs.items()):
+                if job.staged:
+                    job.attempts += 1
+                if give_up or job.attempts > self.max_retries:
+                    worker.jobs.pop(job_id)
+                    worker.free_slots.append(job.slot)
+                    self.failed += 1
+                    job.future.set_exception(WorkerCrashed(
+                        f'Inference worker {worker.index} exited (code {exit_code}) while running this batch'))
+                elif job.staged:
+                    self.retried += 1
+
+            if give_up:
+                worker.state = 'failed'
+                logger.error("Inference worker %d exited (code %s) %d times in a row, not restarting",
+                             worker.index, exit_code, worker.failures_in_row)
+            else:
+                worker.restarts += 1
+                logger.warning("Inference worker %d exited (code %s), restarting", worker.index, exit_code)
+                self._spawn(worker)
+            self._cond.notify_all()
+
+    def _send(self, worker: _Worker, job_id: int, job: _Job):
+        try:
+            worker.conn.send(('run', job_id, job.model, job.slot, job.rows))
+        except OSError:
+            pass  # the worker is gone; _on_exit re-runs the job on its replacement
+
+    def submit(self, model: str, batch: np.ndarray, timeout: float = None) -> Future:
+        """
+        Queue at most slot_rows images for a model
+
+        Blocks while every ready worker's slots are taken.
+
+        Returns:
+            Future with the model outputs
+        """
+        if model not in self.models:
+            raise KeyError(f'Unknown model: {model}')
+        rows = len(batch)
+        if rows > self.slot_rows:
+            raise ValueError(f'Batch of {rows} exceeds the slot size of {self.slot_rows}; use predict()')
+        if tuple(batch.shape[1:]) != self.row_shape:
+            raise ValueError(f'Expected rows of shape {self.row_shape}, got {tuple(batch.shape[1:])}')
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError('Inference worker pool is closed')
+                candidates = [w for w in self._workers if w.state == 'ready' and w.free_slots]
+                if candidates:
+                    worker = min(candidates, key=lambda w: len(w.jobs))
+                    break
+                if all(w.state == 'failed' for w in self._workers):
+                    raise WorkerCrashed('No inference worker is running')
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError('No inference worker slot became free')
+                self._cond.wait(remaining)
+            job_id = next(self._job_ids)
+            job = _Job(model, worker.free_slots.pop(), rows)
+            worker.jobs[job_id] = job
+            self.submitted += 1
+
+        # The slot is reserved, so the copy can happen outside the lock
+        worker.ring.array[job.slot, :rows] = batch
+        with self._cond:
+            job.staged = True
+            if worker.state == 'ready' and worker.jobs.get(job_id) is job:
+                self._send(worker, job_id, job)
+        return job.future
+
+    def predict(self, model: str, batch: np.ndarray, timeout: float = None):
+        """
+        Run a model on a (N, H, W, C) batch of any size
+
+        Returns:
+            numpy outputs, as the model's predict() would return them
+        """
+        batch = np.asarray(batch, dtype=np.float32)
+        futures = [self.submit(model, batch[i:i + self.slot_rows], timeout)
+                   for i in range(0, len(batch), self.slot_rows)]
+        return _concat([future.result(timeout) for future in futures])
+
+    def close(self, timeout: float = 10):
+        """Stop the workers, fail jobs still in flight and free the shared memory"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            for worker in self._workers:
+                if worker.conn is not None:
+                    try:
+                        worker.conn.send(('stop',))
+                    except OSError:
+                        pass
+            self._cond.notify_all()
+        if self._collector is not None:
+            self._collector.join()
+
+        for worker in self._workers:
+            if worker.process is not None:
+                try:
+                    worker.process.wait(timeout)
+                except subprocess.TimeoutExpired:
+                    worker.process.kill()
+                    worker.process.wait()
+            if worker.conn is not None:
+                worker.conn.close()
+                worker.conn = None
+            for job in worker.jobs.values():
+                job.future.set_exception(RuntimeError('Inference worker pool is closed'))
+            worker.jobs.clear()
+            worker.state = 'stopped'
+            worker.ring.close()
+            worker.ring.unlink()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'workers': [{
+                    'index': w.index,
+                    'pid': w.process.pid if w.process is not None else None,
+                    'state': w.state,
+                    'cores': w.cores,
+                    'restarts': w.restarts,
+                    'in_flight': len(w.jobs),
+                    'free_slots': len(w.free_slots),
+                    'completed_jobs': w.completed,
+                    'completed_rows': w.rows,
+                    'error': w.error
+                } for w in self._workers],
+                'models': sorted(self.models),
+                'intra_op_threads': self.intra_op_threads,
+                'inter_op_threads': self.inter_op_threads,
+                'slots_per_worker': self.slots_per_worker,
+                'slot_rows': self.slot_rows,
+                'shared_memory_mb': round(sum(w.ring.nbytes for w in self._workers) / (1024 * 1024), 1),
+                'submitted_jobs': self.submitted,
+                'retried_jobs': self.retried,
+                'failed_jobs': self.failed
+            }
+
+
+class RemoteModel:
+    """
+    A model served by an InferenceWorkerPool, with the predict()/warmup()/info()
+    interface of CompiledModel and TFLiteModel
+
+    Args:
+        pool: Started pool
+        name: Model name in the pool
+    """
+
+    def __init__(self, pool: InferenceWorkerPool, name: str):
+        self.pool = pool
+        self.name = name
+        self.model_path = pool.models[name]
+        shapes = pool.model_shapes[name]
+        self.input_shape = shapes['input_shape']
+        self.output_shape = shapes['output_shape']
+
+    def predict(self, batch: np.ndarray, verbose=0):
+        return self.pool.predict(self.name, batch)
+
+    __call__ = predict
+
+    def warmup(self, batch_sizes=(1,)) -> float:
+        # Workers warm their models up before reporting ready
+        started = time.perf_counter()
+        for n in batch_sizes:
+            self.predict(np.zeros((n,) + tuple(self.input_shape[1:]), dtype=np.float32))
+        return time.perf_counter() - started
+
+    @property
+    def compiled(self) -> bool:
+        return self.pool.compile_graph
+
+    def info(self) -> dict:
+        return {
+            'name': self.name,
+            'backend': 'worker_pool',
+            'path': self.model_path,
+            'workers': self.pool.num_workers
+        }
+
+
+def _shape(shape):
+    if isinstance(shape, list):
+        return [_shape(s) for s in shape]
+    return tuple(None if d is None else int(d) for d in shape)
+
+
+def _worker_main(config) -> int:
+    conn = Connection(config['fd'])
+    intra, inter = config['intra_op_threads'], config['inter_op_threads']
+    if config['cores']:
+        os.sched_setaffinity(0, config['cores'])
+    # Before TensorFlow is imported, so its thread pools pick them up
+    os.environ.setdefault('OMP_NUM_THREADS', str(intra))
+    os.environ.setdefault('TF_NUM_INTRAOP_THREADS', str(intra))
+    os.environ.setdefault('TF_NUM_INTEROP_THREADS', str(inter))
+
+    ring = None
+    try:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(intra)
+        tf.config.threading.set_inter_op_parallelism_threads(inter)
+        from inference import CompiledModel, TFLiteModel
+
+        spec = config['ring']
+        ring = TensorRing(spec['slots'], spec['slot_rows'], spec['row_shape'], name=spec['name'], track=False)
+        runners, shapes = {}, {}
+        for name, path in config['models'].items():
+            if path.endswith('.tflite'):
+                runner = TFLiteModel(path, name, num_threads=intra)
+                output_shape = runner.output_shape
+            else:
+                model = tf.keras.models.load_model(path, compile=False)
+                runner = CompiledModel(model, name, compile_graph=config['compile_graph'])
+                output_shape = model.output_shape
+            runner.warmup()
+            runners[name] = runner
+            shapes[name] = {'input_shape': _shape(runner.input_shape), 'output_shape': _shape(output_shape)}
+    except Exception as e:
+        conn.send(('failed', f'{type(e).__name__}: {e}'))
+        return 1
+
+    conn.send(('ready', shapes, os.getpid()))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message[0] == 'stop':
+            break
+        _, job_id, name, slot, rows = message
+        try:
+            conn.send(('ok', job_id, runners[name].predict(ring.array[slot, :rows])))
+        except Exception as e:
+            conn.send(('error', job_id, f'{type(e).__name__}: {e}'))
+    ring.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_worker_main(json.loads(sys.argv[1])))